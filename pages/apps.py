@@ -4,3 +4,7 @@ from django.apps import AppConfig
 class PadesConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'pages'
+
+    def ready(self):
+        # проверки настроек производительности (manage.py check --deploy)
+        from . import checks  # noqa: F401
@@ -0,0 +1,90 @@
+# pages/checks.py
+# Проверки настроек, из-за которых сервер медленнеет или растёт по памяти под нагрузкой.
+# Выполняются в manage.py check --deploy (или check --deploy --tag performance);
+# при разработке DEBUG и кеш в памяти процесса — норма, поэтому только с --deploy.
+from django.conf import settings
+from django.core.checks import Warning, register
+
+# больше этого файл при загрузке держится в памяти воркера целиком
+UPLOAD_MEMORY_LIMIT = 5 * 1024 * 1024
+CACHED_LOADER = 'django.template.loaders.cached.Loader'
+PROCESS_LOCAL_CACHES = {
+    'django.core.cache.backends.locmem.LocMemCache',
+    'django.core.cache.backends.dummy.DummyCache',
+}
+
+
+def uses_cached_loader(options):
+    # loaders — список путей или кортежей (загрузчик, [вложенные загрузчики])
+    return any((loader[0] if isinstance(loader, (list, tuple)) else loader) == CACHED_LOADER
+               for loader in options.get('loaders', []))
+
+
+@register('performance', deploy=True)
+def check_performance_settings(app_configs, **kwargs):
+    warnings = []
+    if settings.DEBUG:
+        warnings.append(Warning(
+            'DEBUG включён: каждый SQL-запрос сохраняется в connection.queries, '
+            'память воркера растёт с числом запросов.',
+            hint='DJANGO_ENV=production',
+            id='pages.W001',
+        ))
+
+    for engine in settings.TEMPLATES:
+        options = engine.get('OPTIONS', {})
+        # без явного loaders Django сам оборачивает загрузчики в cached.Loader
+        if 'loaders' in options and not uses_cached_loader(options):
+            warnings.append(Warning(
+                'Шаблоны загружаются без кеширования: каждый рендер заново читает '
+                'и компилирует файл.',
+                hint=f'Оберните загрузчики в {CACHED_LOADER}.',
+                id='pages.W002',
+            ))
+        if options.get('debug', settings.DEBUG):
+            warnings.append(Warning(
+                'Шаблоны компилируются с отладочной информацией.',
+                hint="'debug': False в OPTIONS шаблонов (по умолчанию берётся DEBUG).",
+                id='pages.W003',
+            ))
+
+    for alias, database in settings.DATABASES.items():
+        if database['ENGINE'] != 'django.db.backends.sqlite3' and not database.get('CONN_MAX_AGE'):
+            warnings.append(Warning(
+                f'БД {alias!r}: соединение открывается заново на каждый запрос.',
+                hint='Задайте CONN_MAX_AGE (DB_CONN_MAX_AGE) и CONN_HEALTH_CHECKS.',
+                id='pages.W004',
+            ))
+
+    for alias, cache in settings.CACHES.items():
+        if cache['BACKEND'] in PROCESS_LOCAL_CACHES:
+            warnings.append(Warning(
+                f'Кеш {alias!r} ({cache["BACKEND"].rsplit(".", 1)[1]}) у каждого воркера свой: '
+                'сессии cached_db и ограничение частоты не видят друг друга, '
+                'кеш пользователя (AUTH_USER_CACHE) устаревает.',
+                hint='Задайте REDIS_URL.',
+                id='pages.W005',
+            ))
+
+    if settings.FILE_UPLOAD_MAX_MEMORY_SIZE > UPLOAD_MEMORY_LIMIT:
+        warnings.append(Warning(
+            f'Загрузки до {settings.FILE_UPLOAD_MAX_MEMORY_SIZE // 1024} КБ держатся в памяти воркера.',
+            hint=f'FILE_UPLOAD_MAX_MEMORY_SIZE не больше {UPLOAD_MEMORY_LIMIT // 1024} КБ.',
+            id='pages.W006',
+        ))
+    if settings.DATA_UPLOAD_MAX_MEMORY_SIZE is None:
+        warnings.append(Warning(
+            'Размер тела запроса не ограничен (DATA_UPLOAD_MAX_MEMORY_SIZE = None).',
+            id='pages.W007',
+        ))
+
+    # без общего кеша db — правильный выбор: cached_db в памяти процесса
+    # не видит выхода из аккаунта в других воркерах
+    if (settings.SESSION_ENGINE == 'django.contrib.sessions.backends.db'
+            and settings.CACHES['default']['BACKEND'] not in PROCESS_LOCAL_CACHES):
+        warnings.append(Warning(
+            'Общий кеш настроен, но сессия читается из БД на каждый запрос.',
+            hint="SESSION_MODE='cached_db'.",
+            id='pages.W008',
+        ))
+    return warnings
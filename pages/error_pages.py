@@ -0,0 +1,79 @@
+# pages/error_pages.py
+# Страницы ошибок 403, 404 и 500 отрисовываются заранее (manage.py
+# render_error_pages после collectstatic) и отдаются обработчиками из памяти:
+# при сбое БД или шаблонов ответ об ошибке не должен зависеть от того же, что сломалось.
+# Страницы рисуются для анонимного посетителя. Адрес запрошенной страницы в 404
+# подставляется при ответе вместо метки.
+import logging
+from pathlib import Path
+
+from django.conf import settings
+from django.http import HttpResponse
+from django.template.loader import render_to_string
+from django.utils.html import escape
+
+logger = logging.getLogger(__name__)
+
+ERROR_PAGES = {
+    403: 'pages/403csrf.html',
+    404: 'pages/404.html',
+    500: 'pages/500.html',
+}
+REQUEST_URL_MARK = '%%request_url%%'
+# если нет ни файла, ни рабочих шаблонов
+FALLBACK = '<!DOCTYPE html><html lang="ru"><head><meta charset="UTF-8"><title>{0}</title></head><body><h1>{0}</h1></body></html>'
+FALLBACK_TITLES = {403: 'Доступ запрещён', 404: 'Страница не найдена', 500: 'Ошибка сервера'}
+
+_pages = {}
+
+
+def page_path(status):
+    return Path(settings.ERROR_PAGES_ROOT) / f'{status}.html'
+
+
+def render_page(status):
+    return render_to_string(ERROR_PAGES[status], {'request_url': REQUEST_URL_MARK})
+
+
+def render_all():
+    # Записывает страницы в ERROR_PAGES_ROOT; {код: (путь, байт)}
+    Path(settings.ERROR_PAGES_ROOT).mkdir(parents=True, exist_ok=True)
+    written = {}
+    for status in ERROR_PAGES:
+        data = render_page(status).encode()
+        page_path(status).write_bytes(data)
+        written[status] = (page_path(status), len(data))
+    _pages.clear()
+    return written
+
+
+def load(status):
+    # HTML страницы: из памяти, при первом обращении — из файла, если файла
+    # нет — отрисовка шаблона. Запасная страница в памяти не запоминается:
+    # когда шаблоны починят, следующий ответ будет уже полноценным.
+    page = _pages.get(status)
+    if page is not None:
+        return page
+    try:
+        page = page_path(status).read_text(encoding='utf-8')
+    except OSError:
+        try:
+            page = render_page(status)
+        except Exception:
+            logger.exception('Страница ошибки %s не отрисовывается', status)
+            return FALLBACK.format(FALLBACK_TITLES[status])
+    _pages[status] = page
+    return page
+
+
+def load_all():
+    for status in ERROR_PAGES:
+        load(status)
+    return len(_pages)
+
+
+def response(status, request=None):
+    page = load(status)
+    if REQUEST_URL_MARK in page:
+        page = page.replace(REQUEST_URL_MARK, escape(request.build_absolute_uri()) if request else '')
+    return HttpResponse(page, status=status)
@@ -0,0 +1,239 @@
+# pages/staticfiles.py
+# Сборка статики: collectstatic сжимает CSS и JS и раскладывает файлы с хешем
+# содержимого в имени (style.3f2a9c1b7e4d.css), {% static %} берёт имена из манифеста.
+# Раз имя меняется вместе с содержимым, такие файлы можно кешировать в браузере
+# навсегда; serve отдаёт их с Cache-Control: immutable, если статику отдаёт Django.
+# PNG пережимаются без потерь, JPEG — с исходными таблицами квантования,
+# favicon.ico — только в нужных браузерам размерах.
+# Рядом с каждым файлом с хешем в имени пишутся варианты: .gz и .br для текста, .webp и .avif
+# для картинок (если они меньше исходника); serve выбирает самый лёгкий из тех,
+# что принимает клиент.
+import gzip
+import io
+import os
+import posixpath
+import re
+
+from django.conf import settings
+from django.contrib.staticfiles import finders
+from django.contrib.staticfiles.storage import ManifestStaticFilesStorage, staticfiles_storage
+from django.core.files.base import ContentFile
+from django.utils.cache import patch_vary_headers
+from django.views import static
+from PIL import Image, features
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# хеш, который ManifestStaticFilesStorage вставляет перед расширением
+HASHED_NAME_RE = re.compile(r'\.[0-9a-f]{12}\.[^./]+$')
+IMMUTABLE = 'public, max-age=31536000, immutable'
+# файлы без хеша (favicon.ico по прямой ссылке) могут измениться под тем же именем
+REVALIDATE = 'public, max-age=3600'
+
+IMAGE_EXTENSIONS = {'.png', '.jpg', '.jpeg', '.ico'}
+# для каких изображений делаются WebP и AVIF
+VARIANT_EXTENSIONS = {'.png', '.jpg', '.jpeg'}
+TEXT_EXTENSIONS = {'.css', '.js', '.svg', '.txt', '.json'}
+# размеры внутри favicon.ico: 16 и 32 — вкладки и закладки, 48 — ярлыки Windows
+FAVICON_SIZES = (16, 32, 48)
+# вариант сохраняется, только если он меньше исходника хотя бы на столько
+MIN_SAVING = 0.05
+
+
+def minify_css(text):
+    text = re.sub(r'/\*.*?\*/', '', text, flags=re.S)
+    text = re.sub(r'\s+', ' ', text)
+    # пробел перед ':' не трогаем: «a :hover» и «a:hover» — разные селекторы
+    text = re.sub(r'\s*([{};,>])\s*', r'\1', text)
+    text = re.sub(r':\s+', ':', text)
+    return text.replace(';}', '}').strip()
+
+
+def minify_js(text):
+    # Только безопасные преобразования: отступы, пустые строки и строки-комментарии.
+    # Переводы строк остаются — на них держится автоматическая вставка точек с запятой.
+    lines = (line.strip() for line in text.splitlines())
+    return '\n'.join(line for line in lines if line and not line.startswith('//')) + '\n'
+
+
+MINIFIERS = {'.css': minify_css, '.js': minify_js}
+
+
+def optimize_image(data):
+    # Пережимает изображение в том же формате (определяется по содержимому, а не
+    # по расширению); None — если меньше не стало.
+    try:
+        image = Image.open(io.BytesIO(data))
+        output = io.BytesIO()
+        options = {'icc_profile': image.info['icc_profile']} if 'icc_profile' in image.info else {}
+        if image.format == 'PNG':
+            image.save(output, 'PNG', optimize=True, **options)
+        elif image.format == 'JPEG':
+            if image.getexif().get(0x0112, 1) != 1:
+                # поворот задан в EXIF, а метаданные в новый файл не переносятся
+                return None
+            # Те же таблицы квантования, что у исходника: качество не падает заметно,
+            # но это повторное сжатие декодированных пикселей, а не преобразование
+            # без потерь, как у jpegtran — пиксели могут немного измениться.
+            image.save(output, 'JPEG', quality='keep', optimize=True, progressive=True, **options)
+        elif image.format == 'ICO':
+            sizes = [(size, size) for size in FAVICON_SIZES if size <= max(image.size)]
+            image.save(output, 'ICO', sizes=sizes)
+        else:
+            return None
+    except (OSError, ValueError, SyntaxError):
+        return None
+    result = output.getvalue()
+    return result if len(result) < len(data) else None
+
+
+def optimize(name, data):
+    # содержимое файла name в том виде, в каком его запишет collectstatic
+    extension = posixpath.splitext(name)[1].lower()
+    if extension in MINIFIERS:
+        return MINIFIERS[extension](data.decode()).encode()
+    if extension in IMAGE_EXTENSIONS:
+        return optimize_image(data) or data
+    return data
+
+
+def image_variants(data):
+    # {суффикс: байты} WebP и AVIF для PNG и JPEG
+    try:
+        image = Image.open(io.BytesIO(data))
+        image.load()
+    except (OSError, ValueError, SyntaxError):
+        return {}
+    if image.format not in ('PNG', 'JPEG'):
+        return {}
+    variants = {}
+    # PNG — рисунки и логотипы, их переводим в WebP без потерь; фото — с качеством 90
+    webp = {'lossless': True} if image.format == 'PNG' else {'quality': 90}
+    formats = [('.webp', 'WEBP', webp)]
+    if features.check('avif'):
+        formats.append(('.avif', 'AVIF', {'quality': 80}))
+    for suffix, target, options in formats:
+        output = io.BytesIO()
+        image.save(output, target, **options)
+        variants[suffix] = output.getvalue()
+    return variants
+
+
+def text_variants(data):
+    variants = {'.gz': gzip.compress(data, 9, mtime=0)}
+    if brotli is not None:
+        variants['.br'] = brotli.compress(data, quality=11)
+    return variants
+
+
+class MinifiedManifestStaticFilesStorage(ManifestStaticFilesStorage):
+    # Минификация и пережатие при записи в STATIC_ROOT: хеш в имени считается
+    # уже по итоговому файлу. Варианты для serve пишутся после раскладки по хешам.
+
+    def _save(self, name, content):
+        extension = posixpath.splitext(name)[1].lower()
+        if extension in MINIFIERS or extension in IMAGE_EXTENSIONS:
+            content.seek(0)
+            content = ContentFile(optimize(name, content.read()))
+        return super()._save(name, content)
+
+    def post_process(self, paths, dry_run=False, **options):
+        yield from super().post_process(paths, dry_run, **options)
+        if dry_run:
+            return
+        # только для файлов с хешем: по ним ссылается {% static %}, а копии без
+        # хеша нужны лишь прямым ссылкам, и варианты для них удвоили бы STATIC_ROOT
+        for name in set(self.hashed_files.values()):
+            self.write_variants(name)
+
+    def write_variants(self, name):
+        extension = posixpath.splitext(name)[1].lower()
+        if extension in TEXT_EXTENSIONS:
+            make = text_variants
+        elif extension in VARIANT_EXTENSIONS:
+            make = image_variants
+        else:
+            return
+        path = self.path(name)
+        with open(path, 'rb') as f:
+            data = f.read()
+        for suffix, variant in make(data).items():
+            if len(variant) <= len(data) * (1 - MIN_SAVING):
+                with open(path + suffix, 'wb') as f:
+                    f.write(variant)
+            elif os.path.exists(path + suffix):
+                # от прошлой сборки мог остаться вариант, который теперь не нужен
+                os.remove(path + suffix)
+
+
+def accepted(header):
+    # значения заголовка Accept / Accept-Encoding, кроме запрещённых через q=0
+    values = set()
+    for item in header.split(','):
+        value, _, params = item.strip().partition(';')
+        if not re.search(r'q=0(\.0*)?\s*$', params.strip()):
+            values.add(value.strip().lower())
+    return values
+
+
+def negotiate(request, path):
+    # (путь к файлу в STATIC_ROOT, заголовок для Vary): самый лёгкий вариант из тех,
+    # что принимает клиент. */* не в счёт: так пишут и браузеры без WebP.
+    extension = posixpath.splitext(path)[1].lower()
+    if extension in TEXT_EXTENSIONS:
+        vary, offered = 'Accept-Encoding', accepted(request.headers.get('Accept-Encoding', ''))
+        candidates = [suffix for suffix, coding in (('.br', 'br'), ('.gz', 'gzip')) if coding in offered]
+    elif extension in VARIANT_EXTENSIONS:
+        vary, offered = 'Accept', accepted(request.headers.get('Accept', ''))
+        candidates = [suffix for suffix in ('.avif', '.webp') if f'image/{suffix[1:]}' in offered]
+    else:
+        return path, None
+    best, best_size = path, None
+    for suffix in candidates:
+        try:
+            size = os.path.getsize(os.path.join(settings.STATIC_ROOT, path + suffix))
+        except OSError:
+            continue
+        if best_size is None or size < best_size:
+            best, best_size = path + suffix, size
+    return best, vary
+
+
+def serve(request, path):
+    # Статика из STATIC_ROOT, когда перед Django нет веб-сервера (STATIC_SERVE).
+    # С nginx то же самое делают gzip_static/brotli_static и add_header Cache-Control.
+    chosen, vary = negotiate(request, path)
+    # Content-Type и Content-Encoding static.serve берёт по имени выбранного файла:
+    # style.css.br — text/css + br, logo.png.webp — image/webp
+    response = static.serve(request, chosen, document_root=settings.STATIC_ROOT)
+    response['Cache-Control'] = IMMUTABLE if HASHED_NAME_RE.search(path) else REVALIDATE
+    if vary:
+        patch_vary_headers(response, [vary])
+    return response
+
+
+def static_size(url):
+    # Сколько байт отдаётся по адресу статики (без сжатия, gzip). До collectstatic
+    # файл берётся из исходников и сжимается так же, как это сделает collectstatic.
+    name = url[len(settings.STATIC_URL):].split('?')[0]
+    if settings.STATIC_ROOT and staticfiles_storage.exists(name):
+        with staticfiles_storage.open(name) as f:
+            data = f.read()
+    else:
+        with open(finders.find(name), 'rb') as f:
+            data = f.read()
+        if isinstance(staticfiles_storage, MinifiedManifestStaticFilesStorage):
+            data = optimize(name, data)
+    return len(data), len(gzip.compress(data))
+
+
+def page_weight(html):
+    # {'html': (байт, gzip), 'static': (байт, gzip)} для страницы и подключённой ею статики
+    urls = set(re.findall(r'(?:href|src)="(%s[^"]+)"' % re.escape(settings.STATIC_URL), html))
+    sizes = [static_size(url) for url in urls]
+    data = html.encode()
+    return {'html': (len(data), len(gzip.compress(data))),
+            'static': (sum(raw for raw, _ in sizes), sum(packed for _, packed in sizes))}
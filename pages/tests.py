@@ -1,3 +1,167 @@
-from django.test import TestCase
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+from types import SimpleNamespace
+from unittest import mock
 
-# Create your tests here.
+from cryptography.fernet import Fernet
+from django.conf import settings
+from django.core import checks as django_checks
+from django.template import TemplateDoesNotExist
+from django.test import RequestFactory, SimpleTestCase, TestCase, override_settings
+
+from site_bw.testing import PLAIN_STATIC
+
+from . import checks, error_pages
+
+
+class ErrorPagesTests(TestCase):
+
+    def setUp(self):
+        root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, root)
+        override = override_settings(ERROR_PAGES_ROOT=root, STORAGES=PLAIN_STATIC)
+        override.enable()
+        self.addCleanup(override.disable)
+        error_pages._pages.clear()
+        self.addCleanup(error_pages._pages.clear)
+
+    def test_page_from_file_with_escaped_url(self):
+        error_pages.page_path(404).write_text(f'<p>{error_pages.REQUEST_URL_MARK}</p>', encoding='utf-8')
+        request = RequestFactory().get('/missing/', {'a': 1, 'b': 2})
+        with self.assertNumQueries(0):
+            response = error_pages.response(404, request)
+        self.assertEqual(response.status_code, 404)
+        self.assertEqual(response.content.decode(),
+                         '<p>http://testserver/missing/?a=1&amp;b=2</p>')
+        # без запроса метка просто убирается
+        self.assertEqual(error_pages.response(404).content, b'<p></p>')
+
+    def test_pages_are_kept_in_memory(self):
+        error_pages.page_path(500).write_text('first', encoding='utf-8')
+        self.assertEqual(error_pages.response(500).content, b'first')
+        error_pages.page_path(500).write_text('second', encoding='utf-8')
+        self.assertEqual(error_pages.response(500).content, b'first')
+
+    def test_missing_file_is_rendered_from_template(self):
+        response = error_pages.response(403)
+        self.assertEqual(response.status_code, 403)
+        self.assertEqual(response.content.decode(), error_pages.render_page(403))
+        self.assertIn(403, error_pages._pages)
+
+    def test_fallback_when_templates_are_broken(self):
+        with mock.patch.object(error_pages, 'render_page', side_effect=TemplateDoesNotExist('500.html')), \
+                self.assertLogs('pages.error_pages', 'ERROR'):
+            response = error_pages.response(500)
+        self.assertEqual(response.status_code, 500)
+        self.assertIn('Ошибка сервера', response.content.decode())
+        # запасная страница не запоминается
+        self.assertNotIn(500, error_pages._pages)
+
+    def test_render_all_writes_files_and_resets_memory(self):
+        error_pages._pages[404] = 'stale'
+        written = error_pages.render_all()
+        self.assertEqual(set(written), set(error_pages.ERROR_PAGES))
+        for status, (path, size) in written.items():
+            self.assertEqual(path.stat().st_size, size)
+        self.assertEqual(error_pages._pages, {})
+        self.assertIn(error_pages.REQUEST_URL_MARK, error_pages.load(404))
+
+    @override_settings(DEBUG=False)
+    def test_handler404(self):
+        error_pages.page_path(404).write_text(f'nothing at {error_pages.REQUEST_URL_MARK}', encoding='utf-8')
+        response = self.client.get('/no-such-page/')
+        self.assertEqual(response.status_code, 404)
+        self.assertEqual(response.content, b'nothing at http://testserver/no-such-page/')
+
+
+# настройки, на которых проверки производительности молчат: как в профиле production
+# с REDIS_URL и PostgreSQL
+PRODUCTION = {
+    'DEBUG': False,
+    'TEMPLATES': [{
+        'BACKEND': 'django.template.backends.django.DjangoTemplates',
+        'OPTIONS': {'debug': False, 'loaders': [
+            (checks.CACHED_LOADER, ['django.template.loaders.app_directories.Loader'])]},
+    }],
+    'DATABASES': {'default': {'ENGINE': 'django.db.backends.postgresql', 'CONN_MAX_AGE': 60}},
+    'CACHES': {'default': {'BACKEND': 'django.core.cache.backends.redis.RedisCache'}},
+    'SESSION_ENGINE': 'django.contrib.sessions.backends.cached_db',
+    'FILE_UPLOAD_MAX_MEMORY_SIZE': 1024 * 1024,
+    'DATA_UPLOAD_MAX_MEMORY_SIZE': 2 * 1024 * 1024,
+}
+LOCMEM = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}}
+
+
+class PerformanceChecksTests(SimpleTestCase):
+
+    def warnings(self, **overrides):
+        # проверка читает только settings модуля checks: подменяем его целиком,
+        # чтобы не трогать DATABASES и CACHES самого теста
+        with mock.patch.object(checks, 'settings', SimpleNamespace(**dict(PRODUCTION, **overrides))):
+            return [warning.id for warning in checks.check_performance_settings(None)]
+
+    def template_options(self, **options):
+        return [dict(PRODUCTION['TEMPLATES'][0], OPTIONS=dict(PRODUCTION['TEMPLATES'][0]['OPTIONS'], **options))]
+
+    def test_quiet_under_production_settings(self):
+        self.assertEqual(self.warnings(), [])
+        # sqlite без CONN_MAX_AGE: соединение с файлом дёшево
+        self.assertEqual(self.warnings(DATABASES={'default': {'ENGINE': 'django.db.backends.sqlite3'}}), [])
+        # без loaders Django сам кеширует шаблоны
+        self.assertEqual(self.warnings(TEMPLATES=[{'OPTIONS': {'debug': False}}]), [])
+
+    def test_debug(self):
+        # DEBUG заодно включает отладку шаблонов, если она не задана явно
+        self.assertEqual(self.warnings(DEBUG=True), ['pages.W001'])
+        self.assertEqual(self.warnings(DEBUG=True, TEMPLATES=[{}]), ['pages.W001', 'pages.W003'])
+
+    def test_template_loaders_without_cache(self):
+        self.assertEqual(self.warnings(TEMPLATES=self.template_options(
+            loaders=['django.template.loaders.filesystem.Loader'])), ['pages.W002'])
+        self.assertEqual(self.warnings(TEMPLATES=self.template_options(
+            loaders=[checks.CACHED_LOADER])), [])
+
+    def test_template_debug(self):
+        self.assertEqual(self.warnings(TEMPLATES=self.template_options(debug=True)), ['pages.W003'])
+
+    def test_database_without_persistent_connections(self):
+        self.assertEqual(self.warnings(DATABASES={'default': {'ENGINE': 'django.db.backends.postgresql'}}),
+                         ['pages.W004'])
+
+    def test_process_local_cache(self):
+        # без общего кеша сессии в БД — правильный выбор, W008 молчит
+        self.assertEqual(self.warnings(CACHES=LOCMEM, SESSION_ENGINE='django.contrib.sessions.backends.db'),
+                         ['pages.W005'])
+        self.assertEqual(self.warnings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.dummy.DummyCache'}},
+                                       SESSION_ENGINE='django.contrib.sessions.backends.db'), ['pages.W005'])
+
+    def test_upload_memory_limits(self):
+        self.assertEqual(self.warnings(FILE_UPLOAD_MAX_MEMORY_SIZE=checks.UPLOAD_MEMORY_LIMIT), [])
+        self.assertEqual(self.warnings(FILE_UPLOAD_MAX_MEMORY_SIZE=checks.UPLOAD_MEMORY_LIMIT + 1), ['pages.W006'])
+        self.assertEqual(self.warnings(DATA_UPLOAD_MAX_MEMORY_SIZE=None), ['pages.W007'])
+
+    def test_session_read_from_db_with_shared_cache(self):
+        self.assertEqual(self.warnings(SESSION_ENGINE='django.contrib.sessions.backends.db'), ['pages.W008'])
+        self.assertEqual(self.warnings(SESSION_ENGINE='django.contrib.sessions.backends.signed_cookies'), [])
+
+    def test_only_with_deploy(self):
+        # при разработке DEBUG и кеш в памяти — норма: без --deploy проверка не запускается
+        self.assertEqual([message.id for message in django_checks.run_checks(tags=['performance'])], [])
+
+    def test_production_profile(self):
+        env = {**os.environ, 'DJANGO_SETTINGS_MODULE': 'site_bw.settings', 'DJANGO_ENV': 'production',
+               'SECRET_KEY': 'test', 'FIELD_ENCRYPTION_KEYS': Fernet.generate_key().decode(),
+               'BLIND_INDEX_KEY': 'test', 'REDIS_URL': 'redis://cache:6379/0'}
+        env.pop('SESSION_MODE', None)
+        command = [sys.executable, 'manage.py', 'check', '--deploy', '--tag', 'performance']
+        result = subprocess.run(command, cwd=settings.BASE_DIR, env=env, capture_output=True, text=True)
+        self.assertEqual(result.returncode, 0, result.stderr)
+        self.assertNotIn('pages.W', result.stdout + result.stderr)
+        # без REDIS_URL остаётся кеш в памяти процесса
+        result = subprocess.run(command, cwd=settings.BASE_DIR, env=dict(env, REDIS_URL=''),
+                                capture_output=True, text=True)
+        self.assertIn('pages.W005', result.stderr)
+        self.assertNotIn('pages.W001', result.stderr)
@@ -1,26 +1,42 @@
 # pages/views.py
-from django.shortcuts import render
 from django.views.generic import TemplateView
 
+from . import error_pages
 
-class NewsPageView(TemplateView):
+
+class AsyncTemplateView(TemplateView):
+    # TemplateView с асинхронным get: под ASGI обрабатывается в цикле событий,
+    # без переключения в поток через sync_to_async.
+    # Пользователь загружается асинхронным ORM до рендера, чтобы шаблон
+    # не обращался к базе через ленивый request.user.
+
+    async def get(self, request, *args, **kwargs):
+        request.user = await request.auser()
+        context = self.get_context_data(**kwargs)
+        return self.render_to_response(context)
+
+
+class NewsPageView(AsyncTemplateView):
     template_name = "pages/news_page.html"
 
 
-class AboutPageView(TemplateView):
+class AboutPageView(AsyncTemplateView):
     template_name = "pages/home_page.html"
 
 
+# Обработчики ошибок отдают заранее отрисованные страницы из памяти (pages.error_pages)
 def handler403(request, exception):
-    template = "pages/403csrf.html"
-    return render(request, template, status=403)
+    return error_pages.response(403)
 
 
 def handler404(request, exception):
-    template = "pages/404.html"
-    return render(request, template, status=404)
+    return error_pages.response(404, request)
 
 
 def handler500(request):
-    template = "pages/500.html"
-    return render(request, template, status=500)
+    return error_pages.response(500)
+
+
+def csrf_failure(request, reason=''):
+    # CSRF_FAILURE_VIEW: та же страница 403, без шаблонов и БД
+    return error_pages.response(403)
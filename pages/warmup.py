@@ -0,0 +1,91 @@
+# pages/warmup.py
+# Прогрев процесса до первого запроса. Иначе первый запрос после перезапуска
+# компилирует каждый встреченный шаблон, разбирает все URL-шаблоны, загружает
+# каталоги переводов и манифест статики — и заметно медленнее остальных.
+# Сюда же — загрузка в память заранее отрисованных страниц ошибок.
+# Вызывается из wsgi.py и asgi.py (WARMUP_ON_STARTUP) и командой manage.py warmup.
+import logging
+import os
+import time
+
+from django.conf import settings
+from django.contrib.staticfiles.storage import staticfiles_storage
+from django.template import TemplateSyntaxError, engines
+from django.urls import URLResolver, get_resolver
+from django.utils import translation
+
+from . import error_pages
+
+logger = logging.getLogger(__name__)
+
+
+def template_names(engine):
+    # имена всех файлов в каталогах, где ищут загрузчики: DIRS и templates/ приложений
+    directories = []
+    for loader in engine.engine.template_loaders:
+        for inner in getattr(loader, 'loaders', [loader]):
+            directories.extend(inner.get_dirs())
+    names = set()
+    for directory in directories:
+        for root, _, files in os.walk(directory):
+            for name in files:
+                names.add(os.path.relpath(os.path.join(root, name), directory).replace(os.sep, '/'))
+    return sorted(names)
+
+
+def warm_templates():
+    # Компилирует шаблоны в кеш cached.Loader. Возвращает (число, [(имя, ошибка)]).
+    count, errors = 0, []
+    for engine in engines.all():
+        if not hasattr(engine, 'engine'):
+            continue
+        for name in template_names(engine):
+            try:
+                engine.get_template(name)
+                count += 1
+            except (TemplateSyntaxError, UnicodeDecodeError) as error:
+                errors.append((name, error))
+    return count, errors
+
+
+def warm_urls(resolver=None):
+    # Разбирает URL-шаблоны и словари для reverse() во всех include и пространствах имён
+    resolver = resolver or get_resolver()
+    resolver.reverse_dict
+    count = 0
+    for pattern in resolver.url_patterns:
+        # регулярные выражения компилируются при первом обращении
+        pattern.pattern.regex
+        if isinstance(pattern, URLResolver):
+            count += warm_urls(pattern)
+        else:
+            count += 1
+    return count
+
+
+def warm_up():
+    # {шаг: (сколько обработано, секунд)} и список ошибок компиляции шаблонов
+    timings = {}
+
+    started = time.perf_counter()
+    translation.activate(settings.LANGUAGE_CODE)
+    timings['translations'] = (1, time.perf_counter() - started)
+
+    started = time.perf_counter()
+    timings['urls'] = (warm_urls(), time.perf_counter() - started)
+
+    started = time.perf_counter()
+    count, errors = warm_templates()
+    timings['templates'] = (count, time.perf_counter() - started)
+
+    started = time.perf_counter()
+    # ManifestStaticFilesStorage читает манифест при создании
+    staticfiles_storage.base_location
+    timings['staticfiles'] = (1, time.perf_counter() - started)
+
+    started = time.perf_counter()
+    timings['error_pages'] = (error_pages.load_all(), time.perf_counter() - started)
+
+    for name, error in errors:
+        logger.warning('Шаблон %s не компилируется: %s', name, error)
+    return timings, errors
@@ -1,12 +1,20 @@
 from django.contrib import admin
+from django.db import transaction
+from django.db.models import Q
+from django.urls import reverse
+from django.utils.html import format_html_join
 from django.utils.safestring import mark_safe
-from .models import Profile, Profile_address
+from .models import Profile, Profile_address, QueueEntry, PaymentSchedule, Payment, DebtSummary, DocumentHash
+from .housing_queue import next_value, queue_index
+from .document_hashes import document_hash_index
+from .crypto import blind_index
 
 @admin.register(Profile)
 class ProfileAdmin(admin.ModelAdmin):
     list_display = ['user', 'surname', 'phone', 'document_type', 'id_document', 'inn', 'get_document_photo']
-    list_filter = ['document_type', 'type_of_purchase', 'can_edit']
-    search_fields = ['user__email', 'user__first_name', 'user__last_name', 'surname', 'phone', 'inn']
+    list_filter = ['document_type', 'type_of_purchase', 'can_edit', 'debt_summary__has_debt']
+    # телефон, ИНН и паспорт зашифрованы — их ищем по слепым индексам в get_search_results
+    search_fields = ['user__email', 'user__first_name', 'user__last_name', 'surname']
     readonly_fields = ['get_document_photo_preview']
     fieldsets = (
         ('Основная информация', {
@@ -26,6 +34,13 @@ class ProfileAdmin(admin.ModelAdmin):
         }),
     )
     
+    def get_search_results(self, request, queryset, search_term):
+        results, may_have_duplicates = super().get_search_results(request, queryset, search_term)
+        digest = blind_index(search_term)
+        if digest:
+            results |= queryset.filter(Q(phone_bidx=digest) | Q(inn_bidx=digest) | Q(id_document_bidx=digest))
+        return results, may_have_duplicates
+
     def get_document_photo(self, obj):
         if obj.document_photo:
             return "Есть фото"
@@ -58,4 +73,103 @@ class ProfileAddressAdmin(admin.ModelAdmin):
                 'act_apartament', 'act_postal_code', 'is_approved'
             )
         }),
-    )
\ No newline at end of file
+    )
+
+@admin.register(QueueEntry)
+class QueueEntryAdmin(admin.ModelAdmin):
+    list_display = ['user', 'order_key', 'get_position', 'joined_at', 'left_at']
+    list_filter = ['left_at']
+    search_fields = ['user__email']
+    # ключ выдаёт только join_queue: он же номер ячейки в индексе очереди
+    readonly_fields = ['order_key', 'revision']
+
+    def changelist_view(self, request, extra_context=None):
+        # индекс догружается один раз на страницу, а не на каждую строку
+        queue_index.sync()
+        return super().changelist_view(request, extra_context)
+
+    def get_position(self, obj):
+        # позиция берётся из индекса очереди, без подсчёта по таблице
+        return queue_index.position(obj.user_id, sync=False) or '—'
+    get_position.short_description = 'Место в очереди'
+
+    def save_model(self, request, obj, form, change):
+        # новый номер изменения — чтобы индексы других процессов увидели правку
+        with transaction.atomic():
+            if not change:
+                obj.order_key = next_value('order_key')
+            obj.revision = next_value('revision')
+            super().save_model(request, obj, form, change)
+
+
+@admin.register(PaymentSchedule)
+class PaymentScheduleAdmin(admin.ModelAdmin):
+    list_display = ['profile', 'monthly_payment', 'updated_at']
+    search_fields = ['profile__user__email']
+    readonly_fields = ['version', 'rows', 'updated_at']
+
+
+@admin.register(Payment)
+class PaymentAdmin(admin.ModelAdmin):
+    list_display = ['profile', 'amount', 'paid_at']
+    list_filter = ['paid_at']
+    search_fields = ['profile__user__email']
+    raw_id_fields = ['profile']
+
+
+@admin.register(DebtSummary)
+class DebtSummaryAdmin(admin.ModelAdmin):
+    list_display = ['profile', 'expected', 'paid', 'debt', 'next_due_date', 'computed_at']
+    list_filter = ['has_debt']
+    search_fields = ['profile__user__email']
+    ordering = ['-debt']
+    readonly_fields = ['expected', 'paid', 'debt', 'has_debt', 'next_due_date', 'computed_at']
+
+
+class HasMatchesFilter(admin.SimpleListFilter):
+    title = 'Совпадения с другими участниками'
+    parameter_name = 'has_matches'
+
+    def lookups(self, request, model_admin):
+        return [('yes', 'Есть'), ('no', 'Нет')]
+
+    def queryset(self, request, queryset):
+        if self.value() == 'yes':
+            return queryset.filter(matches__gt=0)
+        if self.value() == 'no':
+            return queryset.filter(matches=0)
+        return queryset
+
+
+@admin.register(DocumentHash)
+class DocumentHashAdmin(admin.ModelAdmin):
+    # отчёт для проверки на мошенничество: одно фото документа у нескольких участников
+    list_display = ['profile', 'matches', 'get_similar', 'updated_at']
+    list_filter = [HasMatchesFilter]
+    search_fields = ['profile__user__email']
+    ordering = ['-matches', '-updated_at']
+    readonly_fields = ['profile', 'file_name', 'phash', 'matches', 'updated_at', 'get_similar']
+
+    def has_add_permission(self, request):
+        return False
+
+    def changelist_view(self, request, extra_context=None):
+        # индекс догружается один раз на страницу, а не на каждую строку
+        document_hash_index.sync()
+        return super().changelist_view(request, extra_context)
+
+    def change_view(self, request, object_id, form_url='', extra_context=None):
+        document_hash_index.sync()
+        return super().change_view(request, object_id, form_url, extra_context)
+
+    def get_similar(self, obj):
+        # похожие фото ищутся в индексе в памяти, без перебора таблицы
+        similar = document_hash_index.similar(obj.phash, exclude=obj.profile_id, sync=False)
+        if not similar:
+            return '—'
+        profiles = Profile.objects.select_related('user').in_bulk(similar)
+        return format_html_join(
+            mark_safe('<br>'), '<a href="{}">{}</a> (отличие {} бит)',
+            ((reverse('admin:personal_account_profile_change', args=[pk]), profiles[pk].user.email, distance)
+             for pk, distance in sorted(similar.items(), key=lambda item: item[1]) if pk in profiles))
+    get_similar.short_description = 'Похожие документы'
@@ -5,3 +5,7 @@ class PersonalAccountConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'personal_account'
 
+    def ready(self):
+        # регистрация сигналов очереди, уведомлений, хешей фото документов,
+        # долгов и сброса кеша пользователей
+        from . import auth_backends, debts, document_hashes, housing_queue, notifications  # noqa: F401
@@ -0,0 +1,127 @@
+# personal_account/auth_backends.py
+# Бэкенд аутентификации с кешем пользователя. ModelBackend на каждый запрос
+# залогиненного пользователя читает auth_user, а страницы кабинета затем ещё
+# profile и profile_address. Здесь пользователь вместе с профилем и адресом кладётся
+# в кеш (CACHES['default']) на время жизни сессии и сбрасывается при любом сохранении
+# или удалении User, Profile, Profile_address — в том числе при смене пароля и входе
+# (last_login), так что проверка хеша сессии не устаревает. Группы и права в кеш
+# не попадают и, как и раньше, читаются из БД при проверке прав.
+# Изменения через QuerySet.update() сигналов не дают — после них вызывайте forget_users().
+# Включается настройкой AUTH_USER_CACHE.
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.contrib.auth.backends import ModelBackend
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .crypto import decrypt, encrypt
+from .fields import EncryptedCharField
+from .models import Profile, Profile_address
+
+UserModel = get_user_model()
+
+CACHE_KEY = 'auth-user:{}'
+RELATED = ('profile', 'profile_address')
+
+
+def cache_key(user_id):
+    return CACHE_KEY.format(user_id)
+
+
+def _encrypted_fields():
+    return [f.attname for f in Profile._meta.concrete_fields if isinstance(f, EncryptedCharField)]
+
+
+def _cached_profile(user):
+    # профиль, загруженный select_related, или None
+    profile = user._state.fields_cache.get('profile')
+    return profile if isinstance(profile, Profile) else None
+
+
+@contextmanager
+def _encrypted(user):
+    # Персональные данные профиля в БД зашифрованы — в кеше (Redis) они тоже
+    # лежат шифротекстом. Кеш сериализует объект сразу в set(), после чего
+    # исходные значения возвращаются на место.
+    profile = _cached_profile(user)
+    plain = {name: getattr(profile, name) for name in _encrypted_fields()} if profile else {}
+    for name, value in plain.items():
+        setattr(profile, name, encrypt(value))
+    try:
+        yield user
+    finally:
+        for name, value in plain.items():
+            setattr(profile, name, value)
+
+
+def _store(user):
+    with _encrypted(user):
+        cache.set(cache_key(user.pk), user, settings.SESSION_COOKIE_AGE)
+
+
+async def _astore(user):
+    with _encrypted(user):
+        await cache.aset(cache_key(user.pk), user, settings.SESSION_COOKIE_AGE)
+
+
+def _restore(user):
+    profile = _cached_profile(user)
+    if profile:
+        for name in _encrypted_fields():
+            setattr(profile, name, decrypt(getattr(profile, name)))
+    return user
+
+
+def forget_users(user_ids):
+    keys = [cache_key(user_id) for user_id in user_ids]
+    cache.delete_many(keys)
+    # до фиксации транзакции параллельный запрос ещё может положить в кеш
+    # старые данные — удаляем повторно после неё
+    transaction.on_commit(lambda: cache.delete_many(keys))
+
+
+class CachedModelBackend(ModelBackend):
+    # Вход и права — как у ModelBackend, отличается только загрузка пользователя сессии
+
+    def get_user(self, user_id):
+        user = cache.get(cache_key(user_id))
+        if user is None:
+            try:
+                user = UserModel._default_manager.select_related(*RELATED).get(pk=user_id)
+            except UserModel.DoesNotExist:
+                return None
+            _store(user)
+        else:
+            _restore(user)
+        return user if self.user_can_authenticate(user) else None
+
+    async def aget_user(self, user_id):
+        user = await cache.aget(cache_key(user_id))
+        if user is None:
+            try:
+                user = await UserModel._default_manager.select_related(*RELATED).aget(pk=user_id)
+            except UserModel.DoesNotExist:
+                return None
+            await _astore(user)
+        else:
+            _restore(user)
+        return user if self.user_can_authenticate(user) else None
+
+
+@receiver(post_save, sender=UserModel)
+@receiver(post_delete, sender=UserModel)
+def forget_user(sender, instance, **kwargs):
+    forget_users([instance.pk])
+
+
+@receiver(post_save, sender=Profile)
+@receiver(post_delete, sender=Profile)
+@receiver(post_save, sender=Profile_address)
+@receiver(post_delete, sender=Profile_address)
+def forget_profile_user(sender, instance, **kwargs):
+    forget_users([instance.user_id])
+
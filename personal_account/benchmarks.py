@@ -0,0 +1,172 @@
+# personal_account/benchmarks.py
+# Замеры маршрутов сайта: задержка p50/p95/p99 и число SQL-запросов.
+# Запускается командой bench_routes на тестовой базе, заполненной синтетическими данными.
+import io
+import itertools
+import json
+import statistics
+import time
+from pathlib import Path
+
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import connection
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+from PIL import Image
+
+from .auth_backends import forget_users
+from .measurements import percentile
+from .models import Profile
+from .synthetic import generate_rows, insert_rows
+
+BENCH_PASSWORD = 'bench-Passw0rd'
+BENCH_EMAIL = 'bench{}@example.com'
+ADMIN_EMAIL = 'bench-admin@example.com'
+
+# номера для новых регистраций: общий счётчик, чтобы email не повторялись между прогонами
+_signup_numbers = itertools.count()
+
+
+def seed_users(count, chunk_size=5000):
+    # Доводит число синтетических пользователей до count.
+    # Хеш пароля считается один раз: PBKDF2 на каждого пользователя занял бы часы.
+    password = make_password(BENCH_PASSWORD)
+    start = User.objects.filter(username__startswith='bench').exclude(username=ADMIN_EMAIL).count()
+    for offset in range(start, count, chunk_size):
+        insert_rows(generate_rows(offset, min(offset + chunk_size, count), BENCH_EMAIL), password)
+
+
+def bench_user():
+    return User.objects.get(username=BENCH_EMAIL.format(0))
+
+
+def bench_admin():
+    admin, created = User.objects.get_or_create(
+        username=ADMIN_EMAIL,
+        defaults={'email': ADMIN_EMAIL, 'is_staff': True, 'is_superuser': True})
+    if created:
+        admin.set_password(BENCH_PASSWORD)
+        admin.save()
+    return admin
+
+
+def document_photo():
+    buffer = io.BytesIO()
+    Image.new('RGB', (64, 40), 'white').save(buffer, 'PNG')
+    return SimpleUploadedFile('passport.png', buffer.getvalue(), content_type='image/png')
+
+
+def profile_edit_data():
+    return {
+        'last_name': 'Иванов', 'first_name': 'Иван', 'surname': 'Иванович',
+        'phone': '+79990000000', 'parther_name': 'Петров Пётр', 'parther_phone': '+79990000001',
+        'id_coor': 'AB-123', 'birth_date': '1990-01-01', 'document_type': 'Паспорт',
+        'id_document': '4510 123456', 'date_of_issue': '2010-01-01', 'inn': '500100732259',
+        'type_of_purchase': 'Первичный', 'price': '3000000', 'price_in_queue': '500000',
+        'document_photo': document_photo(),
+        'reg_country': 'Россия', 'reg_region': 'Москва', 'reg_city': 'Москва',
+        'reg_address': 'ул. Тверская, д. 1', 'reg_street': 'Тверская', 'reg_house': '1',
+        'reg_apartament': '1', 'reg_postal_code': '101000',
+        'act_country': 'Россия', 'act_region': 'Москва', 'act_city': 'Москва',
+        'act_address': 'ул. Тверская, д. 1', 'act_street': 'Тверская', 'act_house': '1',
+        'act_apartament': '1', 'act_postal_code': '101000',
+    }
+
+
+class Route:
+    # Маршрут для замера. prepare() вызывается перед каждым запросом и в замер не входит;
+    # возвращает аргументы для client.get/post.
+
+    def __init__(self, name, method, login=None, prepare=None, expect=(200,)):
+        self.name = name
+        self.method = method
+        self.login = login
+        self.prepare = prepare
+        self.expect = expect
+
+
+def _unlock_profile(user):
+    Profile.objects.filter(user=user).update(can_edit=True)
+    forget_users([user.pk])
+
+
+def build_routes():
+    user = bench_user()
+    admin = bench_admin()
+    profile_url = f'/personal_account/{user.username}/'
+
+    def signup_post():
+        email = f'signup{next(_signup_numbers)}@example.com'
+        return ('/personal_account/signup/', {
+            'email': email, 'first_name': 'Иван', 'last_name': 'Иванов', 'phone': '+79990000000',
+            'password1': BENCH_PASSWORD, 'password2': BENCH_PASSWORD, 'agree_to_terms': 'on'})
+
+    def profile_edit_post():
+        _unlock_profile(user)
+        return (f'{profile_url}profile_edit', profile_edit_data())
+
+    def profile_edit_get():
+        _unlock_profile(user)
+        return (f'{profile_url}profile_edit',)
+
+    return [
+        Route('login GET', 'get', prepare=lambda: ('/personal_account/login/',)),
+        Route('login POST', 'post', expect=(302,),
+              prepare=lambda: ('/personal_account/login/',
+                               {'username': user.username, 'password': BENCH_PASSWORD})),
+        Route('signup GET', 'get', prepare=lambda: ('/personal_account/signup/',)),
+        Route('signup POST', 'post', expect=(302,), prepare=signup_post),
+        Route('profile page', 'get', login=user, prepare=lambda: (profile_url,)),
+        Route('profile edit GET', 'get', login=user, prepare=profile_edit_get),
+        Route('profile edit POST', 'post', login=user, expect=(302,), prepare=profile_edit_post),
+        Route('password reset GET', 'get', prepare=lambda: ('/personal_account/password_reset/',)),
+        Route('password reset POST', 'post', expect=(302,),
+              prepare=lambda: ('/personal_account/password_reset/', {'email': user.email})),
+        Route('admin users', 'get', login=admin, prepare=lambda: ('/admin/auth/user/',)),
+        Route('admin profiles', 'get', login=admin,
+              prepare=lambda: ('/admin/personal_account/profile/',)),
+        Route('admin addresses', 'get', login=admin,
+              prepare=lambda: ('/admin/personal_account/profile_address/',)),
+    ]
+
+
+def measure(route, iterations, warmup=2):
+    client = Client()
+    if route.login is not None:
+        client.force_login(route.login)
+    call = getattr(client, route.method)
+    timings, queries, errors = [], [], 0
+    for i in range(warmup + iterations):
+        args = route.prepare()
+        with CaptureQueriesContext(connection) as captured:
+            started = time.perf_counter()
+            response = call(*args)
+            elapsed = time.perf_counter() - started
+        if i < warmup:
+            continue
+        if response.status_code not in route.expect:
+            errors += 1
+        timings.append(elapsed * 1000)
+        queries.append(len(captured))
+    return {
+        'p50_ms': round(percentile(timings, 50), 2),
+        'p95_ms': round(percentile(timings, 95), 2),
+        'p99_ms': round(percentile(timings, 99), 2),
+        'queries': round(statistics.mean(queries), 1),
+        'errors': errors,
+    }
+
+
+def load_baseline(path):
+    path = Path(path)
+    if not path.exists():
+        return {}
+    return json.loads(path.read_text(encoding='utf-8'))
+
+
+def save_baseline(path, results):
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(json.dumps(results, ensure_ascii=False, indent=2, sort_keys=True), encoding='utf-8')
@@ -0,0 +1,121 @@
+# personal_account/crypto.py
+# Шифрование персональных данных (паспорт, ИНН, телефон) и "слепые индексы" —
+# HMAC от нормализованного значения, по которому можно искать на равенство,
+# не расшифровывая строки. cryptography импортируется при первом шифровании:
+# импорт моделей (а значит, и каждой команды manage.py) без него заметно быстрее.
+import base64
+import functools
+import hashlib
+import hmac
+import re
+
+from django.conf import settings
+from django.core.signals import setting_changed
+from django.dispatch import receiver
+
+# Fernet-токен начинается с байта версии 0x80 и времени создания, у которого
+# старшие байты нулевые, — в base64 это всегда 'gAAAAA'
+TOKEN_PREFIX = 'gAAAAA'
+
+
+class DecryptionError(ValueError):
+    # Значение зашифровано, но ни один ключ из FIELD_ENCRYPTION_KEYS к нему не подходит:
+    # ключ сменили без rekey_profiles или поменяли SECRET_KEY, из которого выводился ключ.
+    # Молча вернуть шифротекст нельзя — он показался бы пользователю и ушёл бы в БД при сохранении.
+    pass
+
+
+def _derived_key(label):
+    # ключ для разработки, если ключи не заданы в настройках; в профиле production
+    # ключи обязательны — иначе смена SECRET_KEY сделала бы все данные нечитаемыми
+    digest = hashlib.sha256(f'{label}:{settings.SECRET_KEY}'.encode()).digest()
+    return base64.urlsafe_b64encode(digest)
+
+
+def field_keys():
+    return getattr(settings, 'FIELD_ENCRYPTION_KEYS', None) or [_derived_key('field-encryption')]
+
+
+@functools.lru_cache(maxsize=None)
+def get_fernet():
+    # первый ключ шифрует, остальные только расшифровывают (для смены ключа)
+    from cryptography.fernet import Fernet, MultiFernet
+
+    return MultiFernet([Fernet(key) for key in field_keys()])
+
+
+@functools.lru_cache(maxsize=None)
+def get_blind_index_key():
+    key = getattr(settings, 'BLIND_INDEX_KEY', None) or _derived_key('blind-index')
+    return key.encode() if isinstance(key, str) else key
+
+
+@receiver(setting_changed)
+def reset_keys(setting, **kwargs):
+    if setting in ('FIELD_ENCRYPTION_KEYS', 'BLIND_INDEX_KEY', 'SECRET_KEY'):
+        get_fernet.cache_clear()
+        get_blind_index_key.cache_clear()
+
+
+def encrypt(value):
+    if not value:
+        return value
+    return get_fernet().encrypt(value.encode()).decode()
+
+
+def decrypt(value):
+    # строки, записанные до включения шифрования, возвращаются как есть
+    if not value or not value.startswith(TOKEN_PREFIX):
+        return value
+    from cryptography.fernet import InvalidToken
+
+    try:
+        return get_fernet().decrypt(value.encode()).decode()
+    except InvalidToken:
+        raise DecryptionError('Значение не расшифровывается ни одним из ключей FIELD_ENCRYPTION_KEYS')
+
+
+def encrypt_bytes(data):
+    return get_fernet().encrypt(data)
+
+
+def decrypt_bytes(data):
+    # файлы, сохранённые до включения шифрования, возвращаются как есть
+    if not data.startswith(TOKEN_PREFIX.encode()):
+        return data
+    from cryptography.fernet import InvalidToken
+
+    try:
+        return get_fernet().decrypt(data)
+    except InvalidToken:
+        raise DecryptionError('Файл не расшифровывается ни одним из ключей FIELD_ENCRYPTION_KEYS')
+
+
+def decrypted_size(data):
+    # Размер расшифрованного файла без расшифровки целиком. Токен Fernet — это
+    # версия (1 байт), время (8), IV (16), шифротекст AES-CBC и HMAC (32);
+    # исходный размер — длина шифротекста минус выравнивание PKCS7, а оно
+    # записано в последнем блоке. Ключ выбирается по HMAC, как это делает Fernet.
+    if not data.startswith(TOKEN_PREFIX.encode()):
+        return len(data)
+    from cryptography.hazmat.primitives.ciphers import Cipher, algorithms, modes
+
+    token = base64.urlsafe_b64decode(data)
+    body, signature = token[:-32], token[-32:]
+    # последний блок расшифровывается с предыдущим блоком (или IV) в роли вектора
+    previous, last = body[-32:-16], body[-16:]
+    for key in field_keys():
+        key = base64.urlsafe_b64decode(key)
+        if hmac.compare_digest(hmac.new(key[:16], body, hashlib.sha256).digest(), signature):
+            decryptor = Cipher(algorithms.AES(key[16:]), modes.CBC(previous)).decryptor()
+            padding = (decryptor.update(last) + decryptor.finalize())[-1]
+            return len(body) - 25 - padding
+    raise DecryptionError('Файл не расшифровывается ни одним из ключей FIELD_ENCRYPTION_KEYS')
+
+
+def blind_index(value):
+    # пробелы не учитываются: "4510 123456" и "4510123456" дают один индекс
+    value = re.sub(r'\s+', '', value or '')
+    if not value:
+        return ''
+    return hmac.new(get_blind_index_key(), value.encode(), hashlib.sha256).hexdigest()
@@ -0,0 +1,109 @@
+# personal_account/debts.py
+# Задолженность для раздела "Долги": начислено по графику минус оплачено.
+# Ночная задача пересчитывает только профили, у которых с прошлого запуска
+# изменились платежи или график либо наступил срок очередного платежа.
+import calendar
+import datetime
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.models import Sum
+from django.db.models.signals import post_delete
+from django.dispatch import receiver
+from django.utils import timezone
+
+from .models import DebtSummary, JobWatermark, Payment, PaymentSchedule
+
+WATERMARK_NAME = 'debts'
+# updated_at ставится при save(), а строка видна другим только после commit:
+# транзакция, начатая до запуска задачи и завершённая после, получит updated_at
+# раньше отметки. Поэтому изменения перечитываются с запасом; повторный
+# пересчёт профиля ничего не портит.
+WATERMARK_OVERLAP = datetime.timedelta(minutes=15)
+
+
+def add_months(start, months):
+    # 31 января + 1 месяц = 28 (29) февраля
+    month = start.month - 1 + months
+    year = start.year + month // 12
+    month = month % 12 + 1
+    return start.replace(year=year, month=month, day=min(start.day, calendar.monthrange(year, month)[1]))
+
+
+def months_due(start_date, today):
+    # сколько платежей графика уже наступило к дате today
+    if start_date is None or today < start_date:
+        return 0
+    months = (today.year - start_date.year) * 12 + today.month - start_date.month
+    return months + (1 if add_months(start_date, months) <= today else 0)
+
+
+def changed_profile_ids(since, today):
+    since -= WATERMARK_OVERLAP
+    ids = set(Payment.objects.filter(updated_at__gt=since).values_list('profile_id', flat=True))
+    ids.update(PaymentSchedule.objects.filter(updated_at__gt=since).values_list('profile_id', flat=True))
+    ids.update(DebtSummary.objects.filter(next_due_date__lte=today).values_list('profile_id', flat=True))
+    ids.update(DebtSummary.objects.filter(stale=True).values_list('profile_id', flat=True))
+    return ids
+
+
+@receiver(post_delete, sender=Payment)
+@receiver(post_delete, sender=PaymentSchedule)
+def mark_stale(sender, instance, **kwargs):
+    DebtSummary.objects.filter(profile_id=instance.profile_id).update(stale=True)
+
+
+def all_profile_ids():
+    ids = set(PaymentSchedule.objects.values_list('profile_id', flat=True))
+    ids.update(Payment.objects.values_list('profile_id', flat=True).distinct())
+    return ids
+
+
+def compute_summaries(profile_ids, today, now):
+    schedules = {profile_id: (rows, start_date) for profile_id, rows, start_date in
+                 PaymentSchedule.objects
+                 .filter(profile_id__in=profile_ids)
+                 .values_list('profile_id', 'rows', 'start_date')}
+    paid = dict(Payment.objects
+                .filter(profile_id__in=profile_ids)
+                .values('profile_id')
+                .annotate(total=Sum('amount'))
+                .values_list('profile_id', 'total'))
+    summaries = []
+    for profile_id in profile_ids:
+        rows, start_date = schedules.get(profile_id, ([], None))
+        due = min(months_due(start_date, today), len(rows))
+        expected = sum((Decimal(str(row[1])) for row in rows[:due]), Decimal('0'))
+        total_paid = paid.get(profile_id) or Decimal('0')
+        debt = max(expected - total_paid, Decimal('0'))
+        next_due_date = add_months(start_date, due) if start_date and due < len(rows) else None
+        summaries.append(DebtSummary(profile_id=profile_id, expected=expected, paid=total_paid,
+                                     debt=debt, has_debt=debt > 0,
+                                     next_due_date=next_due_date, computed_at=now))
+    return summaries
+
+
+def run_debt_job(full=False, chunk_size=2000):
+    # Возвращает число пересчитанных профилей.
+    # Отметка берётся до чтения данных: изменения во время запуска попадут в следующий.
+    started = timezone.now()
+    today = timezone.localdate()
+    watermark = JobWatermark.objects.filter(name=WATERMARK_NAME).first()
+    if full or watermark is None:
+        profile_ids = all_profile_ids()
+    else:
+        profile_ids = changed_profile_ids(watermark.value, today)
+
+    profile_ids = sorted(profile_ids)
+    for i in range(0, len(profile_ids), chunk_size):
+        chunk = profile_ids[i:i + chunk_size]
+        # флаг снимается до чтения данных: удаление во время расчёта поставит его снова
+        DebtSummary.objects.filter(profile_id__in=chunk, stale=True).update(stale=False)
+        summaries = compute_summaries(chunk, today, started)
+        with transaction.atomic():
+            DebtSummary.objects.bulk_create(
+                summaries, batch_size=500, update_conflicts=True, unique_fields=['profile'],
+                update_fields=['expected', 'paid', 'debt', 'has_debt', 'next_due_date', 'computed_at'])
+
+    JobWatermark.objects.update_or_create(name=WATERMARK_NAME, defaults={'value': started})
+    return len(profile_ids)
@@ -0,0 +1,220 @@
+# personal_account/document_hashes.py
+# Поиск одного и того же документа у разных участников.
+# Для каждого фото считается перцептивный хеш (pHash, 64 бита): после пережатия,
+# уменьшения и небольшой обрезки он меняется лишь в нескольких битах.
+# Похожие хеши ищутся в памяти по схеме multi-index hashing: хеш делится на 4 куска
+# по 16 бит, и если расстояние Хэмминга не больше r, то хотя бы один кусок отличается
+# не больше чем на r // 4 бит. Кандидатов находим бинарным поиском по отсортированным
+# кускам, точное расстояние считаем только для них — без перебора всех хешей.
+# numpy импортируется при построении индекса: сигналы модуля регистрируются
+# при каждом запуске, а индекс нужен только при загрузке фото и в отчётах.
+import functools
+import itertools
+import threading
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from django.utils import timezone
+
+from . import image_sandbox
+from .images import phash
+from .models import DocumentHash, Profile
+
+PARTS = 4
+PART_BITS = 16
+# раз в столько секунд индекс перечитывается целиком — так подхватываются удаления каскадом
+INDEX_MAX_AGE = 300
+# при догрузке по updated_at берём с запасом: транзакция могла зафиксироваться
+# позже, чем получила своё время
+SYNC_OVERLAP = timedelta(seconds=5)
+
+
+def duplicate_distance():
+    return getattr(settings, 'DOCUMENT_DUPLICATE_DISTANCE', 10)
+
+
+def hamming(a, b):
+    return ((a ^ b) & 0xFFFFFFFFFFFFFFFF).bit_count()
+
+
+@functools.lru_cache(maxsize=None)
+def _probe_masks(spread):
+    # все 16-битные маски, в которых не больше spread единиц
+    import numpy as np
+
+    masks = [0]
+    for count in range(1, spread + 1):
+        for bits in itertools.combinations(range(PART_BITS), count):
+            masks.append(sum(1 << bit for bit in bits))
+    return np.array(masks, dtype=np.uint16)
+
+
+class HammingIndex:
+    # Неизменяемый индекс над массивом хешей. Для каждого из PARTS кусков хранит
+    # отсортированные значения куска и перестановку к исходным позициям.
+
+    def __init__(self, ids=(), hashes=()):
+        import numpy as np
+
+        self.ids = np.asarray(ids, dtype=np.int64)
+        self.hashes = np.asarray(hashes, dtype=np.int64).view(np.uint64)
+        self.tables = []
+        for part in range(PARTS):
+            chunks = ((self.hashes >> np.uint64(part * PART_BITS)) & np.uint64(0xFFFF)).astype(np.uint16)
+            order = np.argsort(chunks, kind='stable')
+            self.tables.append((chunks[order], order))
+
+    def __len__(self):
+        return len(self.ids)
+
+    def search(self, value, radius):
+        # (ids, расстояния) всех хешей не дальше radius от value
+        import numpy as np
+
+        query = int(value) & 0xFFFFFFFFFFFFFFFF
+        masks = _probe_masks(radius // PARTS)
+        found = []
+        for part, (chunks, order) in enumerate(self.tables):
+            probes = masks ^ np.uint16((query >> (part * PART_BITS)) & 0xFFFF)
+            starts = np.searchsorted(chunks, probes, 'left')
+            ends = np.searchsorted(chunks, probes, 'right')
+            found.extend(order[start:end] for start, end in zip(starts, ends) if start < end)
+        if not found:
+            return self.ids[:0], np.zeros(0, dtype=np.uint8)
+        positions = np.unique(np.concatenate(found))
+        distances = np.bitwise_count(self.hashes[positions] ^ np.uint64(query))
+        keep = distances <= radius
+        return self.ids[positions[keep]], distances[keep]
+
+
+class DocumentHashIndex:
+    # Копия хешей в памяти процесса. Полная загрузка строит HammingIndex,
+    # а изменения после неё догружаются по updated_at в небольшой словарь поверх.
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        # строится при первой синхронизации
+        self._base = None
+        self._overlay = {}
+        self._synced_at = None
+        self._loaded_at = 0.0
+
+    def reset(self):
+        with self._lock:
+            self._synced_at = None
+
+    def sync(self):
+        with self._lock:
+            if self._synced_at is None or time.monotonic() - self._loaded_at > INDEX_MAX_AGE:
+                self._load()
+                return
+            now = timezone.now()
+            rows = (DocumentHash.objects
+                    .filter(updated_at__gte=self._synced_at - SYNC_OVERLAP)
+                    .values_list('profile_id', 'phash'))
+            self._overlay.update(rows)
+            self._synced_at = now
+
+    def _load(self):
+        now = timezone.now()
+        ids, hashes = [], []
+        rows = DocumentHash.objects.values_list('profile_id', 'phash')
+        for profile_id, value in rows.iterator(chunk_size=10000):
+            ids.append(profile_id)
+            hashes.append(value)
+        self._base = HammingIndex(ids, hashes)
+        self._overlay = {}
+        self._synced_at = now
+        self._loaded_at = time.monotonic()
+
+    def similar(self, value, radius=None, exclude=None, sync=True):
+        # {profile_id: расстояние} для хешей не дальше radius от value;
+        # sync=False — при серии поисков, когда индекс уже догружен
+        if radius is None:
+            radius = duplicate_distance()
+        if sync:
+            self.sync()
+        with self._lock:
+            result = {}
+            if self._base is not None:
+                ids, distances = self._base.search(value, radius)
+                # записи из overlay новее базовых
+                result = {pid: distance for pid, distance in zip(ids.tolist(), distances.tolist())
+                          if pid not in self._overlay}
+            for pid, other in self._overlay.items():
+                distance = hamming(value, other)
+                if distance <= radius:
+                    result[pid] = distance
+        result.pop(exclude, None)
+        return result
+
+
+document_hash_index = DocumentHashIndex()
+
+
+def similar_profiles(profile_id, radius=None):
+    value = DocumentHash.objects.filter(profile_id=profile_id).values_list('phash', flat=True).first()
+    if value is None:
+        return {}
+    return document_hash_index.similar(value, radius, exclude=profile_id)
+
+
+def refresh_matches(profile_ids, radius=None):
+    # пересчитывает число похожих документов у указанных профилей
+    changed = []
+    document_hash_index.sync()
+    for row in DocumentHash.objects.filter(profile_id__in=profile_ids).only('profile_id', 'phash', 'matches'):
+        matches = len(document_hash_index.similar(row.phash, radius, exclude=row.profile_id, sync=False))
+        if matches != row.matches:
+            row.matches = matches
+            changed.append(row)
+    DocumentHash.objects.bulk_update(changed, ['matches'])
+    return len(changed)
+
+
+def store_hash(profile_id, file_name, value, radius=None):
+    # Сохраняет хеш нового фото и обновляет счётчики совпадений у него
+    # и у всех, с кем он совпадал до замены фото и совпадает теперь.
+    old = DocumentHash.objects.filter(profile_id=profile_id).values_list('phash', flat=True).first()
+    affected = {profile_id}
+    if old is not None:
+        affected.update(document_hash_index.similar(old, radius, exclude=profile_id))
+    DocumentHash.objects.update_or_create(
+        profile_id=profile_id,
+        defaults={'file_name': file_name, 'phash': value, 'updated_at': timezone.now()})
+    affected.update(document_hash_index.similar(value, radius, exclude=profile_id))
+    refresh_matches(affected, radius)
+
+
+def refresh_all_matches(chunk_size=5000):
+    # пересчёт счётчиков у всех — после пакетной загрузки хешей
+    document_hash_index.reset()
+    ids = list(DocumentHash.objects.order_by('profile_id').values_list('profile_id', flat=True))
+    changed = 0
+    for offset in range(0, len(ids), chunk_size):
+        changed += refresh_matches(ids[offset:offset + chunk_size])
+    return changed
+
+
+@receiver(post_save, sender=Profile)
+def hash_document_photo(sender, instance, raw=False, **kwargs):
+    # только для фото, загруженного в этом сохранении (см. Profile.save);
+    # старые файлы обрабатывает команда hash_documents
+    if raw or not getattr(instance, '_document_photo_uploaded', False):
+        return
+    instance._document_photo_uploaded = False
+    with instance.document_photo.open('rb') as f:
+        data = f.read()
+    try:
+        value = image_sandbox.run(phash, data)
+    except (ValueError, OSError, image_sandbox.SandboxError):
+        return
+    store_hash(instance.pk, instance.document_photo.name, value)
+
+
+@receiver(post_delete, sender=DocumentHash)
+def reset_document_hash_index(sender, instance, **kwargs):
+    document_hash_index.reset()
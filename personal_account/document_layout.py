@@ -0,0 +1,119 @@
+# personal_account/document_layout.py
+# Перенос фото документов в текущую раскладку каталогов (см. models.document_dir)
+# без остановки сайта. Файл сначала получает жёсткую ссылку по новому пути, затем в одной
+# транзакции меняются пути в Profile, в истории и в DocumentHash, и только после
+# фиксации удаляется старое имя — если на него уже ничего в базе не ссылается.
+# В любой момент файл доступен хотя бы по одному из путей, записанных в базе.
+import os
+import posixpath
+import shutil
+
+from django.db import transaction
+from django.db.models import Max
+
+from .auth_backends import forget_users
+from .models import DocumentHash, Profile, document_dir
+
+
+def storage():
+    return Profile._meta.get_field('document_photo').storage
+
+
+def planned_moves(first_user_id, last_user_id):
+    # {старый путь: (user_id, новый путь)} для файлов участников с user_id в [first, last),
+    # которые лежат не в своём каталоге. Берём и текущие фото, и старые из истории.
+    history = Profile.history.model
+    names = set()
+    for model in (Profile, history):
+        names.update(model.objects
+                     .filter(user_id__gte=first_user_id, user_id__lt=last_user_id)
+                     .exclude(document_photo='').exclude(document_photo__isnull=True)
+                     .values_list('user_id', 'document_photo'))
+    moves = {}
+    for user_id, name in names:
+        target = f'{document_dir(user_id)}/{posixpath.basename(name)}'
+        if name != target:
+            moves[name] = (user_id, target)
+    return moves
+
+
+def link_file(source, target):
+    os.makedirs(os.path.dirname(target), exist_ok=True)
+    try:
+        os.link(source, target)
+    except FileExistsError:
+        pass
+    except OSError:
+        # другой раздел или ФС без жёстких ссылок — копируем
+        shutil.copy2(source, target)
+
+
+def move_files(moves):
+    # Переносит файлы и обновляет пути; возвращает (перенесено, не найдено на диске)
+    files = storage()
+    linked = {}
+    missing = 0
+    for old, (user_id, new) in moves.items():
+        source = files.path(old)
+        if not os.path.exists(source):
+            missing += 1
+            continue
+        link_file(source, files.path(new))
+        linked[old] = (user_id, new)
+
+    history = Profile.history.model
+    with transaction.atomic():
+        for old, (user_id, new) in linked.items():
+            # отбор по user_id идёт по индексу; условие на старый путь —
+            # если фото успели заменить, новую запись не трогаем
+            Profile.objects.filter(user_id=user_id, document_photo=old).update(document_photo=new)
+            history.objects.filter(user_id=user_id, document_photo=old).update(document_photo=new)
+            DocumentHash.objects.filter(profile__user_id=user_id, file_name=old).update(file_name=new)
+        forget_users({user_id for user_id, _ in linked.values()})
+        transaction.on_commit(lambda: remove_unreferenced(linked))
+    return len(linked), missing
+
+
+def referenced_names(names):
+    # какие из имён ещё записаны в профилях, истории или хешах документов
+    names = list(names)
+    referenced = set(Profile.objects.filter(document_photo__in=names).values_list('document_photo', flat=True))
+    referenced.update(Profile.history.model.objects
+                      .filter(document_photo__in=names).values_list('document_photo', flat=True))
+    referenced.update(DocumentHash.objects.filter(file_name__in=names).values_list('file_name', flat=True))
+    return referenced
+
+
+def remove_unreferenced(names):
+    # Удаляет старые имена после фиксации. Профиль, сохранённый из устаревшего
+    # экземпляра, мог записать старый путь обратно — такой файл оставляем.
+    # Возвращает число удалённых.
+    files = storage()
+    in_use = referenced_names(names)
+    removed = 0
+    for old in names:
+        if old in in_use:
+            continue
+        try:
+            os.unlink(files.path(old))
+        except FileNotFoundError:
+            continue
+        removed += 1
+        remove_empty_dirs(os.path.dirname(files.path(old)))
+    return removed
+
+
+def remove_empty_dirs(path):
+    # удаляет опустевшие каталоги вверх до documents/
+    root = storage().path('documents')
+    while path.startswith(root) and path != root:
+        try:
+            os.rmdir(path)
+        except OSError:
+            return
+        path = os.path.dirname(path)
+
+
+def max_user_id():
+    return max(Profile.objects.aggregate(m=Max('user_id'))['m'] or 0,
+               Profile.history.model.objects.aggregate(m=Max('user_id'))['m'] or 0)
@@ -0,0 +1,113 @@
+# personal_account/fields.py
+import os
+
+from django.core.files.base import ContentFile
+from django.core.files.storage import FileSystemStorage
+from django.conf import settings
+from django.db import models, transaction
+
+from .crypto import blind_index, decrypt, decrypt_bytes, decrypted_size, encrypt, encrypt_bytes
+
+
+class EncryptedCharField(models.CharField):
+    # Строка хранится зашифрованной. max_length проверяет исходное значение,
+    # а столбец — TEXT, потому что шифротекст длиннее.
+    # Шифрование со случайным вектором: filter(поле=...) не работает, ищите по BlindIndexField.
+
+    def get_internal_type(self):
+        return 'TextField'
+
+    def from_db_value(self, value, expression, connection):
+        return decrypt(value)
+
+    def get_prep_value(self, value):
+        return encrypt(super().get_prep_value(value))
+
+
+class BlindIndexField(models.CharField):
+    # HMAC от значения поля source; пересчитывается при каждом сохранении
+
+    def __init__(self, *args, source=None, **kwargs):
+        self.source = source
+        kwargs.setdefault('max_length', 64)
+        kwargs.setdefault('db_index', True)
+        kwargs.setdefault('editable', False)
+        kwargs.setdefault('blank', True)
+        kwargs.setdefault('default', '')
+        super().__init__(*args, **kwargs)
+
+    def deconstruct(self):
+        name, path, args, kwargs = super().deconstruct()
+        kwargs['source'] = self.source
+        for key, value in (('max_length', 64), ('db_index', True), ('editable', False),
+                           ('blank', True), ('default', '')):
+            if kwargs.get(key) == value:
+                del kwargs[key]
+        return name, path, args, kwargs
+
+    def pre_save(self, model_instance, add):
+        value = blind_index(getattr(model_instance, self.source))
+        setattr(model_instance, self.attname, value)
+        return value
+
+
+class EncryptedFileSystemStorage(FileSystemStorage):
+    # Файлы на диске зашифрованы; при чтении через storage расшифровываются.
+    # Файлы, сохранённые до включения шифрования, читаются как есть.
+
+    def _save(self, name, content):
+        content.seek(0)
+        return super()._save(name, ContentFile(encrypt_bytes(content.read())))
+
+    def _open(self, name, mode='rb'):
+        with super()._open(name, 'rb') as f:
+            data = decrypt_bytes(f.read())
+        content = ContentFile(data, name=name)
+        content.mode = mode
+        return content
+
+    def size(self, name):
+        # размер расшифрованного файла, без его расшифровки
+        with super()._open(name, 'rb') as f:
+            return decrypted_size(f.read())
+
+    def reencrypt(self, name):
+        # Перешифровать файл текущим ключом. Пишем рядом и подменяем атомарно:
+        # при сбое или нехватке места на диске остаётся прежний, читаемый файл.
+        with self._open(name) as f:
+            data = f.read()
+        path = self.path(name)
+        with open(path + '.tmp', 'wb') as f:
+            f.write(encrypt_bytes(data))
+        os.replace(path + '.tmp', path)
+
+
+def get_document_storage():
+    if getattr(settings, 'ENCRYPT_DOCUMENT_FILES', False):
+        return EncryptedFileSystemStorage()
+    return FileSystemStorage()
+
+
+def reencrypt_model(model, batch_size=1000):
+    # Перешифровывает все зашифрованные поля модели первым ключом и пересчитывает
+    # слепые индексы. Идёт по первичному ключу порциями, без загрузки всей таблицы.
+    # Возвращает число обработанных строк.
+    fields = model._meta.concrete_fields
+    encrypted = [f.attname for f in fields if isinstance(f, EncryptedCharField)]
+    indexes = [f for f in fields if isinstance(f, BlindIndexField)]
+    if not encrypted:
+        return 0
+    queryset = model._default_manager.order_by('pk').only('pk', *encrypted)
+    processed = 0
+    last_pk = None
+    while True:
+        batch = list((queryset if last_pk is None else queryset.filter(pk__gt=last_pk))[:batch_size])
+        if not batch:
+            return processed
+        for obj in batch:
+            for field in indexes:
+                setattr(obj, field.attname, blind_index(getattr(obj, field.source)))
+        with transaction.atomic():
+            model._default_manager.bulk_update(batch, encrypted + [f.attname for f in indexes])
+        processed += len(batch)
+        last_pk = batch[-1].pk
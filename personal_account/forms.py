@@ -1,7 +1,9 @@
 from django import forms
 from django.contrib.auth.forms import UserCreationForm, AuthenticationForm
 from django.contrib.auth.models import User
+from django.core.files.uploadedfile import UploadedFile
 from . import models as md
+from . import image_sandbox
 
 class LoginForm(AuthenticationForm):
     username = forms.EmailField(
@@ -252,6 +254,12 @@ class ProfileUpdateForm(forms.ModelForm):
         f = self.cleaned_data.get('document_photo')
         if f and f.size > 5 * 1024 * 1024:
             raise md.ValidationError("Файл слишком большой (макс 5MB).")
+        # новый файл декодируем в изолированном пуле, а не в процессе веб-воркера
+        if isinstance(f, UploadedFile):
+            try:
+                image_sandbox.verify_upload(f)
+            except (ValueError, image_sandbox.SandboxError) as error:
+                raise md.ValidationError(str(error))
         return f
 
     def __init__(self, *args, **kwargs):
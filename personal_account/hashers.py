@@ -0,0 +1,67 @@
+# personal_account/hashers.py
+# Хешеры паролей с параметрами из настроек (PASSWORD_PBKDF2_ITERATIONS, PASSWORD_ARGON2).
+# Названия алгоритмов те же, что у хешеров Django, поэтому уже сохранённые хеши
+# проверяются как раньше. Если параметры хеша пользователя отличаются от текущих
+# (или первым в PASSWORD_HASHERS стоит другой алгоритм), Django при успешном входе
+# сам пересчитывает и сохраняет хеш — User.check_password вызывает setter.
+# Подобрать параметры под сервер помогает manage.py calibrate_hashers.
+import statistics
+import time
+
+from django.conf import settings
+from django.contrib.auth.hashers import Argon2PasswordHasher, PBKDF2PasswordHasher
+
+# минимум OWASP для Argon2id: 19 МиБ памяти и 2 прохода
+DEFAULT_ARGON2 = {'time_cost': 2, 'memory_cost': 19456, 'parallelism': 1}
+
+
+def argon2_params():
+    return {**DEFAULT_ARGON2, **getattr(settings, 'PASSWORD_ARGON2', {})}
+
+
+class TunedPBKDF2PasswordHasher(PBKDF2PasswordHasher):
+
+    @property
+    def iterations(self):
+        return getattr(settings, 'PASSWORD_PBKDF2_ITERATIONS', PBKDF2PasswordHasher.iterations)
+
+
+class TunedArgon2PasswordHasher(Argon2PasswordHasher):
+    # memory_cost — в КиБ
+
+    @property
+    def time_cost(self):
+        return argon2_params()['time_cost']
+
+    @property
+    def memory_cost(self):
+        return argon2_params()['memory_cost']
+
+    @property
+    def parallelism(self):
+        return argon2_params()['parallelism']
+
+
+def measure(hasher, samples=3):
+    # медиана времени одного хеширования в секундах
+    salt = hasher.salt()
+    timings = []
+    for _ in range(samples):
+        started = time.perf_counter()
+        hasher.encode('calibration-password', salt)
+        timings.append(time.perf_counter() - started)
+    return statistics.median(timings)
+
+
+def pbkdf2_hasher(iterations):
+    hasher = PBKDF2PasswordHasher()
+    hasher.iterations = iterations
+    return hasher
+
+
+def argon2_hasher(time_cost, memory_cost, parallelism):
+    hasher = Argon2PasswordHasher()
+    hasher.time_cost = time_cost
+    hasher.memory_cost = memory_cost
+    hasher.parallelism = parallelism
+    return hasher
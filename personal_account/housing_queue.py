@@ -0,0 +1,260 @@
+# personal_account/housing_queue.py
+# Очередь на жильё: позиция участника и выборка "кто на местах N..M" за O(log n).
+import threading
+import time
+
+from django.contrib.auth.models import User
+from django.db import IntegrityError, transaction
+from django.db.models import F, Max
+from django.db.models.signals import post_delete
+from django.dispatch import receiver
+from django.utils import timezone
+
+from .models import QueueCounter, QueueEntry
+
+# раз в столько секунд индекс перечитывается целиком —
+# так подхватываются записи, удалённые каскадом вместе с пользователем
+INDEX_MAX_AGE = 300
+# Догрузка перечитывает и столько номеров изменений ниже уже применённого.
+# Номера выдаются под блокировкой строки счётчика и фиксируются по порядку,
+# запас — на случай записи, изменённой в обход join_queue/leave_queue.
+# Применение идемпотентно, повторно прочитанные записи ничего не меняют.
+REVISION_OVERLAP = 50
+
+
+class OrderStatisticIndex:
+    # Дерево Фенвика над ключами очереди (order_key).
+    # Ключи выдаются подряд, поэтому ключ сам служит номером ячейки:
+    # ранг, поиск k-го элемента, вступление и выход — O(log n).
+
+    def __init__(self):
+        self._tree = [0]
+        self._active = bytearray(1)
+        self.total = 0
+
+    def __len__(self):
+        return self.total
+
+    def __contains__(self, key):
+        return 0 < key <= self.size and self._active[key] == 1
+
+    @property
+    def size(self):
+        return len(self._tree) - 1
+
+    def build(self, keys):
+        # построение за O(n) вместо n вставок по O(log n)
+        size = max(keys, default=0)
+        active = bytearray(size + 1)
+        for key in keys:
+            active[key] = 1
+        tree = list(active)
+        for i in range(1, size + 1):
+            parent = i + (i & -i)
+            if parent <= size:
+                tree[parent] += tree[i]
+        self._tree, self._active, self.total = tree, active, sum(active)
+
+    def _grow(self, size):
+        for i in range(self.size + 1, size + 1):
+            self._active.append(0)
+            self._tree.append(self.prefix(i - 1) - self.prefix(i - (i & -i)))
+
+    def prefix(self, key):
+        # количество активных ключей <= key
+        key = min(key, self.size)
+        result = 0
+        while key > 0:
+            result += self._tree[key]
+            key -= key & -key
+        return result
+
+    def set(self, key, is_active):
+        if key > self.size:
+            self._grow(key)
+        value = 1 if is_active else 0
+        if self._active[key] == value:
+            return
+        self._active[key] = value
+        delta = 1 if is_active else -1
+        self.total += delta
+        size = self.size
+        while key <= size:
+            self._tree[key] += delta
+            key += key & -key
+
+    def rank(self, key):
+        if key not in self:
+            return None
+        return self.prefix(key)
+
+    def select(self, position):
+        # ключ, стоящий на месте position (с единицы)
+        if not 1 <= position <= self.total:
+            return None
+        key = 0
+        step = 1 << self.size.bit_length()
+        while step:
+            nxt = key + step
+            if nxt <= self.size and self._tree[nxt] < position:
+                key = nxt
+                position -= self._tree[nxt]
+            step >>= 1
+        return key + 1
+
+    def slice(self, start, stop):
+        # ключи на местах start..stop включительно
+        key = self.select(max(start, 1))
+        if key is None:
+            return []
+        count = min(stop, self.total) - max(start, 1) + 1
+        keys = []
+        while key != -1 and len(keys) < count:
+            keys.append(key)
+            key = self._active.find(1, key + 1)
+        return keys
+
+
+class QueueIndex:
+    # Копия очереди в памяти процесса.
+    # Перед каждым чтением догружает только записи с revision >= последней
+    # применённой, поэтому процессы-воркеры видят изменения друг друга.
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._keys = OrderStatisticIndex()
+        self._key_by_user = {}
+        self._user_by_key = {}
+        self._revision = None
+        self._loaded_at = 0.0
+
+    def reset(self):
+        with self._lock:
+            self._revision = None
+
+    def sync(self):
+        with self._lock:
+            if self._revision is None or time.monotonic() - self._loaded_at > INDEX_MAX_AGE:
+                self._load()
+                return
+            rows = (QueueEntry.objects
+                    .filter(revision__gte=self._revision - REVISION_OVERLAP)
+                    .values_list('user_id', 'order_key', 'left_at', 'revision'))
+            for row in rows:
+                self._apply(*row)
+
+    def _load(self):
+        self._keys = OrderStatisticIndex()
+        self._key_by_user = {}
+        self._user_by_key = {}
+        rows = (QueueEntry.objects
+                .filter(left_at__isnull=True)
+                .values_list('user_id', 'order_key'))
+        for user_id, key in rows.iterator(chunk_size=10000):
+            self._key_by_user[user_id] = key
+            self._user_by_key[key] = user_id
+        self._keys.build(self._user_by_key.keys())
+        # выходы тоже меняют revision, поэтому берём максимум по всей таблице
+        self._revision = QueueEntry.objects.aggregate(m=Max('revision'))['m'] or 0
+        self._loaded_at = time.monotonic()
+
+    def _apply(self, user_id, key, left_at, revision):
+        # применение идемпотентно: одну и ту же запись можно применить повторно
+        old_key = self._key_by_user.pop(user_id, None)
+        if old_key is not None:
+            self._keys.set(old_key, False)
+            self._user_by_key.pop(old_key, None)
+        if left_at is None:
+            self._keys.set(key, True)
+            self._key_by_user[user_id] = key
+            self._user_by_key[key] = user_id
+        self._revision = max(self._revision, revision)
+
+    def __len__(self):
+        self.sync()
+        return len(self._keys)
+
+    def position(self, user_id, sync=True):
+        # sync=False — для серии запросов подряд, когда индекс уже догружен
+        if sync:
+            self.sync()
+        with self._lock:
+            key = self._key_by_user.get(user_id)
+            return None if key is None else self._keys.rank(key)
+
+    def user_ids(self, start, stop):
+        self.sync()
+        with self._lock:
+            return [self._user_by_key[key] for key in self._keys.slice(start, stop)]
+
+
+queue_index = QueueIndex()
+
+
+def next_value(name):
+    # Следующее значение счётчика name ('order_key' или 'revision'). Вызывается
+    # внутри транзакции: UPDATE блокирует строку счётчика до её фиксации
+    # (в SQLite — всю базу на запись), и параллельная транзакция ждёт.
+    while True:
+        if QueueCounter.objects.filter(name=name).update(value=F('value') + 1):
+            return QueueCounter.objects.get(name=name).value
+        # счётчика ещё нет (база очищена) — продолжаем от максимума по таблице
+        start = (QueueEntry.objects.aggregate(m=Max(name))['m'] or 0) + 1
+        try:
+            with transaction.atomic():
+                return QueueCounter.objects.create(name=name, value=start).value
+        except IntegrityError:
+            # его только что создала параллельная транзакция
+            continue
+
+
+def last_order_key():
+    counter = QueueCounter.objects.filter(name='order_key').first()
+    return counter.value if counter else (QueueEntry.objects.aggregate(m=Max('order_key'))['m'] or 0)
+
+
+@transaction.atomic
+def join_queue(user, order_key=None):
+    # order_key — вернуть участника на прежнее место; допускаются только уже
+    # выданные ключи: ключ — номер ячейки индекса, произвольно большой раздул бы его
+    if order_key is not None and not 1 <= order_key <= last_order_key():
+        raise ValueError(f'Ключ очереди {order_key} ещё не выдавался')
+    entry = QueueEntry.objects.select_for_update().filter(user=user).first()
+    if entry is not None and entry.is_active:
+        return entry
+    if order_key is None:
+        order_key = next_value('order_key')
+    revision = next_value('revision')
+    if entry is None:
+        return QueueEntry.objects.create(user=user, order_key=order_key, revision=revision)
+    # повторное вступление — в конец очереди
+    entry.order_key = order_key
+    entry.left_at = None
+    entry.revision = revision
+    entry.save(update_fields=['order_key', 'left_at', 'revision'])
+    return entry
+
+
+@transaction.atomic
+def leave_queue(user):
+    updated = (QueueEntry.objects
+               .filter(user=user, left_at__isnull=True)
+               .update(left_at=timezone.now(), revision=next_value('revision')))
+    return bool(updated)
+
+
+def get_position(user):
+    return queue_index.position(user.pk)
+
+
+def get_range(start, stop):
+    # участники на местах start..stop включительно: [(место, User), ...]
+    start = max(start, 1)
+    user_ids = queue_index.user_ids(start, stop)
+    users = User.objects.in_bulk(user_ids)
+    return [(start + i, users[user_id]) for i, user_id in enumerate(user_ids) if user_id in users]
+
+
+@receiver(post_delete, sender=QueueEntry)
+def reset_queue_index(sender, instance, **kwargs):
+    queue_index.reset()
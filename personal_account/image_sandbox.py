@@ -0,0 +1,145 @@
+# personal_account/image_sandbox.py
+# Разбор и декодирование загруженных изображений вне веб-воркера.
+# Задания выполняет небольшой пул процессов: у каждого процесса ограничена память
+# (RLIMIT_AS), у каждого задания — время. «Бомба» или битый файл в худшем случае
+# роняют процесс пула, который тут же пересоздаётся, а воркер лишь получает ошибку.
+# Функции, выполняемые в пуле, не обращаются к настройкам Django: процессы
+# запускаются через spawn и django.setup() в них не вызывается. Pillow нужен только
+# в процессах пула, а пул — только при загрузке фото, поэтому и то и другое
+# импортируется при первом использовании, а не при импорте модуля.
+import atexit
+import io
+import resource
+import threading
+import warnings
+
+from django.conf import settings
+
+ALLOWED_FORMATS = {'JPEG', 'PNG', 'WEBP'}
+# сколько заданий может ждать своей очереди на каждый процесс пула
+QUEUE_PER_WORKER = 4
+
+
+class SandboxError(Exception):
+    # изображение не удалось проверить: пул занят, задание не уложилось во время или процесс упал
+    pass
+
+
+def _init_worker(memory_mb, max_pixels):
+    from PIL import Image
+
+    if memory_mb:
+        limit = memory_mb * 2**20
+        resource.setrlimit(resource.RLIMIT_AS, (limit, limit))
+    # больше max_pixels — DecompressionBombError ещё до выделения памяти под пиксели
+    Image.MAX_IMAGE_PIXELS = max_pixels
+    warnings.simplefilter('error', Image.DecompressionBombWarning)
+
+
+def verify_image(data, max_pixels):
+    # Выполняется в пуле. Возвращает (формат, ширина, высота) или бросает ValueError
+    # с сообщением для пользователя.
+    from PIL import Image
+
+    try:
+        with Image.open(io.BytesIO(data)) as image:
+            if image.format not in ALLOWED_FORMATS:
+                raise ValueError('Загрузите изображение в формате JPEG, PNG или WebP')
+            if getattr(image, 'n_frames', 1) > 1:
+                raise ValueError('Анимированные изображения не принимаются')
+            width, height = image.size
+            if width * height > max_pixels:
+                raise ValueError('Слишком большое разрешение изображения')
+            result = (image.format, width, height)
+            image.verify()
+        # verify() не декодирует пиксели — полностью декодируем заново открытый файл
+        with Image.open(io.BytesIO(data)) as image:
+            image.load()
+    except (Image.DecompressionBombError, Image.DecompressionBombWarning):
+        raise ValueError('Слишком большое разрешение изображения')
+    except MemoryError:
+        raise ValueError('Изображение слишком велико для обработки')
+    except (OSError, SyntaxError, EOFError):
+        raise ValueError('Файл повреждён или не является изображением')
+    return result
+
+
+_lock = threading.Lock()
+_executor = None
+_slots = None
+
+
+def _get_executor():
+    global _executor, _slots
+    import multiprocessing
+    from concurrent.futures import ProcessPoolExecutor
+
+    with _lock:
+        if _executor is None:
+            workers = getattr(settings, 'IMAGE_SANDBOX_WORKERS', 2)
+            _executor = ProcessPoolExecutor(
+                workers,
+                mp_context=multiprocessing.get_context('spawn'),
+                initializer=_init_worker,
+                initargs=(getattr(settings, 'IMAGE_SANDBOX_MEMORY_MB', 512), max_pixels()))
+            _slots = threading.BoundedSemaphore(workers * QUEUE_PER_WORKER)
+        return _executor, _slots
+
+
+def _reset(executor):
+    # Зависший процесс из пула не вытащить — убиваем весь пул, следующий вызов создаст новый
+    global _executor
+    with _lock:
+        if _executor is executor:
+            _executor = None
+    for process in list((executor._processes or {}).values()):
+        process.kill()
+    executor.shutdown(wait=False, cancel_futures=True)
+
+
+@atexit.register
+def _shutdown():
+    # Пул освобождаем при выходе, пока модули ещё не выгружены: multiprocessing
+    # импортируется лениво и при завершении интерпретатора выгружается раньше пула
+    global _executor
+    with _lock:
+        executor, _executor = _executor, None
+    if executor is not None:
+        executor.shutdown(wait=False, cancel_futures=True)
+
+
+def max_pixels():
+    return getattr(settings, 'DOCUMENT_PHOTO_MAX_PIXELS', 40_000_000)
+
+
+def run(func, *args, timeout=None):
+    # Выполняет func(*args) в пуле. ValueError из func пробрасывается как есть.
+    from concurrent.futures import TimeoutError
+    from concurrent.futures.process import BrokenProcessPool
+
+    timeout = timeout or getattr(settings, 'IMAGE_SANDBOX_TIMEOUT', 10)
+    executor, slots = _get_executor()
+    if not slots.acquire(timeout=timeout):
+        raise SandboxError('Сервер занят обработкой изображений, попробуйте позже')
+    try:
+        future = executor.submit(func, *args)
+        return future.result(timeout)
+    except TimeoutError:
+        _reset(executor)
+        raise SandboxError('Изображение обрабатывается слишком долго')
+    except MemoryError:
+        raise SandboxError('Изображение слишком велико для обработки')
+    except (BrokenProcessPool, RuntimeError):
+        # RuntimeError — пул успели остановить из другого потока
+        _reset(executor)
+        raise SandboxError('Не удалось обработать изображение')
+    finally:
+        slots.release()
+
+
+def verify_upload(uploaded_file):
+    # Проверяет загруженный файл в пуле; бросает ValueError или SandboxError
+    uploaded_file.seek(0)
+    data = uploaded_file.read()
+    uploaded_file.seek(0)
+    return run(verify_image, data, max_pixels())
@@ -0,0 +1,168 @@
+# personal_account/images.py
+# Нормализация фото документов: поворот по EXIF, уменьшение до DOCUMENT_PHOTO_MAX_SIDE,
+# удаление метаданных (в том числе GPS) и пережатие в JPEG с качеством DOCUMENT_PHOTO_QUALITY.
+# Для проверки администратором большего разрешения не нужно, а файл с телефона
+# после обработки обычно в разы меньше. Здесь же перцептивный хеш для поиска дубликатов.
+# Функции без обращения к моделям: они выполняются и в пуле image_sandbox.
+# Pillow и numpy импортируются внутри функций: модуль импортируется моделями при
+# каждом запуске, а изображения обрабатываются только при загрузке фото.
+import functools
+import io
+import logging
+import os
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+
+from . import image_sandbox
+from .crypto import encrypt_bytes
+from .fields import EncryptedFileSystemStorage
+
+logger = logging.getLogger(__name__)
+
+# перцептивный хеш: DCT уменьшенной до SAMPLE_SIZE копии, берутся HASH_SIDE x HASH_SIDE низких частот
+SAMPLE_SIZE = 32
+HASH_SIDE = 8
+
+
+@functools.lru_cache(maxsize=None)
+def dct_matrix():
+    # матрица DCT-II для SAMPLE_SIZE точек
+    import numpy as np
+
+    return np.cos(np.pi / (2 * SAMPLE_SIZE)
+                  * np.outer(np.arange(SAMPLE_SIZE), 2 * np.arange(SAMPLE_SIZE) + 1))
+
+
+def photo_settings():
+    return (getattr(settings, 'DOCUMENT_PHOTO_MAX_SIDE', 2000),
+            getattr(settings, 'DOCUMENT_PHOTO_QUALITY', 85))
+
+
+def has_metadata(image):
+    # любые метаданные, кроме цветового профиля, считаем лишними
+    return bool(image.getexif()) or any(key in image.info for key in ('exif', 'xmp', 'comment'))
+
+
+def needs_normalizing(image, max_side, target_format):
+    return max(image.size) > max_side or image.format != target_format or has_metadata(image)
+
+
+def data_has_metadata(data):
+    from PIL import Image
+
+    try:
+        with Image.open(io.BytesIO(data)) as image:
+            return has_metadata(image)
+    except (OSError, Image.DecompressionBombError, SyntaxError, ValueError):
+        return False
+
+
+def normalize_image(data, max_side, quality, target_format='JPEG'):
+    # Возвращает байты нормализованного изображения или None, если изображение
+    # уже в норме или это не изображение (такие файлы оставляем как есть).
+    # Выполняется и в пуле image_sandbox, поэтому настройки Django здесь не читаем.
+    from PIL import Image, ImageOps
+
+    try:
+        image = Image.open(io.BytesIO(data))
+        if not needs_normalizing(image, max_side, target_format):
+            return None
+        # JPEG умеет декодироваться сразу в уменьшенном размере — это в разы быстрее
+        image.draft('RGB', (max_side, max_side))
+        image = ImageOps.exif_transpose(image)
+        image.thumbnail((max_side, max_side), Image.Resampling.LANCZOS)
+    except (OSError, Image.DecompressionBombError, SyntaxError, ValueError, MemoryError):
+        return None
+
+    if target_format == 'JPEG' and image.mode != 'RGB':
+        # прозрачность заливаем белым, как фон бумажного документа
+        background = Image.new('RGB', image.size, 'white')
+        if image.mode in ('RGBA', 'LA') or 'transparency' in image.info:
+            image = image.convert('RGBA')
+            background.paste(image, mask=image.getchannel('A'))
+        else:
+            background.paste(image.convert('RGB'))
+        image = background
+
+    output = io.BytesIO()
+    options = {'optimize': True}
+    if target_format == 'JPEG':
+        options.update(quality=quality, progressive=True)
+    if 'icc_profile' in image.info:
+        options['icc_profile'] = image.info['icc_profile']
+    # exif в save не передаём — метаданные в новый файл не попадают
+    image.save(output, target_format, **options)
+    return output.getvalue()
+
+
+def normalize_upload(field_file):
+    # Подменяет ещё не сохранённый файл поля на нормализованный JPEG.
+    # Имя на диске потом всё равно выдаст profile_doc_upload_path, от исходного берётся расширение.
+    field_file.file.seek(0)
+    original = field_file.file.read()
+    try:
+        data = image_sandbox.run(normalize_image, original, *photo_settings())
+    except image_sandbox.SandboxError as error:
+        # файл уже прошёл проверку формы; если пул не справился — сохраняем как есть
+        logger.warning('Фото документа не нормализовано: %s', error)
+        data = None
+    if data is None:
+        field_file.file.seek(0)
+        return 0
+    stem = os.path.splitext(os.path.basename(field_file.name))[0]
+    field_file.file = ContentFile(data)
+    field_file.name = f'{stem}.jpg'
+    saved = len(original) - len(data)
+    logger.info('Фото документа: %d -> %d байт, сэкономлено %d', len(original), len(data), saved)
+    return saved
+
+
+# в каком формате пережимать сохранённый файл, по расширению его имени
+STORED_FORMATS = {'.jpg': 'JPEG', '.jpeg': 'JPEG', '.png': 'PNG', '.webp': 'WEBP'}
+
+
+def normalize_stored(storage, name):
+    # Нормализует уже сохранённый файл на месте, не меняя имени и формата:
+    # путь остаётся прежним, поэтому ссылки в Profile и в истории не ломаются.
+    # Файлы с другими расширениями (.gif, .bmp, .heic...) не трогаем: JPEG под
+    # таким именем отдавался бы с неверным Content-Type.
+    # Возвращает (размер до, размер после); после == до, если файл не менялся.
+    with storage.open(name) as f:
+        original = f.read()
+    target_format = STORED_FORMATS.get(os.path.splitext(name)[1].lower())
+    if target_format is None:
+        return len(original), len(original)
+    data = normalize_image(original, *photo_settings(), target_format=target_format)
+    # файл без метаданных переписываем, только если он стал меньше; с метаданными
+    # (EXIF, GPS) — всегда: их удаление важнее размера
+    if data is None or (len(data) >= len(original) and not data_has_metadata(original)):
+        return len(original), len(original)
+    path = storage.path(name)
+    if isinstance(storage, EncryptedFileSystemStorage):
+        data_on_disk = encrypt_bytes(data)
+    else:
+        data_on_disk = data
+    # пишем рядом и подменяем атомарно, чтобы читатели не увидели обрезанный файл
+    with open(path + '.tmp', 'wb') as f:
+        f.write(data_on_disk)
+    os.replace(path + '.tmp', path)
+    return len(original), len(data)
+
+
+def phash(data):
+    # Выполняется в пуле image_sandbox. Хеш возвращается знаковым 64-битным числом,
+    # как его хранит DocumentHash.phash.
+    import numpy as np
+    from PIL import Image, ImageOps
+
+    with Image.open(io.BytesIO(data)) as image:
+        image.draft('L', (SAMPLE_SIZE * 4, SAMPLE_SIZE * 4))
+        image = ImageOps.exif_transpose(image).convert('L').resize(
+            (SAMPLE_SIZE, SAMPLE_SIZE), Image.Resampling.LANCZOS)
+    pixels = np.asarray(image, dtype=np.float64)
+    dct = dct_matrix()
+    low = (dct @ pixels @ dct.T)[:HASH_SIDE, :HASH_SIDE].flatten()
+    # нулевой коэффициент — средняя яркость, в медиану его не берём
+    bits = low > np.median(low[1:])
+    return int(np.packbits(bits).view('>i8')[0])
@@ -0,0 +1,70 @@
+# personal_account/indexation.py
+# Индексация "стоимости при переходе в очередь" при смене коэффициента.
+# Profile.save() делает full_clean() и пишет строку истории на каждый объект,
+# поэтому здесь профили обрабатываются порциями: одно чтение, один bulk_update
+# и одна пачка строк HistoricalProfile на порцию.
+from decimal import Decimal, ROUND_HALF_UP
+
+from django.core.exceptions import ValidationError
+from django.db import transaction
+from simple_history.utils import bulk_update_with_history
+
+from .auth_backends import forget_users
+from .models import Profile
+
+
+def indexed_price(value, coefficient):
+    return str((Decimal(value) * coefficient).quantize(Decimal('1'), rounding=ROUND_HALF_UP))
+
+
+def iter_price_changes(coefficient, chunk_size=2000):
+    # Порции [(profile, старое значение, новое значение, ошибка), ...] без записи в БД.
+    # ошибка — текст ValidationError, если новое значение не проходит проверки поля:
+    # больше max_length или округлилось до 0. bulk_update_with_history их не делает.
+    field = Profile._meta.get_field('price_in_queue')
+    profiles = (Profile.objects
+                .filter(price_in_queue__regex=r'^[0-9]+$')
+                .select_related('user')
+                .order_by('id'))
+    last_id = 0
+    while True:
+        chunk = list(profiles.filter(id__gt=last_id)[:chunk_size])
+        if not chunk:
+            return
+        last_id = chunk[-1].id
+        changes = []
+        for profile in chunk:
+            new_value = indexed_price(profile.price_in_queue, coefficient)
+            if new_value == profile.price_in_queue:
+                continue
+            try:
+                field.clean(new_value, profile)
+                error = None
+            except ValidationError as e:
+                error = '; '.join(e.messages)
+            changes.append((profile, profile.price_in_queue, new_value, error))
+        yield changes
+
+
+def index_price_in_queue(coefficient, chunk_size=2000, dry_run=False, reason=None):
+    # Пересчитывает price_in_queue всех профилей. Генератор: на каждую порцию
+    # отдаёт (изменённые, отклонённые) — списки (id, email, было, стало[, ошибка]),
+    # так что память не растёт с числом профилей. Отклонённые не записываются.
+    # В режиме dry_run ничего не пишет — только отдаёт разницу.
+    coefficient = Decimal(coefficient)
+    reason = reason or f'Индексация стоимости в очереди, коэффициент {coefficient}'
+    for changes in iter_price_changes(coefficient, chunk_size):
+        changed, rejected, objs = [], [], []
+        for profile, old, new, error in changes:
+            if error:
+                rejected.append((profile.id, profile.user.email, old, new, error))
+                continue
+            changed.append((profile.id, profile.user.email, old, new))
+            profile.price_in_queue = new
+            objs.append(profile)
+        if objs and not dry_run:
+            with transaction.atomic():
+                bulk_update_with_history(objs, Profile, ['price_in_queue'],
+                                         batch_size=500, default_change_reason=reason)
+                forget_users([profile.user_id for profile in objs])
+        yield changed, rejected
@@ -0,0 +1,128 @@
+# personal_account/loadgen.py
+# Нагрузочный прогон по сценарию пользователя против запущенного сервера:
+# регистрация -> вход -> редактирование профиля с фото документа -> просмотры профиля.
+# Клиент — только стандартная библиотека, каждый процесс ведёт своих пользователей.
+import http.cookiejar
+import re
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+import uuid
+
+from .measurements import percentile
+
+LOCKED_MARKER = b'database is locked'
+CSRF_INPUT = re.compile(rb'name="csrfmiddlewaretoken" value="([^"]+)"')
+
+
+class _NoRedirect(urllib.request.HTTPRedirectHandler):
+    # редиректы не выполняем: 302 после POST — это и есть успешный ответ
+    def redirect_request(self, *args, **kwargs):
+        return None
+
+
+class JourneyClient:
+    def __init__(self, base_url, timeout=30):
+        self.base_url = base_url.rstrip('/')
+        self.timeout = timeout
+        self.opener = urllib.request.build_opener(
+            urllib.request.HTTPCookieProcessor(http.cookiejar.CookieJar()), _NoRedirect())
+        self.results = []
+        self.csrf_token = ''
+
+    def request(self, step, path, data=None, content_type=None, expect=(200,)):
+        headers = {}
+        if data is not None:
+            headers['Content-Type'] = content_type or 'application/x-www-form-urlencoded'
+            headers['Referer'] = self.base_url + path
+        req = urllib.request.Request(self.base_url + path, data=data, headers=headers)
+        started = time.perf_counter()
+        try:
+            with self.opener.open(req, timeout=self.timeout) as response:
+                status, body = response.status, response.read()
+        except urllib.error.HTTPError as error:
+            status, body = error.code, error.read()
+        except OSError:
+            status, body = 0, b''
+        elapsed = time.perf_counter() - started
+        self.results.append((step, elapsed, status, status in expect, LOCKED_MARKER in body))
+        match = CSRF_INPUT.search(body)
+        if match:
+            self.csrf_token = match.group(1).decode()
+        return status, body
+
+    def get(self, step, path, expect=(200,)):
+        return self.request(step, path, expect=expect)
+
+    def post(self, step, path, fields, expect=(302,)):
+        fields = {**fields, 'csrfmiddlewaretoken': self.csrf_token}
+        return self.request(step, path, urllib.parse.urlencode(fields).encode(), expect=expect)
+
+    def post_multipart(self, step, path, fields, files, expect=(302,)):
+        boundary = uuid.uuid4().hex
+        parts = []
+        for name, value in {**fields, 'csrfmiddlewaretoken': self.csrf_token}.items():
+            parts.append(f'--{boundary}\r\nContent-Disposition: form-data; name="{name}"\r\n\r\n'
+                         f'{value}\r\n'.encode())
+        for name, (filename, content, file_type) in files.items():
+            parts.append(f'--{boundary}\r\nContent-Disposition: form-data; name="{name}"; '
+                         f'filename="{filename}"\r\nContent-Type: {file_type}\r\n\r\n'.encode()
+                         + content + b'\r\n')
+        parts.append(f'--{boundary}--\r\n'.encode())
+        return self.request(step, path, b''.join(parts),
+                            content_type=f'multipart/form-data; boundary={boundary}', expect=expect)
+
+
+def run_journey(client, email, password, profile_fields, photo, profile_views):
+    client.get('signup GET', '/personal_account/signup/')
+    client.post('signup POST', '/personal_account/signup/', {
+        'email': email, 'first_name': 'Иван', 'last_name': 'Иванов', 'phone': '+79990000000',
+        'password1': password, 'password2': password, 'agree_to_terms': 'on'})
+    client.get('login GET', '/personal_account/login/')
+    status, _ = client.post('login POST', '/personal_account/login/',
+                            {'username': email, 'password': password})
+    if status != 302:
+        return
+    profile_url = f'/personal_account/{urllib.parse.quote(email)}/'
+    client.get('profile edit GET', profile_url + 'profile_edit')
+    client.post_multipart('profile edit POST', profile_url + 'profile_edit',
+                          profile_fields, {'document_photo': photo})
+    for _ in range(profile_views):
+        client.get('profile page', profile_url)
+
+
+def run_worker(task):
+    # Один процесс нагрузки: ждёт своей очереди разгона и проходит journeys сценариев
+    (worker, base_url, delay, journeys, run_id, password,
+     profile_fields, photo, profile_views, timeout) = task
+    time.sleep(delay)
+    results = []
+    for number in range(journeys):
+        client = JourneyClient(base_url, timeout)
+        email = f'load-{run_id}-{worker}-{number}@example.com'
+        run_journey(client, email, password, profile_fields, photo, profile_views)
+        results.extend(client.results)
+    return results
+
+
+def summarize(results):
+    # {шаг: {count, errors, locked, p50, p95, p99}} — время в миллисекундах
+    steps = {}
+    for step, elapsed, status, ok, locked in results:
+        stats = steps.setdefault(step, {'timings': [], 'errors': 0, 'locked': 0})
+        stats['timings'].append(elapsed * 1000)
+        stats['errors'] += not ok
+        stats['locked'] += locked
+    summary = {}
+    for step, stats in steps.items():
+        timings = stats['timings']
+        summary[step] = {
+            'count': len(timings),
+            'errors': stats['errors'],
+            'locked': stats['locked'],
+            'p50': percentile(timings, 50),
+            'p95': percentile(timings, 95),
+            'p99': percentile(timings, 99),
+        }
+    return summary
@@ -0,0 +1,137 @@
+import asyncio
+import io
+import statistics
+import threading
+import time
+import tracemalloc
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.handlers.asgi import ASGIHandler
+from django.core.handlers.wsgi import WSGIHandler
+from django.core.management.base import BaseCommand, CommandError
+from django.test import Client
+
+
+class Command(BaseCommand):
+    help = ('Сравнивает запросы в секунду и память на соединение для страниц профиля '
+            'под WSGI (поток на запрос) и ASGI (асинхронные view)')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--username', help='Пользователь, от имени которого открывать профиль '
+                                               '(по умолчанию — первый в базе)')
+        parser.add_argument('--requests', type=int, default=500, help='Запросов на маршрут')
+        parser.add_argument('--concurrency', type=int, default=50, help='Одновременных запросов')
+
+    def handle(self, *args, **options):
+        user = (User.objects.filter(username=options['username']).first() if options['username']
+                else User.objects.order_by('pk').first())
+        if user is None:
+            raise CommandError('Нет пользователя для входа: создайте его или укажите --username')
+
+        client = Client()
+        client.force_login(user)
+        cookie = f"{settings.SESSION_COOKIE_NAME}={client.cookies[settings.SESSION_COOKIE_NAME].value}"
+        paths = ['/', '/news/', f'/personal_account/{user.username}/']
+
+        total, concurrency = options['requests'], options['concurrency']
+        self.stdout.write(f'{"маршрут":<40}{"сервер":<8}{"запр/с":>10}{"p50, мс":>10}'
+                          f'{"p95, мс":>10}{"КБ/соед.":>10}{"потоков":>9}')
+        for path in paths:
+            for name, runner in (('WSGI', self.run_wsgi), ('ASGI', self.run_asgi)):
+                threads_before = threading.active_count()
+                started = time.perf_counter()
+                latencies, statuses, threads = runner(path, cookie, total, concurrency)
+                elapsed = time.perf_counter() - started
+                # память меряем отдельным прогоном: tracemalloc сильно замедляет запросы
+                tracemalloc.start()
+                runner(path, cookie, concurrency, concurrency)
+                _, peak = tracemalloc.get_traced_memory()
+                tracemalloc.stop()
+                if any(status != 200 for status in statuses):
+                    self.stdout.write(self.style.WARNING(
+                        f'{path}: ответы не 200: {sorted(set(statuses))}'))
+                latencies.sort()
+                self.stdout.write(
+                    f'{path:<40}{name:<8}{total / elapsed:>10.1f}'
+                    f'{statistics.median(latencies) * 1000:>10.1f}'
+                    f'{latencies[int(len(latencies) * 0.95) - 1] * 1000:>10.1f}'
+                    f'{peak / concurrency / 1024:>10.1f}'
+                    f'{max(threads - threads_before, 0):>9}')
+
+    @staticmethod
+    def wsgi_environ(path, cookie):
+        return {
+            'REQUEST_METHOD': 'GET',
+            'PATH_INFO': path,
+            'SCRIPT_NAME': '',
+            'QUERY_STRING': '',
+            'SERVER_NAME': 'localhost',
+            'SERVER_PORT': '80',
+            'SERVER_PROTOCOL': 'HTTP/1.1',
+            'HTTP_HOST': 'localhost',
+            'HTTP_COOKIE': cookie,
+            'wsgi.input': io.BytesIO(),
+            'wsgi.errors': io.StringIO(),
+            'wsgi.url_scheme': 'http',
+        }
+
+    def run_wsgi(self, path, cookie, total, concurrency):
+        # как у потокового WSGI-сервера: каждый одновременный запрос — отдельный поток
+        handler = WSGIHandler()
+        peak_threads = 0
+
+        def one(_):
+            nonlocal peak_threads
+            status = []
+            started = time.perf_counter()
+            body = handler(self.wsgi_environ(path, cookie), lambda s, h, *a: status.append(s))
+            b''.join(body)
+            peak_threads = max(peak_threads, threading.active_count())
+            return time.perf_counter() - started, int(status[0].split()[0])
+
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            results = list(pool.map(one, range(total)))
+        return [r[0] for r in results], [r[1] for r in results], peak_threads
+
+    def run_asgi(self, path, cookie, total, concurrency):
+        handler = ASGIHandler()
+        peak_threads = 0
+
+        async def one(semaphore):
+            nonlocal peak_threads
+            scope = {
+                'type': 'http', 'asgi': {'version': '3.0'}, 'http_version': '1.1',
+                'method': 'GET', 'scheme': 'http', 'path': path, 'raw_path': path.encode(),
+                'root_path': '', 'query_string': b'',
+                'headers': [(b'host', b'localhost'), (b'cookie', cookie.encode())],
+                'client': ('127.0.0.1', 0), 'server': ('localhost', 80),
+            }
+            status = []
+            body_sent = False
+
+            async def receive():
+                nonlocal body_sent
+                if not body_sent:
+                    body_sent = True
+                    return {'type': 'http.request', 'body': b'', 'more_body': False}
+                # клиент не отключается: Django сам отменит ожидание после ответа
+                await asyncio.Future()
+
+            async def send(message):
+                if message['type'] == 'http.response.start':
+                    status.append(message['status'])
+
+            async with semaphore:
+                started = time.perf_counter()
+                await handler(scope, receive, send)
+                peak_threads = max(peak_threads, threading.active_count())
+                return time.perf_counter() - started, status[0]
+
+        async def main():
+            semaphore = asyncio.Semaphore(concurrency)
+            return await asyncio.gather(*(one(semaphore) for _ in range(total)))
+
+        results = asyncio.run(main())
+        return [r[0] for r in results], [r[1] for r in results], peak_threads
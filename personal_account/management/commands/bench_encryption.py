@@ -0,0 +1,77 @@
+import statistics
+import time
+
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.test import Client
+from django.test.utils import setup_test_environment, teardown_test_environment
+
+from personal_account import crypto, fields
+from personal_account.synthetic import generate_rows, insert_rows
+
+
+class Command(BaseCommand):
+    help = ('Замеряет стоимость шифрования персональных данных: шифрование/расшифровка одного '
+            'значения, слепой индекс и доля расшифровки во времени страницы профиля')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--operations', type=int, default=20000, help='Операций в микрозамере')
+        parser.add_argument('--requests', type=int, default=200, help='Запросов страницы профиля')
+
+    def handle(self, *args, **options):
+        operations = options['operations']
+        value = '500100732259'
+        token = crypto.encrypt(value)
+        for name, func, arg in (('шифрование', crypto.encrypt, value),
+                                ('расшифровка', crypto.decrypt, token),
+                                ('слепой индекс', crypto.blind_index, value)):
+            started = time.perf_counter()
+            for _ in range(operations):
+                func(arg)
+            per_op = (time.perf_counter() - started) / operations * 1e6
+            self.stdout.write(f'{name:<16}{per_op:>8.1f} мкс')
+
+        setup_test_environment()
+        old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True)
+        try:
+            self.bench_profile_page(options['requests'])
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+            teardown_test_environment()
+
+    def bench_profile_page(self, requests):
+        user = insert_rows(generate_rows(0, 1), make_password(None))[0]
+        client = Client()
+        client.force_login(user)
+        url = f'/personal_account/{user.username}/'
+        client.get(url)
+
+        # считаем время, проведённое в расшифровке при чтении полей из БД
+        decrypt_time = 0.0
+        decrypt_calls = 0
+        original = fields.decrypt
+
+        def timed_decrypt(value):
+            nonlocal decrypt_time, decrypt_calls
+            started = time.perf_counter()
+            result = original(value)
+            decrypt_time += time.perf_counter() - started
+            decrypt_calls += 1
+            return result
+
+        fields.decrypt = timed_decrypt
+        timings = []
+        try:
+            for _ in range(requests):
+                started = time.perf_counter()
+                client.get(url)
+                timings.append(time.perf_counter() - started)
+        finally:
+            fields.decrypt = original
+
+        page = statistics.median(timings) * 1000
+        per_page = decrypt_time / requests * 1000
+        self.stdout.write(f'страница профиля p50: {page:.2f} мс; расшифровка: '
+                          f'{decrypt_calls / requests:.0f} полей, {per_page:.3f} мс на страницу '
+                          f'({per_page / page:.1%} от медианы)')
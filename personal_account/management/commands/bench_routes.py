@@ -0,0 +1,73 @@
+import tempfile
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test.utils import override_settings, setup_test_environment, teardown_test_environment
+
+from personal_account import benchmarks
+from personal_account.measurements import find_regressions
+
+
+class Command(BaseCommand):
+    help = ('Замеряет задержку (p50/p95/p99) и число SQL-запросов основных маршрутов '
+            'на тестовой базе заданного размера и сравнивает с сохранённым эталоном')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sizes', default='100,10000',
+                            help='Размеры базы (число пользователей) через запятую')
+        parser.add_argument('--iterations', type=int, default=30, help='Замеров на маршрут')
+        parser.add_argument('--routes', default='',
+                            help='Замерять только маршруты, в названии которых есть эта строка')
+        parser.add_argument('--baseline', default=str(settings.BASE_DIR / 'benchmarks' / 'baseline.json'),
+                            help='JSON-файл с эталонными результатами')
+        parser.add_argument('--save-baseline', action='store_true',
+                            help='Записать результаты как новый эталон')
+        parser.add_argument('--tolerance', type=float, default=0.2,
+                            help='Допустимое замедление p95 относительно эталона (0.2 = 20%%)')
+
+    def handle(self, *args, **options):
+        try:
+            sizes = sorted(int(size) for size in options['sizes'].split(','))
+        except ValueError:
+            raise CommandError('--sizes должен быть списком чисел через запятую')
+
+        # замеры идут на отдельной тестовой базе, рабочая не трогается
+        setup_test_environment()
+        old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True)
+        results = {}
+        try:
+            with tempfile.TemporaryDirectory() as media_root, override_settings(
+                    MEDIA_ROOT=media_root, THROTTLE_ENABLED=False):
+                for size in sizes:
+                    self.stdout.write(f'Заполнение базы до {size} пользователей...')
+                    benchmarks.seed_users(size)
+                    self.stdout.write(f'{"маршрут":<28}{"p50":>9}{"p95":>9}{"p99":>9}'
+                                      f'{"запросов":>10}{"ошибок":>8}')
+                    for route in benchmarks.build_routes():
+                        if options['routes'] not in route.name:
+                            continue
+                        result = benchmarks.measure(route, options['iterations'])
+                        results[f'{size}:{route.name}'] = result
+                        self.stdout.write(
+                            f'{route.name:<28}{result["p50_ms"]:>9}{result["p95_ms"]:>9}'
+                            f'{result["p99_ms"]:>9}{result["queries"]:>10}{result["errors"]:>8}')
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+            teardown_test_environment()
+
+        if options['save_baseline']:
+            benchmarks.save_baseline(options['baseline'], results)
+            self.stdout.write(self.style.SUCCESS(f'Эталон сохранён: {options["baseline"]}'))
+            return
+
+        baseline = benchmarks.load_baseline(options['baseline'])
+        if not baseline:
+            self.stdout.write(self.style.WARNING('Эталона нет — сохраните его с --save-baseline'))
+            return
+        regressions = find_regressions(results, baseline, options['tolerance'])
+        if regressions:
+            for line in regressions:
+                self.stdout.write(self.style.ERROR(line))
+            raise CommandError(f'Найдено регрессий: {len(regressions)}')
+        self.stdout.write(self.style.SUCCESS('Регрессий нет'))
@@ -0,0 +1,81 @@
+import statistics
+import time
+from importlib import import_module
+
+from django.conf import settings
+from django.contrib.auth import BACKEND_SESSION_KEY, HASH_SESSION_KEY, SESSION_KEY
+from django.contrib.auth.hashers import make_password
+from django.core.cache import cache
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.test import Client, override_settings
+from django.test.utils import CaptureQueriesContext, setup_test_environment, teardown_test_environment
+
+from personal_account.synthetic import generate_rows, insert_rows
+
+
+class Command(BaseCommand):
+    help = ('Сравнивает накладные расходы сессий на запрос для режимов db, cached_db и signed_cookies: '
+            'чтение и запись сессии, число SQL-запросов и время страницы для вошедшего пользователя')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--operations', type=int, default=2000, help='Операций чтения/записи сессии')
+        parser.add_argument('--requests', type=int, default=200, help='Запросов страницы')
+        parser.add_argument('--path', default='/', help='Страница для замера запроса целиком')
+
+    def handle(self, *args, **options):
+        setup_test_environment()
+        old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True)
+        try:
+            user = insert_rows(generate_rows(0, 1, 'session-bench{}@example.com'), make_password(None))[0]
+            self.stdout.write(f'{"режим":<16}{"чтение, мкс":>12}{"SQL":>6}{"запись, мкс":>13}{"SQL":>6}'
+                              f'{"страница p50, мс":>18}{"SQL":>6}')
+            for mode, engine in settings.SESSION_ENGINES.items():
+                with override_settings(SESSION_ENGINE=engine):
+                    cache.clear()
+                    self.bench_mode(mode, engine, user, options)
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+            teardown_test_environment()
+
+    def bench_mode(self, mode, engine, user, options):
+        store_class = import_module(engine).SessionStore
+        store = store_class()
+        store[SESSION_KEY] = str(user.pk)
+        store[BACKEND_SESSION_KEY] = 'django.contrib.auth.backends.ModelBackend'
+        store[HASH_SESSION_KEY] = user.get_session_auth_hash()
+        store.save()
+        key = store.session_key
+
+        # чтение: как SessionMiddleware + AuthenticationMiddleware на каждом запросе
+        read, read_queries = self.measure(options['operations'],
+                                          lambda i: store_class(key).get(SESSION_KEY))
+
+        # запись: изменение сессии, например при входе или сообщении пользователю
+        def write(i):
+            session = store_class(key)
+            session['bench'] = i
+            session.save()
+        written, write_queries = self.measure(options['operations'], write)
+
+        client = Client()
+        client.force_login(user)
+        timings = []
+        with CaptureQueriesContext(connection) as captured:
+            for _ in range(options['requests']):
+                started = time.perf_counter()
+                client.get(options['path'])
+                timings.append(time.perf_counter() - started)
+        self.stdout.write(f'{mode:<16}{read:>12.1f}{read_queries:>6.1f}{written:>13.1f}{write_queries:>6.1f}'
+                          f'{statistics.median(timings) * 1000:>18.2f}'
+                          f'{len(captured) / options["requests"]:>6.1f}')
+
+    @staticmethod
+    def measure(operations, func):
+        # среднее время операции в мкс и SQL-запросов на операцию
+        with CaptureQueriesContext(connection) as captured:
+            started = time.perf_counter()
+            for i in range(operations):
+                func(i)
+            elapsed = time.perf_counter() - started
+        return elapsed / operations * 1e6, len(captured) / operations
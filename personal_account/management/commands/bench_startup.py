@@ -0,0 +1,52 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from personal_account import benchmarks, startup
+from personal_account.measurements import find_regressions
+
+
+class Command(BaseCommand):
+    help = ('Замеряет время запуска (django.setup() и загрузка URL) в отдельном процессе, '
+            'показывает самые медленные импорты по приложениям и сравнивает с сохранённым эталоном')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--repeat', type=int, default=10, help='Запусков для замера времени')
+        parser.add_argument('--apps', type=int, default=12, help='Сколько приложений и пакетов показать')
+        parser.add_argument('--top', type=int, default=3, help='Самых медленных модулей на приложение')
+        parser.add_argument('--baseline', default=str(settings.BASE_DIR / 'benchmarks' / 'startup.json'),
+                            help='JSON-файл с эталонными результатами')
+        parser.add_argument('--save-baseline', action='store_true',
+                            help='Записать результаты как новый эталон')
+        parser.add_argument('--tolerance', type=float, default=0.2,
+                            help='Допустимое замедление p50 относительно эталона (0.2 = 20%%)')
+
+    def handle(self, *args, **options):
+        result = startup.measure(options['repeat'])
+
+        # -X importtime сам замедляет импорт, поэтому время по приложениям —
+        # для сравнения между собой, а общее время замеряется отдельно
+        self.stdout.write(f'{"приложение / модуль":<48}{"мс":>9}')
+        for app, (spent, modules) in list(startup.profile_imports().items())[:options['apps']]:
+            self.stdout.write(self.style.MIGRATE_HEADING(f'{app:<48}{spent:>9.1f}'))
+            for name, total in modules[:options['top']]:
+                self.stdout.write(f'  {name:<46}{total:>9.1f}')
+
+        self.stdout.write(f'Запуск: p50 {result["p50_ms"]} мс, p95 {result["p95_ms"]} мс, '
+                          f'модулей {result["modules"]}')
+
+        if options['save_baseline']:
+            benchmarks.save_baseline(options['baseline'], result)
+            self.stdout.write(self.style.SUCCESS(f'Эталон сохранён: {options["baseline"]}'))
+            return
+
+        baseline = benchmarks.load_baseline(options['baseline'])
+        if not baseline:
+            self.stdout.write(self.style.WARNING('Эталона нет — сохраните его с --save-baseline'))
+            return
+        regressions = find_regressions({'запуск': result}, {'запуск': baseline}, options['tolerance'],
+                                       timing='p50_ms', counters=('modules',))
+        if regressions:
+            for line in regressions:
+                self.stdout.write(self.style.ERROR(line))
+            raise CommandError(f'Найдено регрессий: {len(regressions)}')
+        self.stdout.write(self.style.SUCCESS('Регрессий нет'))
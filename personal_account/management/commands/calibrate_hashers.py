@@ -0,0 +1,85 @@
+import os
+
+from django.core.management.base import BaseCommand
+
+from personal_account.hashers import argon2_hasher, measure, pbkdf2_hasher
+
+PBKDF2_PROBE = 100_000
+PBKDF2_STEP = 10_000
+# минимум OWASP для PBKDF2-HMAC-SHA256
+PBKDF2_MINIMUM = 600_000
+ARGON2_MEMORY = (19456, 47104, 65536, 131072)
+ARGON2_MAX_TIME = 8
+
+
+class Command(BaseCommand):
+    help = ('Замеряет хеширование пароля на этом сервере и подбирает самые стойкие параметры '
+            'PBKDF2 и Argon2, при которых вход укладывается в заданную задержку и пропускную способность')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--target-ms', type=float, default=250,
+                            help='Допустимое время хеширования при входе, мс')
+        parser.add_argument('--logins-per-second', type=float, default=20,
+                            help='Сколько входов в секунду сервер должен выдерживать')
+        parser.add_argument('--workers', type=int, default=os.cpu_count() or 1,
+                            help='Ядер (процессов), одновременно хеширующих пароли')
+        parser.add_argument('--max-memory-mb', type=int, default=512,
+                            help='Памяти на одновременные хеширования Argon2 во всех процессах, МБ')
+        parser.add_argument('--samples', type=int, default=3, help='Замеров на каждый вариант')
+
+    def handle(self, *args, **options):
+        # одно ядро успевает 1 / время хешей в секунду, поэтому пропускная способность
+        # ограничивает время хеширования так же, как и допустимая задержка
+        budget = min(options['target_ms'], options['workers'] * 1000 / options['logins_per_second'])
+        self.stdout.write(f'Бюджет на одно хеширование: {budget:.0f} мс '
+                          f'(ядер: {options["workers"]}, входов в секунду: {options["logins_per_second"]:g})')
+        self.calibrate_pbkdf2(budget, options)
+        self.calibrate_argon2(budget, options)
+
+    def calibrate_pbkdf2(self, budget, options):
+        seconds = measure(pbkdf2_hasher(PBKDF2_PROBE), options['samples'])
+        # время PBKDF2 растёт линейно с числом итераций
+        iterations = int(budget / 1000 / seconds * PBKDF2_PROBE) // PBKDF2_STEP * PBKDF2_STEP
+        self.stdout.write(f'\nPBKDF2-SHA256: {seconds * 1000 / PBKDF2_PROBE * 100_000:.1f} мс на 100 000 итераций')
+        if iterations < PBKDF2_MINIMUM:
+            self.stdout.write(self.style.WARNING(
+                f'В бюджет укладывается только {iterations} итераций — меньше минимума OWASP '
+                f'{PBKDF2_MINIMUM}. Добавьте ядер или выберите Argon2.'))
+            return
+        latency = measure(pbkdf2_hasher(iterations), options['samples']) * 1000
+        self.stdout.write(self.style.SUCCESS(
+            f'PASSWORD_PBKDF2_ITERATIONS={iterations}  ({latency:.0f} мс, '
+            f'до {options["workers"] * 1000 / latency:.0f} входов в секунду)'))
+
+    def calibrate_argon2(self, budget, options):
+        try:
+            import argon2  # noqa: F401
+        except ImportError:
+            self.stdout.write(self.style.WARNING('\nArgon2: пакет argon2-cffi не установлен'))
+            return
+        self.stdout.write(f'\nArgon2id, parallelism=1\n{"память, КиБ":>12} {"проходов":>9} {"мс":>8}')
+        best = None
+        for memory_cost in ARGON2_MEMORY:
+            # одновременно хешируют все ядра — каждому нужен свой memory_cost
+            if memory_cost * options['workers'] > options['max_memory_mb'] * 1024:
+                break
+            for time_cost in range(1, ARGON2_MAX_TIME + 1):
+                latency = measure(argon2_hasher(time_cost, memory_cost, 1), options['samples']) * 1000
+                self.stdout.write(f'{memory_cost:>12} {time_cost:>9} {latency:>8.1f}')
+                if latency > budget:
+                    break
+                # стойкость к перебору растёт с произведением памяти на число проходов
+                if best is None or memory_cost * time_cost >= best[0] * best[1]:
+                    best = (memory_cost, time_cost, latency)
+            if time_cost == 1 and latency > budget:
+                # даже один проход не уложился — с большей памятью тем более
+                break
+        if best is None or best[0] * best[1] < 19456 * 2:
+            self.stdout.write(self.style.WARNING(
+                'Минимум OWASP (19 МиБ, 2 прохода) в бюджет не укладывается'))
+        if best is not None:
+            memory_cost, time_cost, latency = best
+            self.stdout.write(self.style.SUCCESS(
+                f'PASSWORD_HASH_ALGORITHM=argon2 PASSWORD_ARGON2_MEMORY_COST={memory_cost} '
+                f'PASSWORD_ARGON2_TIME_COST={time_cost} PASSWORD_ARGON2_PARALLELISM=1  '
+                f'({latency:.0f} мс, до {options["workers"] * 1000 / latency:.0f} входов в секунду)'))
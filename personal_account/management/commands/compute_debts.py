@@ -0,0 +1,22 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from personal_account.debts import run_debt_job
+
+
+class Command(BaseCommand):
+    help = 'Пересчитывает задолженность участников, у которых что-то изменилось с прошлого запуска'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--full', action='store_true',
+                            help='Пересчитать всех, не глядя на отметку прошлого запуска')
+        parser.add_argument('--chunk-size', type=int, default=2000,
+                            help='Сколько профилей считать за одну порцию')
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        count = run_debt_job(full=options['full'], chunk_size=options['chunk_size'])
+        elapsed = time.perf_counter() - started
+        self.stdout.write(self.style.SUCCESS(
+            f'Пересчитано задолженностей: {count} за {elapsed:.2f} с'))
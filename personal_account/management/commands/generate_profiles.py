@@ -0,0 +1,55 @@
+import multiprocessing
+import os
+import time
+
+import django
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+
+from personal_account.synthetic import generate_rows, insert_rows
+
+
+def _generate(task):
+    return generate_rows(*task)
+
+
+class Command(BaseCommand):
+    help = ('Создаёт синтетических участников (User, Profile, Profile_address) для нагрузочных тестов. '
+            'Данные генерируются в нескольких процессах и вставляются пачками через bulk_create')
+
+    def add_arguments(self, parser):
+        parser.add_argument('count', type=int, help='Сколько участников создать')
+        parser.add_argument('--workers', type=int, default=os.cpu_count() or 1,
+                            help='Процессов для генерации данных')
+        parser.add_argument('--chunk-size', type=int, default=10000,
+                            help='Участников в одной транзакции')
+        parser.add_argument('--email', default='user{}@example.com',
+                            help='Шаблон email/логина, {} заменяется номером')
+        parser.add_argument('--password', default='Passw0rd-synthetic',
+                            help='Пароль всех созданных участников')
+        parser.add_argument('--seed', type=int, default=0, help='Зерно генератора')
+
+    def handle(self, *args, **options):
+        count, chunk_size = options['count'], options['chunk_size']
+        email = options['email']
+        # продолжаем нумерацию, если участники по этому шаблону уже есть
+        start = User.objects.filter(username__startswith=email.split('{}')[0],
+                                    username__endswith=email.split('{}')[-1]).count()
+        tasks = [(offset, min(offset + chunk_size, start + count), email, options['seed'])
+                 for offset in range(start, start + count, chunk_size)]
+        # хеш пароля один на всех: PBKDF2 на каждого участника занял бы часы
+        password = make_password(options['password'])
+
+        started = time.perf_counter()
+        created = 0
+        with multiprocessing.Pool(options['workers'], initializer=django.setup) as pool:
+            # генерация идёт в процессах параллельно со вставкой в основном процессе
+            for rows in pool.imap(_generate, tasks):
+                insert_rows(rows, password)
+                created += len(rows)
+                elapsed = time.perf_counter() - started
+                self.stdout.write(f'{created}/{count} ({created / elapsed:.0f} в секунду)')
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Создано участников: {created} за {time.perf_counter() - started:.1f} с'))
@@ -0,0 +1,69 @@
+import multiprocessing
+import os
+import time
+
+import django
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+from PIL import Image
+
+from personal_account.document_hashes import refresh_all_matches
+from personal_account.images import phash
+from personal_account.models import DocumentHash, Profile
+
+
+def _hash(task):
+    profile_id, name = task
+    try:
+        with Profile._meta.get_field('document_photo').storage.open(name) as f:
+            return profile_id, name, phash(f.read()), None
+    except (OSError, ValueError, Image.DecompressionBombError) as error:
+        return profile_id, name, None, str(error)
+
+
+class Command(BaseCommand):
+    help = ('Считает перцептивные хеши фото документов, для которых их ещё нет или фото '
+            'сменилось, в пуле процессов, затем пересчитывает число совпадений у всех')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=os.cpu_count() or 1,
+                            help='Процессов для обработки изображений')
+        parser.add_argument('--chunk-size', type=int, default=2000,
+                            help='Хешей в одной вставке')
+
+    def handle(self, *args, **options):
+        hashed = dict(DocumentHash.objects.values_list('profile_id', 'file_name'))
+        tasks = [(profile_id, name) for profile_id, name in
+                 Profile.objects.exclude(document_photo='').exclude(document_photo__isnull=True)
+                 .values_list('pk', 'document_photo').iterator(chunk_size=10000)
+                 if hashed.get(profile_id) != name]
+        self.stdout.write(f'Фото без актуального хеша: {len(tasks)}')
+
+        started = time.perf_counter()
+        done = 0
+        batch = []
+        with multiprocessing.Pool(options['workers'], initializer=django.setup) as pool:
+            for profile_id, name, value, error in pool.imap_unordered(_hash, tasks, chunksize=16):
+                if error:
+                    self.stdout.write(self.style.WARNING(f'{name}: {error}'))
+                    continue
+                batch.append(DocumentHash(profile_id=profile_id, file_name=name, phash=value,
+                                          updated_at=timezone.now()))
+                if len(batch) >= options['chunk_size']:
+                    done += self.save(batch)
+                    batch = []
+            done += self.save(batch)
+        self.stdout.write(f'Посчитано хешей: {done} за {time.perf_counter() - started:.1f} с')
+
+        started = time.perf_counter()
+        changed = refresh_all_matches()
+        self.stdout.write(self.style.SUCCESS(
+            f'Счётчики совпадений обновлены у {changed} профилей за {time.perf_counter() - started:.1f} с; '
+            f'с совпадениями: {DocumentHash.objects.filter(matches__gt=0).count()}'))
+
+    @staticmethod
+    def save(batch):
+        DocumentHash.objects.bulk_create(
+            batch, update_conflicts=True, unique_fields=['profile'],
+            update_fields=['file_name', 'phash', 'updated_at'])
+        return len(batch)
@@ -0,0 +1,47 @@
+from decimal import Decimal, InvalidOperation
+
+from django.core.management.base import BaseCommand, CommandError
+
+from personal_account.indexation import index_price_in_queue
+
+
+class Command(BaseCommand):
+    help = 'Пересчитывает стоимость при переходе в очередь у всех профилей по коэффициенту'
+
+    def add_arguments(self, parser):
+        parser.add_argument('coefficient', help='Коэффициент индексации, например 1.05')
+        parser.add_argument('--chunk-size', type=int, default=2000,
+                            help='Сколько профилей обрабатывать за одну порцию')
+        parser.add_argument('--dry-run', action='store_true',
+                            help='Показать изменения, ничего не записывая')
+        parser.add_argument('--show', type=int, default=20,
+                            help='Сколько строк разницы вывести')
+
+    def handle(self, *args, **options):
+        try:
+            coefficient = Decimal(options['coefficient'])
+        except InvalidOperation:
+            raise CommandError('Коэффициент должен быть числом')
+        if coefficient <= 0:
+            raise CommandError('Коэффициент должен быть положительным')
+
+        changed = rejected = 0
+        for chunk_changed, chunk_rejected in index_price_in_queue(coefficient,
+                                                                  chunk_size=options['chunk_size'],
+                                                                  dry_run=options['dry_run']):
+            for profile_id, email, old, new in chunk_changed[:max(options['show'] - changed, 0)]:
+                self.stdout.write(f'{profile_id}\t{email}\t{old} -> {new}')
+            # отклонённые выводятся все: их нужно поправить вручную
+            for profile_id, email, old, new, error in chunk_rejected:
+                self.stderr.write(f'{profile_id}\t{email}\t{old} -> {new}: {error}')
+            changed += len(chunk_changed)
+            rejected += len(chunk_rejected)
+        if changed > options['show']:
+            self.stdout.write(f'... и ещё {changed - options["show"]}')
+
+        if options['dry_run']:
+            self.stdout.write(self.style.WARNING(f'Пробный запуск: изменится профилей: {changed}'))
+        else:
+            self.stdout.write(self.style.SUCCESS(f'Проиндексировано профилей: {changed}'))
+        if rejected:
+            self.stdout.write(self.style.ERROR(f'Не прошли проверку и не изменены: {rejected}'))
@@ -0,0 +1,99 @@
+import multiprocessing
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from personal_account.benchmarks import document_photo, profile_edit_data
+from personal_account.loadgen import run_worker, summarize
+
+
+class Command(BaseCommand):
+    help = ('Нагрузочный прогон полного сценария: регистрация, вход, редактирование профиля '
+            'с загрузкой фото документа и просмотры профиля. Создаёт пользователей в базе '
+            'сервера — запускайте на копии базы')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--url', default='', help='Адрес уже запущенного сервера')
+        parser.add_argument('--port', type=int, default=8765,
+                            help='Порт для сервера, если --url не указан (запускается runserver)')
+        parser.add_argument('--concurrency', type=int, default=8, help='Процессов-пользователей')
+        parser.add_argument('--journeys', type=int, default=5, help='Сценариев на процесс')
+        parser.add_argument('--ramp-up', type=float, default=5.0,
+                            help='За сколько секунд запустить все процессы')
+        parser.add_argument('--profile-views', type=int, default=10,
+                            help='Сколько раз открыть профиль в конце сценария')
+        parser.add_argument('--timeout', type=float, default=30.0, help='Таймаут запроса, с')
+
+    def handle(self, *args, **options):
+        server = None
+        base_url = options['url']
+        if not base_url:
+            server, log, base_url = self.start_server(options['port'])
+        try:
+            self.run(base_url, options)
+        finally:
+            if server is not None:
+                server.terminate()
+                server.wait(timeout=10)
+                log.seek(0)
+                locked = log.read().count('database is locked')
+                log.close()
+                self.stdout.write(f'"database is locked" в журнале сервера: {locked}')
+
+    def start_server(self, port):
+        # runserver пишет в stderr строку на каждый запрос: через PIPE, который никто
+        # не читает до конца прогона, сервер встал бы, заполнив буфер. Журнал — во временный файл.
+        log = tempfile.TemporaryFile(mode='w+')
+        server = subprocess.Popen(
+            [sys.executable, 'manage.py', 'runserver', '--noreload', f'127.0.0.1:{port}'],
+            cwd=settings.BASE_DIR, stdout=subprocess.DEVNULL, stderr=log, text=True,
+            # все сценарии идут с одного адреса: с ограничением частоты
+            # регистрации и входа почти все они получили бы 429
+            env=dict(os.environ, THROTTLE_ENABLED='0'))
+        deadline = time.monotonic() + 30
+        while time.monotonic() < deadline:
+            try:
+                socket.create_connection(('127.0.0.1', port), timeout=1).close()
+                return server, log, f'http://127.0.0.1:{port}'
+            except OSError:
+                if server.poll() is not None:
+                    log.seek(0)
+                    raise CommandError('Сервер не запустился:\n' + log.read())
+                time.sleep(0.2)
+        server.terminate()
+        log.close()
+        raise CommandError('Сервер не ответил за 30 секунд')
+
+    def run(self, base_url, options):
+        concurrency = options['concurrency']
+        photo_file = document_photo()
+        photo = (photo_file.name, photo_file.read(), photo_file.content_type)
+        fields = {name: value for name, value in profile_edit_data().items() if name != 'document_photo'}
+        run_id = int(time.time())
+        tasks = [(worker, base_url, options['ramp_up'] * worker / concurrency, options['journeys'],
+                  run_id, 'Load-Passw0rd', fields, photo, options['profile_views'], options['timeout'])
+                 for worker in range(concurrency)]
+
+        started = time.perf_counter()
+        with multiprocessing.Pool(concurrency) as pool:
+            results = [row for rows in pool.map(run_worker, tasks) for row in rows]
+        elapsed = time.perf_counter() - started
+
+        summary = summarize(results)
+        self.stdout.write(f'{"шаг":<22}{"запросов":>9}{"ошибок":>8}{"locked":>8}'
+                          f'{"p50, мс":>10}{"p95, мс":>10}{"p99, мс":>10}')
+        for step, stats in summary.items():
+            self.stdout.write(f'{step:<22}{stats["count"]:>9}{stats["errors"]:>8}{stats["locked"]:>8}'
+                              f'{stats["p50"]:>10.1f}{stats["p95"]:>10.1f}{stats["p99"]:>10.1f}')
+        errors = sum(stats['errors'] for stats in summary.values())
+        locked = sum(stats['locked'] for stats in summary.values())
+        self.stdout.write(
+            f'Всего запросов: {len(results)} за {elapsed:.1f} с ({len(results) / elapsed:.1f} в секунду), '
+            f'ошибок: {errors} ({errors / max(len(results), 1):.1%}), '
+            f'"database is locked" в ответах: {locked}')
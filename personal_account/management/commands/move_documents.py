@@ -0,0 +1,45 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from personal_account.document_layout import max_user_id, move_files, planned_moves
+
+
+class Command(BaseCommand):
+    help = ('Переносит фото документов в раскладку каталогов DOCUMENT_FANOUT_LEVELS '
+            'порциями по участникам, обновляя пути в профилях и в истории. Сайт можно не останавливать')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000, help='Участников в одной порции')
+        parser.add_argument('--pause', type=float, default=0.0,
+                            help='Пауза между порциями в секундах, чтобы не забивать диск')
+        parser.add_argument('--dry-run', action='store_true', help='Только посчитать файлы для переноса')
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        last_user_id = max_user_id()
+        self.stdout.write(f'Раскладка: {getattr(settings, "DOCUMENT_FANOUT_LEVELS", 0)} уровней, '
+                          f'участники до id {last_user_id}')
+        started = time.perf_counter()
+        moved = missing = planned = 0
+        for first in range(0, last_user_id + 1, batch_size):
+            moves = planned_moves(first, first + batch_size)
+            planned += len(moves)
+            if not moves or options['dry_run']:
+                continue
+            batch_moved, batch_missing = move_files(moves)
+            moved += batch_moved
+            missing += batch_missing
+            self.stdout.write(f'id {first}..{first + batch_size - 1}: перенесено {batch_moved}, '
+                              f'нет на диске {batch_missing}')
+            if options['pause']:
+                time.sleep(options['pause'])
+
+        if options['dry_run']:
+            self.stdout.write(self.style.SUCCESS(f'К переносу файлов: {planned}'))
+            return
+        if missing:
+            self.stdout.write(self.style.WARNING(f'Файлов нет на диске (пути не изменены): {missing}'))
+        self.stdout.write(self.style.SUCCESS(
+            f'Перенесено файлов: {moved} за {time.perf_counter() - started:.1f} с'))
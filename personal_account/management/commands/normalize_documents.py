@@ -0,0 +1,57 @@
+import multiprocessing
+import os
+import time
+
+import django
+from django.core.management.base import BaseCommand
+
+from personal_account.images import normalize_stored
+from personal_account.models import Profile
+
+
+def _storage():
+    return Profile._meta.get_field('document_photo').storage
+
+
+def _normalize(name):
+    try:
+        return (name, *normalize_stored(_storage(), name), None)
+    except OSError as error:
+        return name, 0, 0, str(error)
+
+
+class Command(BaseCommand):
+    help = ('Нормализует уже загруженные фото документов в media/documents: уменьшает, удаляет '
+            'метаданные и пережимает на месте. Файлы обрабатываются в пуле процессов')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=os.cpu_count() or 1,
+                            help='Процессов для обработки изображений')
+
+    def handle(self, *args, **options):
+        storage = _storage()
+        root = storage.path('documents')
+        names = []
+        for directory, _, files in os.walk(root):
+            for filename in files:
+                if not filename.endswith('.tmp'):
+                    path = os.path.join(directory, filename)
+                    names.append(os.path.relpath(path, storage.location).replace(os.sep, '/'))
+
+        started = time.perf_counter()
+        before_total = after_total = changed = 0
+        # изображения независимы, декодирование упирается в CPU — раздаём по процессам
+        with multiprocessing.Pool(options['workers'], initializer=django.setup) as pool:
+            for name, before, after, error in pool.imap_unordered(_normalize, names, chunksize=8):
+                if error:
+                    self.stdout.write(self.style.WARNING(f'{name}: {error}'))
+                    continue
+                before_total += before
+                after_total += after
+                changed += after != before
+
+        saved = before_total - after_total
+        self.stdout.write(self.style.SUCCESS(
+            f'Файлов: {len(names)}, изменено: {changed}, '
+            f'{before_total / 2**20:.1f} -> {after_total / 2**20:.1f} МБ '
+            f'(сэкономлено {saved / 2**20:.1f} МБ) за {time.perf_counter() - started:.1f} с'))
@@ -0,0 +1,39 @@
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.test import Client
+from django.test.utils import setup_test_environment, teardown_test_environment
+
+from pages.staticfiles import page_weight
+from personal_account import benchmarks
+
+
+class Command(BaseCommand):
+    help = ('Считает байты на просмотр основных страниц: HTML и подключённая статика, '
+            'без сжатия и с gzip. Повторный просмотр — только HTML: статика с хешем в имени '
+            'берётся из кеша браузера')
+
+    def handle(self, *args, **options):
+        setup_test_environment()
+        old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True)
+        try:
+            benchmarks.seed_users(1)
+            user = benchmarks.bench_user()
+            client = Client()
+            client.force_login(user)
+            paths = ['/', '/personal_account/login/', '/personal_account/plug/',
+                     f'/personal_account/{user.username}/']
+            self.stdout.write(f'{"страница":<40}{"HTML":>14}{"статика":>16}{"первый":>16}{"повторный":>14}')
+            for path in paths:
+                weight = page_weight(client.get(path).content.decode())
+                html, assets = weight['html'], weight['static']
+                self.stdout.write(
+                    f'{path:<40}{self.pair(html):>14}{self.pair(assets):>16}'
+                    f'{self.pair((html[0] + assets[0], html[1] + assets[1])):>16}{self.pair(html):>14}')
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+            teardown_test_environment()
+
+    @staticmethod
+    def pair(sizes):
+        # байты без сжатия / с gzip
+        return f'{sizes[0]}/{sizes[1]}'
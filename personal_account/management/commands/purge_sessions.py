@@ -0,0 +1,23 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from personal_account.sessions import purge_expired_sessions
+
+
+class Command(BaseCommand):
+    help = ('Удаляет истёкшие сессии небольшими порциями, не блокируя таблицу надолго '
+            '(замена clearsessions для cron)')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=settings.SESSION_PURGE_BATCH_SIZE,
+                            help='Сессий в одной порции')
+        parser.add_argument('--max-batches', type=int, help='Не больше стольких порций за запуск')
+        parser.add_argument('--pause', type=float, default=0.05, help='Пауза между порциями в секундах')
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        deleted = purge_expired_sessions(options['batch_size'], options['max_batches'], pause=options['pause'])
+        self.stdout.write(self.style.SUCCESS(
+            f'Удалено истёкших сессий: {deleted} за {time.perf_counter() - started:.1f} с'))
@@ -0,0 +1,22 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from personal_account.payment_schedule import rebuild_schedules
+
+
+class Command(BaseCommand):
+    help = 'Пересчитывает графики платежей, у которых изменились входные данные или условия'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=2000,
+                            help='Сколько профилей считать одной матрицей')
+        parser.add_argument('--force', action='store_true',
+                            help='Пересчитать все графики, даже актуальные')
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        rebuilt, removed = rebuild_schedules(chunk_size=options['chunk_size'], force=options['force'])
+        elapsed = time.perf_counter() - started
+        self.stdout.write(self.style.SUCCESS(
+            f'Пересчитано графиков: {rebuilt}, удалено: {removed} за {elapsed:.2f} с'))
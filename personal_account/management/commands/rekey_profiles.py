@@ -0,0 +1,39 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from personal_account.fields import EncryptedFileSystemStorage, reencrypt_model
+from personal_account.models import Profile
+
+
+class Command(BaseCommand):
+    help = ('Перешифровывает паспорт, ИНН и телефон (и историю изменений) первым ключом из '
+            'FIELD_ENCRYPTION_KEYS и пересчитывает слепые индексы. Строки обрабатываются порциями')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000, help='Строк в одной транзакции')
+        parser.add_argument('--files', action='store_true',
+                            help='Также перешифровать файлы фото документов')
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        for model in (Profile, Profile.history.model):
+            count = reencrypt_model(model, batch_size=options['batch_size'])
+            self.stdout.write(f'{model._meta.verbose_name}: {count}')
+
+        if options['files']:
+            storage = Profile._meta.get_field('document_photo').storage
+            if not isinstance(storage, EncryptedFileSystemStorage):
+                self.stdout.write(self.style.WARNING('ENCRYPT_DOCUMENT_FILES выключен — файлы не трогаем'))
+            else:
+                names = (Profile.objects.exclude(document_photo='')
+                         .exclude(document_photo__isnull=True)
+                         .values_list('document_photo', flat=True))
+                count = 0
+                for name in names.iterator(chunk_size=1000):
+                    if storage.exists(name):
+                        storage.reencrypt(name)
+                        count += 1
+                self.stdout.write(f'Файлов: {count}')
+
+        self.stdout.write(self.style.SUCCESS(f'Готово за {time.perf_counter() - started:.1f} с'))
@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand
+
+from pages import error_pages
+
+
+class Command(BaseCommand):
+    help = ('Отрисовывает страницы ошибок 403, 404 и 500 в ERROR_PAGES_ROOT — их отдают '
+            'обработчики ошибок без шаблонов и БД. Запускать при выкладке после collectstatic')
+
+    def handle(self, *args, **options):
+        for status, (path, size) in error_pages.render_all().items():
+            self.stdout.write(f'{status}  {path}  {size} байт')
+        self.stdout.write(self.style.SUCCESS('Страницы ошибок отрисованы'))
@@ -0,0 +1,22 @@
+from django.core.management.base import BaseCommand
+
+from personal_account.throttling import rate, reset_stats, stats
+
+
+class Command(BaseCommand):
+    help = ('Показывает, сколько попыток входа, сброса пароля и регистрации пропущено '
+            'и отклонено ограничением частоты')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--reset', action='store_true', help='Обнулить счётчики после вывода')
+
+    def handle(self, *args, **options):
+        self.stdout.write(f'{"ведро":<24} {"ёмкость":>8} {"в минуту":>9} {"пропущено":>10} {"отклонено":>10}')
+        for scope, counts in stats().items():
+            capacity, per_minute = rate(scope)
+            line = (f'{scope:<24} {capacity:>8} {per_minute:>9} '
+                    f'{counts["admitted"]:>10} {counts["rejected"]:>10}')
+            self.stdout.write(self.style.WARNING(line) if counts['rejected'] else line)
+        if options['reset']:
+            reset_stats()
+            self.stdout.write(self.style.SUCCESS('Счётчики обнулены'))
@@ -0,0 +1,18 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from pages.warmup import warm_up
+
+
+class Command(BaseCommand):
+    help = ('Компилирует все шаблоны, разбирает URL и загружает переводы и манифест статики; '
+            'показывает, сколько это заняло, и падает, если какой-то шаблон не компилируется')
+
+    def handle(self, *args, **options):
+        timings, errors = warm_up()
+        for step, (count, seconds) in timings.items():
+            self.stdout.write(f'{step:<14} {count:>5} {seconds * 1000:>9.1f} мс')
+        for name, error in errors:
+            self.stdout.write(self.style.ERROR(f'{name}: {error}'))
+        if errors:
+            raise CommandError(f'Не компилируются шаблоны: {len(errors)}')
+        self.stdout.write(self.style.SUCCESS('Прогрев завершён'))
@@ -0,0 +1,31 @@
+# personal_account/measurements.py
+# Общее для замеров: перцентиль и сравнение результатов с эталоном.
+# Используется bench_routes, bench_startup и load_journeys. Только стандартная
+# библиотека: модуль импортирует и клиент нагрузки loadgen, которому Django не нужен.
+
+# как называть в отчёте счётчики, которые не должны расти
+COUNTER_LABELS = {'queries': 'запросов', 'modules': 'модулей'}
+
+
+def percentile(values, q):
+    values = sorted(values)
+    index = max(int(round(q / 100 * len(values))) - 1, 0)
+    return values[min(index, len(values) - 1)]
+
+
+def find_regressions(results, baseline, tolerance, timing='p95_ms', counters=('queries',)):
+    # results и baseline — {ключ: {метрика: значение}}. Регрессия — timing медленнее
+    # эталона больше чем на tolerance или любой из counters вырос.
+    # Ключи, которых нет в эталоне, не сравниваются.
+    regressions = []
+    for key, current in results.items():
+        base = baseline.get(key)
+        if base is None:
+            continue
+        if current[timing] > base[timing] * (1 + tolerance):
+            regressions.append(f"{key}: {timing.removesuffix('_ms')} {base[timing]} -> {current[timing]} мс")
+        for counter in counters:
+            if current[counter] > base[counter]:
+                regressions.append(f"{key}: {COUNTER_LABELS.get(counter, counter)} "
+                                   f"{base[counter]} -> {current[counter]}")
+    return regressions
@@ -0,0 +1,43 @@
+# Generated by Django 5.2.18 on 2026-10-19 15:46
+
+import django.core.validators
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('personal_account', '0028_alter_historicalprofile_parther_phone_and_more'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='historicalprofile',
+            name='parther_name',
+            field=models.CharField(blank=True, default='', max_length=60, validators=[django.core.validators.RegexValidator('^[а-яА-ЯёЁ\\s]+$', 'ФИО партнёра может содержать только русские буквы и пробелы')], verbose_name='Фамилия и имя партнёра'),
+        ),
+        migrations.AlterField(
+            model_name='profile',
+            name='parther_name',
+            field=models.CharField(blank=True, default='', max_length=60, validators=[django.core.validators.RegexValidator('^[а-яА-ЯёЁ\\s]+$', 'ФИО партнёра может содержать только русские буквы и пробелы')], verbose_name='Фамилия и имя партнёра'),
+        ),
+        migrations.CreateModel(
+            name='QueueEntry',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('order_key', models.BigIntegerField(unique=True, verbose_name='Ключ очереди')),
+                ('joined_at', models.DateTimeField(auto_now_add=True, verbose_name='Дата вступления')),
+                ('left_at', models.DateTimeField(blank=True, default=None, null=True, verbose_name='Дата выхода')),
+                ('revision', models.BigIntegerField(db_index=True, default=0)),
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='queue_entry', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Место в очереди',
+                'verbose_name_plural': 'Очередь',
+                'ordering': ['order_key'],
+            },
+        ),
+    ]
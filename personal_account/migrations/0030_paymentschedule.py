@@ -0,0 +1,30 @@
+# Generated by Django 5.2.18 on 2026-10-19 15:48
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('personal_account', '0029_queueentry'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PaymentSchedule',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('version', models.CharField(max_length=40, verbose_name='Версия входных данных')),
+                ('monthly_payment', models.DecimalField(decimal_places=2, max_digits=14, verbose_name='Ежемесячный платёж')),
+                ('rows', models.JSONField(default=list, verbose_name='График')),
+                ('updated_at', models.DateTimeField(default=django.utils.timezone.now, verbose_name='Дата расчёта')),
+                ('profile', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='payment_schedule', to='personal_account.profile')),
+            ],
+            options={
+                'verbose_name': 'График платежей',
+                'verbose_name_plural': 'Графики платежей',
+            },
+        ),
+    ]
@@ -0,0 +1,64 @@
+# Generated by Django 5.2.18 on 2026-10-19 15:50
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('personal_account', '0030_paymentschedule'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='JobWatermark',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=50, unique=True)),
+                ('value', models.DateTimeField()),
+            ],
+        ),
+        migrations.AddField(
+            model_name='paymentschedule',
+            name='start_date',
+            field=models.DateField(blank=True, default=None, null=True, verbose_name='Первый платёж'),
+        ),
+        migrations.AlterField(
+            model_name='paymentschedule',
+            name='updated_at',
+            field=models.DateTimeField(db_index=True, default=django.utils.timezone.now, verbose_name='Дата расчёта'),
+        ),
+        migrations.CreateModel(
+            name='DebtSummary',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('expected', models.DecimalField(decimal_places=2, default=0, max_digits=14, verbose_name='Начислено')),
+                ('paid', models.DecimalField(decimal_places=2, default=0, max_digits=14, verbose_name='Оплачено')),
+                ('debt', models.DecimalField(db_index=True, decimal_places=2, default=0, max_digits=14, verbose_name='Долг')),
+                ('has_debt', models.BooleanField(db_index=True, default=False, verbose_name='Есть долг')),
+                ('next_due_date', models.DateField(blank=True, db_index=True, null=True, verbose_name='Следующий платёж')),
+                ('computed_at', models.DateTimeField(default=django.utils.timezone.now, verbose_name='Дата расчёта')),
+                ('profile', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='debt_summary', to='personal_account.profile')),
+            ],
+            options={
+                'verbose_name': 'Задолженность',
+                'verbose_name_plural': 'Задолженности',
+            },
+        ),
+        migrations.CreateModel(
+            name='Payment',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('amount', models.DecimalField(decimal_places=2, max_digits=14, verbose_name='Сумма')),
+                ('paid_at', models.DateField(default=django.utils.timezone.localdate, verbose_name='Дата платежа')),
+                ('updated_at', models.DateTimeField(auto_now=True, db_index=True)),
+                ('profile', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='payments', to='personal_account.profile')),
+            ],
+            options={
+                'verbose_name': 'Платёж',
+                'verbose_name_plural': 'Платежи',
+            },
+        ),
+    ]
@@ -0,0 +1,87 @@
+# Generated by Django 5.2.18 on 2026-10-19 15:58
+
+import personal_account.fields
+import personal_account.models
+from django.db import migrations, models
+
+
+def encrypt_existing(apps, schema_editor):
+    # строки, записанные открытым текстом, шифруются и получают слепые индексы
+    for model_name in ('Profile', 'HistoricalProfile'):
+        personal_account.fields.reencrypt_model(apps.get_model('personal_account', model_name))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('personal_account', '0031_payment_debtsummary'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='historicalprofile',
+            name='id_document_bidx',
+            field=personal_account.fields.BlindIndexField(source='id_document'),
+        ),
+        migrations.AddField(
+            model_name='historicalprofile',
+            name='inn_bidx',
+            field=personal_account.fields.BlindIndexField(source='inn'),
+        ),
+        migrations.AddField(
+            model_name='historicalprofile',
+            name='phone_bidx',
+            field=personal_account.fields.BlindIndexField(source='phone'),
+        ),
+        migrations.AddField(
+            model_name='profile',
+            name='id_document_bidx',
+            field=personal_account.fields.BlindIndexField(source='id_document'),
+        ),
+        migrations.AddField(
+            model_name='profile',
+            name='inn_bidx',
+            field=personal_account.fields.BlindIndexField(source='inn'),
+        ),
+        migrations.AddField(
+            model_name='profile',
+            name='phone_bidx',
+            field=personal_account.fields.BlindIndexField(source='phone'),
+        ),
+        migrations.AlterField(
+            model_name='historicalprofile',
+            name='id_document',
+            field=personal_account.fields.EncryptedCharField(blank=True, default='', max_length=11, validators=[personal_account.models.validate_passport], verbose_name='Серия и номер паспорта'),
+        ),
+        migrations.AlterField(
+            model_name='historicalprofile',
+            name='inn',
+            field=personal_account.fields.EncryptedCharField(blank=True, default='', max_length=12, validators=[personal_account.models.validate_inn], verbose_name='ИНН'),
+        ),
+        migrations.AlterField(
+            model_name='historicalprofile',
+            name='phone',
+            field=personal_account.fields.EncryptedCharField(blank=True, default='', max_length=12, validators=[personal_account.models.validate_phone], verbose_name='Номер телефона'),
+        ),
+        migrations.AlterField(
+            model_name='profile',
+            name='document_photo',
+            field=models.ImageField(blank=True, default='', null=True, storage=personal_account.fields.get_document_storage, upload_to=personal_account.models.profile_doc_upload_path, validators=[personal_account.models.clean_document_photo], verbose_name='Фото документа'),
+        ),
+        migrations.AlterField(
+            model_name='profile',
+            name='id_document',
+            field=personal_account.fields.EncryptedCharField(blank=True, default='', max_length=11, validators=[personal_account.models.validate_passport], verbose_name='Серия и номер паспорта'),
+        ),
+        migrations.AlterField(
+            model_name='profile',
+            name='inn',
+            field=personal_account.fields.EncryptedCharField(blank=True, default='', max_length=12, validators=[personal_account.models.validate_inn], verbose_name='ИНН'),
+        ),
+        migrations.AlterField(
+            model_name='profile',
+            name='phone',
+            field=personal_account.fields.EncryptedCharField(blank=True, default='', max_length=12, validators=[personal_account.models.validate_phone], verbose_name='Номер телефона'),
+        ),
+        migrations.RunPython(encrypt_existing, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,30 @@
+# Generated by Django 5.2.18 on 2026-10-19 16:06
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('personal_account', '0032_encrypt_personal_data'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DocumentHash',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('file_name', models.CharField(max_length=255, verbose_name='Файл')),
+                ('phash', models.BigIntegerField(verbose_name='Перцептивный хеш')),
+                ('matches', models.PositiveIntegerField(db_index=True, default=0, verbose_name='Похожих документов у других участников')),
+                ('updated_at', models.DateTimeField(db_index=True, default=django.utils.timezone.now, verbose_name='Дата расчёта')),
+                ('profile', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='document_hash', to='personal_account.profile', verbose_name='Профиль')),
+            ],
+            options={
+                'verbose_name': 'Хеш фото документа',
+                'verbose_name_plural': 'Хеши фото документов',
+            },
+        ),
+    ]
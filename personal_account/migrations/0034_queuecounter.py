@@ -0,0 +1,31 @@
+# Generated by Django 5.2.18 on 2026-10-19 16:44
+
+from django.db import migrations, models
+from django.db.models import Max
+
+
+def seed_counters(apps, schema_editor):
+    # счётчики продолжают уже выданные ключи и номера изменений
+    QueueEntry = apps.get_model('personal_account', 'QueueEntry')
+    QueueCounter = apps.get_model('personal_account', 'QueueCounter')
+    for name in ('order_key', 'revision'):
+        value = QueueEntry.objects.aggregate(m=Max(name))['m'] or 0
+        QueueCounter.objects.create(name=name, value=value)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('personal_account', '0033_documenthash'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='QueueCounter',
+            fields=[
+                ('name', models.CharField(max_length=32, primary_key=True, serialize=False)),
+                ('value', models.BigIntegerField(default=0)),
+            ],
+        ),
+        migrations.RunPython(seed_counters, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-19 16:46
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('personal_account', '0034_queuecounter'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='debtsummary',
+            name='stale',
+            field=models.BooleanField(db_index=True, default=False, verbose_name='Требует пересчёта'),
+        ),
+    ]
@@ -5,8 +5,12 @@ from django.core.exceptions import ValidationError
 from django.core.validators import RegexValidator
 from simple_history.models import HistoricalRecords
 from django.contrib.auth.models import User
+from django.utils import timezone
 from uuid import uuid4
-import os
+from django.conf import settings
+from .fields import EncryptedCharField, BlindIndexField, get_document_storage
+from .images import normalize_upload
+import hashlib
 import re
 
 def validate_phone(value):
@@ -40,10 +44,20 @@ def validate_price(value):
     if int(value) <= 0:
         raise ValidationError('Стоимость должна быть положительным числом')
     
+def document_dir(user_id, levels=None):
+    # Каталог документов участника. При DOCUMENT_FANOUT_LEVELS > 0 каталоги
+    # раскладываются по префиксам хеша: documents/ab/cd/<user_id>, чтобы в одном
+    # каталоге не было миллионов записей. 0 — старая раскладка documents/<user_id>.
+    if levels is None:
+        levels = getattr(settings, 'DOCUMENT_FANOUT_LEVELS', 0)
+    digest = hashlib.sha1(str(user_id).encode()).hexdigest()
+    fanout = [digest[2 * level:2 * level + 2] for level in range(levels)]
+    return "/".join(["documents", *fanout, str(user_id)])
+
 def profile_doc_upload_path(instance, filename):
     ext = filename.split('.')[-1].lower()
     new_name = f"{uuid4().hex}.{ext}"
-    return os.path.join("documents", str(instance.user.id), new_name)
+    return f"{document_dir(instance.user_id)}/{new_name}"
 
 def clean_document_photo(value):
     filesize = value.size
@@ -69,7 +83,7 @@ class Profile(models.Model):
                                 validators=[RegexValidator(r'^[а-яА-ЯёЁ]+$', 'Отчество может содержать только русские буквы')]
                                 )
     
-    phone = models.CharField(max_length=12,
+    phone = EncryptedCharField(max_length=12,
                              verbose_name='Номер телефона',
                              blank=True,
                              default='',
@@ -86,13 +100,13 @@ class Profile(models.Model):
                                      choices=DOCUMENT_CHOICES, default='Паспорт',
                                      )
 
-    id_document = models.CharField(max_length=11,
+    id_document = EncryptedCharField(max_length=11,
                                    verbose_name='Серия и номер паспорта',
                                    blank=True,
                                    default='',
                                    validators=[validate_passport])
 
-    inn = models.CharField(max_length=12,
+    inn = EncryptedCharField(max_length=12,
                            verbose_name='ИНН',
                            blank=True,
                            default='',
@@ -148,6 +162,7 @@ class Profile(models.Model):
     
     document_photo = models.ImageField(
                                     upload_to=profile_doc_upload_path,
+                                    storage=get_document_storage,
                                     verbose_name="Фото документа",
                                     null=True,
                                     blank=True,
@@ -159,6 +174,11 @@ class Profile(models.Model):
         verbose_name="Разрешено редактирование"
     )
 
+    # слепые индексы для поиска по зашифрованным полям на равенство
+    phone_bidx = BlindIndexField(source='phone')
+    id_document_bidx = BlindIndexField(source='id_document')
+    inn_bidx = BlindIndexField(source='inn')
+
     history = HistoricalRecords()
 
     def clean(self):
@@ -174,6 +194,11 @@ class Profile(models.Model):
 
     def save(self, *args, **kwargs):
         self.full_clean()
+        # новое фото документа уменьшаем и очищаем от метаданных до записи на диск;
+        # флаг нужен обработчику post_save, который считает хеш фото (document_hashes)
+        self._document_photo_uploaded = bool(self.document_photo) and not self.document_photo._committed
+        if self._document_photo_uploaded:
+            normalize_upload(self.document_photo)
         super().save(*args, **kwargs)
 
     def __str__(self):
@@ -216,6 +241,131 @@ class Profile_address(models.Model):
         return f" {self.user.email}"
 
 
+class QueueEntry(models.Model):
+    # Место участника в очереди на жильё.
+    # Позиция не хранится: её считает индекс в housing_queue.py по order_key,
+    # поэтому вступление и выход не перенумеровывают таблицу.
+    user = models.OneToOneField(User, on_delete=models.CASCADE, related_name='queue_entry')
+    order_key = models.BigIntegerField(unique=True, verbose_name='Ключ очереди')
+    joined_at = models.DateTimeField(auto_now_add=True, verbose_name='Дата вступления')
+    left_at = models.DateTimeField(null=True, blank=True, default=None, verbose_name='Дата выхода')
+    # номер изменения — по нему индекс в других процессах догружает только новые записи
+    revision = models.BigIntegerField(default=0, db_index=True)
+
+    class Meta:
+        verbose_name = 'Место в очереди'
+        verbose_name_plural = 'Очередь'
+        ordering = ['order_key']
+
+    @property
+    def is_active(self):
+        return self.left_at is None
+
+    def __str__(self):
+        return f"{self.user.email} - {self.order_key}"
+
+
+class QueueCounter(models.Model):
+    # Счётчики очереди: последний выданный order_key и последний revision.
+    # Значение увеличивается через UPDATE ... SET value = value + 1 в транзакции
+    # вступления или выхода: строка заблокирована до фиксации, поэтому значения
+    # не повторяются, а номера изменений фиксируются строго по возрастанию.
+    name = models.CharField(max_length=32, primary_key=True)
+    value = models.BigIntegerField(default=0)
+
+    def __str__(self):
+        return f"{self.name} = {self.value}"
+
+
+class PaymentSchedule(models.Model):
+    # Сохранённый график платежей. version — хеш входных данных (стоимость,
+    # стоимость при переходе в очередь, условия для типа покупки);
+    # пока он не изменился, график не пересчитывается.
+    profile = models.OneToOneField(Profile, on_delete=models.CASCADE, related_name='payment_schedule')
+    version = models.CharField(max_length=40, verbose_name='Версия входных данных')
+    monthly_payment = models.DecimalField(max_digits=14, decimal_places=2, verbose_name='Ежемесячный платёж')
+    # строки графика: [месяц, платёж, проценты, основной долг, остаток]
+    rows = models.JSONField(default=list, verbose_name='График')
+    # дата первого платежа; при пересчёте графика не сдвигается
+    start_date = models.DateField(null=True, blank=True, default=None, verbose_name='Первый платёж')
+    updated_at = models.DateTimeField(default=timezone.now, db_index=True, verbose_name='Дата расчёта')
+
+    class Meta:
+        verbose_name = 'График платежей'
+        verbose_name_plural = 'Графики платежей'
+
+    def __str__(self):
+        return f"{self.profile.user.email} - {self.monthly_payment}"
+
+
+class Payment(models.Model):
+    # Фактический платёж участника
+    profile = models.ForeignKey(Profile, on_delete=models.CASCADE, related_name='payments')
+    amount = models.DecimalField(max_digits=14, decimal_places=2, verbose_name='Сумма')
+    paid_at = models.DateField(default=timezone.localdate, verbose_name='Дата платежа')
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
+
+    class Meta:
+        verbose_name = 'Платёж'
+        verbose_name_plural = 'Платежи'
+
+    def __str__(self):
+        return f"{self.profile.user.email} - {self.amount}"
+
+
+class DebtSummary(models.Model):
+    # Итог по задолженности участника: одна строка на профиль,
+    # её читают раздел "Долги" и фильтры админки
+    profile = models.OneToOneField(Profile, on_delete=models.CASCADE, related_name='debt_summary')
+    expected = models.DecimalField(max_digits=14, decimal_places=2, default=0, verbose_name='Начислено')
+    paid = models.DecimalField(max_digits=14, decimal_places=2, default=0, verbose_name='Оплачено')
+    debt = models.DecimalField(max_digits=14, decimal_places=2, default=0, db_index=True, verbose_name='Долг')
+    has_debt = models.BooleanField(default=False, db_index=True, verbose_name='Есть долг')
+    # когда наступит следующий платёж — тогда долг нужно пересчитать, даже без изменений
+    next_due_date = models.DateField(null=True, blank=True, db_index=True, verbose_name='Следующий платёж')
+    # платёж или график удалены: у удалённой строки нет updated_at, по которому
+    # её заметила бы ночная задача
+    stale = models.BooleanField(default=False, db_index=True, verbose_name='Требует пересчёта')
+    computed_at = models.DateTimeField(default=timezone.now, verbose_name='Дата расчёта')
+
+    class Meta:
+        verbose_name = 'Задолженность'
+        verbose_name_plural = 'Задолженности'
+
+    def __str__(self):
+        return f"{self.profile.user.email} - {self.debt}"
+
+
+class DocumentHash(models.Model):
+    # Перцептивный хеш фото документа: близкие хеши (по расстоянию Хэмминга)
+    # у разных участников означают, что загружен один и тот же документ.
+    profile = models.OneToOneField(Profile, on_delete=models.CASCADE, related_name='document_hash',
+                                   verbose_name='Профиль')
+    # файл, для которого посчитан хеш; не совпадает с document_photo — хеш устарел
+    file_name = models.CharField(max_length=255, verbose_name='Файл')
+    # 64 бита pHash, хранятся как знаковое число
+    phash = models.BigIntegerField(verbose_name='Перцептивный хеш')
+    matches = models.PositiveIntegerField(default=0, db_index=True,
+                                          verbose_name='Похожих документов у других участников')
+    updated_at = models.DateTimeField(default=timezone.now, db_index=True, verbose_name='Дата расчёта')
+
+    class Meta:
+        verbose_name = 'Хеш фото документа'
+        verbose_name_plural = 'Хеши фото документов'
+
+    def __str__(self):
+        return f"{self.profile.user.email} - {self.phash & 0xFFFFFFFFFFFFFFFF:016x}"
+
+
+class JobWatermark(models.Model):
+    # Отметка последнего успешного запуска фоновой задачи
+    name = models.CharField(max_length=50, unique=True)
+    value = models.DateTimeField()
+
+    def __str__(self):
+        return f"{self.name} - {self.value}"
+
+
 @receiver(post_save, sender=User)
 def create_user_profile(sender, instance, created, **kwargs):
     if created:
@@ -225,4 +375,3 @@ def create_user_profile(sender, instance, created, **kwargs):
 def save_user_profile(sender, instance, **kwargs):
     if hasattr(instance, 'profile'):
         instance.profile.save()
-
@@ -0,0 +1,120 @@
+# personal_account/notifications.py
+# Уведомления пользователю в реальном времени (раздел "Уведомления").
+# События рассылаются через брокер; поток отдаётся асинхронной view по SSE,
+# так что открытое соединение не занимает поток воркера — только корутину.
+import abc
+import asyncio
+import json
+import threading
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models.signals import post_init, post_save
+from django.dispatch import receiver
+from django.utils.module_loading import import_string
+
+from .models import Profile, Profile_address
+
+# сколько событий держим для медленного клиента, прежде чем начать их терять
+SUBSCRIBER_QUEUE_SIZE = 100
+
+
+class BaseBroker(abc.ABC):
+    # Брокер событий. Для нескольких процессов нужен свой брокер
+    # (например, поверх Redis pub/sub) с теми же двумя методами.
+
+    @abc.abstractmethod
+    def publish(self, user_id, event):
+        pass
+
+    @abc.abstractmethod
+    async def subscribe(self, user_id, timeout=None):
+        # асинхронный генератор событий пользователя;
+        # если за timeout секунд ничего не пришло — отдаёт None
+        yield
+
+
+class InProcessBroker(BaseBroker):
+    # Брокер внутри одного процесса: по очереди asyncio на каждое подключение.
+    # publish можно вызывать из любого потока — событие передаётся в цикл
+    # событий подписчика через call_soon_threadsafe.
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._subscribers = {}
+
+    def publish(self, user_id, event):
+        with self._lock:
+            subscribers = list(self._subscribers.get(user_id, ()))
+        for loop, queue in subscribers:
+            loop.call_soon_threadsafe(self._put, queue, event)
+
+    @staticmethod
+    def _put(queue, event):
+        if not queue.full():
+            queue.put_nowait(event)
+
+    async def subscribe(self, user_id, timeout=None):
+        subscriber = (asyncio.get_running_loop(), asyncio.Queue(SUBSCRIBER_QUEUE_SIZE))
+        with self._lock:
+            self._subscribers.setdefault(user_id, []).append(subscriber)
+        try:
+            while True:
+                try:
+                    yield await asyncio.wait_for(subscriber[1].get(), timeout)
+                except asyncio.TimeoutError:
+                    yield None
+        finally:
+            with self._lock:
+                subscribers = self._subscribers.get(user_id, [])
+                if subscriber in subscribers:
+                    subscribers.remove(subscriber)
+                if not subscribers:
+                    self._subscribers.pop(user_id, None)
+
+
+_broker = None
+
+
+def get_broker():
+    global _broker
+    if _broker is None:
+        path = getattr(settings, 'NOTIFICATIONS_BROKER', 'personal_account.notifications.InProcessBroker')
+        _broker = import_string(path)()
+    return _broker
+
+
+def notify(user_id, kind, message):
+    # событие уходит подписчикам только после фиксации транзакции
+    event = {'type': kind, 'message': message}
+    transaction.on_commit(lambda: get_broker().publish(user_id, event))
+
+
+def format_sse(event):
+    return f"event: notification\ndata: {json.dumps(event, ensure_ascii=False)}\n\n"
+
+
+# Запоминаем исходные значения, чтобы уведомлять только об изменении флага.
+# Читаем из __dict__: отложенное (.only/.defer) поле не должно вызывать запрос.
+@receiver(post_init, sender=Profile)
+def remember_can_edit(sender, instance, **kwargs):
+    instance._initial_can_edit = instance.__dict__.get('can_edit')
+
+
+@receiver(post_init, sender=Profile_address)
+def remember_is_approved(sender, instance, **kwargs):
+    instance._initial_is_approved = instance.__dict__.get('is_approved')
+
+
+@receiver(post_save, sender=Profile)
+def notify_can_edit(sender, instance, created, **kwargs):
+    if not created and instance.can_edit and instance._initial_can_edit is False:
+        notify(instance.user_id, 'can_edit', 'Администратор разрешил редактирование профиля')
+    instance._initial_can_edit = instance.can_edit
+
+
+@receiver(post_save, sender=Profile_address)
+def notify_address_approved(sender, instance, created, **kwargs):
+    if instance.is_approved and not instance._initial_is_approved:
+        notify(instance.user_id, 'address_approved', 'Адрес подтверждён')
+    instance._initial_is_approved = instance.is_approved
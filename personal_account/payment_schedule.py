@@ -0,0 +1,157 @@
+# personal_account/payment_schedule.py
+# График платежей для раздела "График платежей".
+# Аннуитетные таблицы считаются пачкой массивами numpy: одна матрица
+# (профили x месяцы) вместо цикла по профилям и месяцам.
+import hashlib
+from decimal import Decimal
+
+import numpy as np
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from .models import Profile, PaymentSchedule
+
+# условия рассрочки по типу покупки: годовая ставка и срок в месяцах
+DEFAULT_TERMS = {
+    'Первичный': {'annual_rate': 0.06, 'months': 120},
+    'Вторичный': {'annual_rate': 0.08, 'months': 84},
+}
+
+
+def get_terms():
+    return getattr(settings, 'PAYMENT_SCHEDULE_TERMS', DEFAULT_TERMS)
+
+
+def schedule_inputs(price, price_in_queue, type_of_purchase, terms=None):
+    # (сумма рассрочки, месячная ставка, срок) или None, если считать нечего.
+    # Стоимость при переходе в очередь вносится сразу, остаток идёт в рассрочку.
+    terms = (terms or get_terms()).get(type_of_purchase)
+    if not price or not price.isdigit() or terms is None:
+        return None
+    down_payment = int(price_in_queue) if price_in_queue and price_in_queue.isdigit() else 0
+    principal = max(int(price) - down_payment, 0)
+    return principal, terms['annual_rate'] / 12, int(terms['months'])
+
+
+def schedule_version(principal, monthly_rate, months):
+    raw = f"{principal}|{monthly_rate!r}|{months}"
+    return hashlib.sha1(raw.encode()).hexdigest()
+
+
+def amortize(principals, monthly_rates, months):
+    # Аннуитетные таблицы для k профилей сразу.
+    # Возвращает матрицы (k x max(months)): платёж, проценты, основной долг, остаток.
+    # Ячейки после окончания срока профиля заполнены нулями.
+    principal = np.asarray(principals, dtype=np.float64)[:, None]
+    rate = np.asarray(monthly_rates, dtype=np.float64)[:, None]
+    term = np.maximum(np.asarray(months, dtype=np.int64), 1)[:, None]
+    t = np.arange(1, term.max() + 1)[None, :]
+    has_rate = rate > 0
+    safe_rate = np.where(has_rate, rate, 1.0)
+
+    growth_n = (1 + safe_rate) ** term
+    annuity = np.where(has_rate, principal * safe_rate * growth_n / (growth_n - 1), principal / term)
+
+    growth_t = (1 + safe_rate) ** t
+    balance = np.where(has_rate,
+                       principal * growth_t - annuity * (growth_t - 1) / safe_rate,
+                       principal - annuity * t)
+    balance = np.clip(balance, 0, None)
+    prev_balance = np.concatenate([principal, balance[:, :-1]], axis=1)
+    interest = np.where(has_rate, prev_balance * rate, 0.0)
+    payment = np.broadcast_to(annuity, balance.shape).copy()
+
+    # деньги в копейках: последний платёж закрывает остаток после округлений
+    interest = np.round(interest, 2)
+    payment = np.round(payment, 2)
+    principal_part = payment - interest
+    rows, last = np.arange(len(term)), term[:, 0] - 1
+    paid_before = np.cumsum(principal_part, axis=1) - principal_part
+    principal_part[rows, last] = np.round(principal[:, 0] - paid_before[rows, last], 2)
+    payment[rows, last] = principal_part[rows, last] + interest[rows, last]
+    balance = np.round(principal - np.cumsum(principal_part, axis=1), 2)
+
+    outside = t > term
+    for matrix in (payment, interest, principal_part, balance):
+        matrix[outside] = 0
+    return payment, interest, principal_part, balance
+
+
+def build_schedules(inputs):
+    # inputs: список (principal, monthly_rate, months) -> список (ежемесячный платёж, строки)
+    if not inputs:
+        return []
+    principals, rates, months = zip(*inputs)
+    payment, interest, principal_part, balance = amortize(principals, rates, months)
+    # + 0.0 убирает "-0.0" после округления
+    table = np.round(np.stack([payment, interest, principal_part, balance], axis=2), 2) + 0.0
+    result = []
+    for i, term in enumerate(months):
+        rows = [[month, *values] for month, values in enumerate(table[i, :term].tolist(), start=1)]
+        result.append((Decimal(str(table[i, 0, 0])), rows))
+    return result
+
+
+def first_payment_date(today=None):
+    # первый платёж — первое число следующего месяца
+    today = today or timezone.localdate()
+    if today.month == 12:
+        return today.replace(year=today.year + 1, month=1, day=1)
+    return today.replace(month=today.month + 1, day=1)
+
+
+def rebuild_schedules(chunk_size=2000, force=False, terms=None):
+    # Пакетный пересчёт, например после смены ставки.
+    # Профили читаются порциями, устаревшие графики считаются одной матрицей на порцию
+    # и записываются через bulk_create/bulk_update. Графики профилей, для которых
+    # считать больше нечего (стоимость стёрта), удаляются.
+    # Возвращает (пересчитано, удалено).
+    terms = terms or get_terms()
+    profiles = Profile.objects.values_list('id', 'price', 'price_in_queue', 'type_of_purchase').order_by('id')
+    rebuilt = removed = 0
+    last_id = 0
+    while True:
+        chunk = list(profiles.filter(id__gt=last_id)[:chunk_size])
+        if not chunk:
+            break
+        last_id = chunk[-1][0]
+        existing = {profile_id: (pk, version) for profile_id, pk, version in
+                    PaymentSchedule.objects
+                    .filter(profile_id__in=[row[0] for row in chunk])
+                    .values_list('profile_id', 'id', 'version')}
+        stale, obsolete = [], []
+        for profile_id, price, price_in_queue, type_of_purchase in chunk:
+            inputs = schedule_inputs(price, price_in_queue, type_of_purchase, terms)
+            if inputs is None:
+                if profile_id in existing:
+                    obsolete.append(existing[profile_id][0])
+                continue
+            version = schedule_version(*inputs)
+            if force or existing.get(profile_id, (None, None))[1] != version:
+                stale.append((profile_id, version, inputs))
+        if obsolete:
+            # delete() по одному запросу на порцию; post_delete помечает долг к пересчёту
+            removed += PaymentSchedule.objects.filter(pk__in=obsolete).delete()[0]
+        if not stale:
+            continue
+
+        now = timezone.now()
+        start_date = first_payment_date()
+        built = build_schedules([inputs for _, _, inputs in stale])
+        to_create, to_update = [], []
+        for (profile_id, version, _), (monthly_payment, rows) in zip(stale, built):
+            schedule = PaymentSchedule(profile_id=profile_id, version=version,
+                                       monthly_payment=monthly_payment, rows=rows, updated_at=now)
+            if profile_id in existing:
+                schedule.pk = existing[profile_id][0]
+                to_update.append(schedule)
+            else:
+                schedule.start_date = start_date
+                to_create.append(schedule)
+        with transaction.atomic():
+            PaymentSchedule.objects.bulk_update(
+                to_update, ['version', 'monthly_payment', 'rows', 'updated_at'], batch_size=500)
+            PaymentSchedule.objects.bulk_create(to_create, batch_size=500)
+        rebuilt += len(stale)
+    return rebuilt, removed
@@ -0,0 +1,172 @@
+# personal_account/protected_media.py
+# Отдача загруженных документов только владельцу и персоналу.
+# Django лишь проверяет права, а сам файл передаёт фронтовой веб-сервер:
+# nginx по X-Accel-Redirect, Apache/lighttpd по X-Sendfile. Без него файл отдаёт
+# FileResponse: целиком — через wsgi.file_wrapper (sendfile у gunicorn),
+# с поддержкой Range и условных запросов (ETag / If-Modified-Since).
+import mimetypes
+import os
+import posixpath
+import re
+from urllib.parse import quote
+
+from django.conf import settings
+from django.http import FileResponse, HttpResponse
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, quote_etag
+
+from .fields import EncryptedFileSystemStorage
+from .models import Profile
+
+PROTECTED_PREFIX = 'documents/'
+RANGE_RE = re.compile(r'^bytes=(\d*)-(\d*)$')
+BLOCK_SIZE = 64 * 1024
+
+
+def normalize_path(path):
+    # путь относительно MEDIA_ROOT или None, если он выходит за пределы документов
+    path = posixpath.normpath(path).lstrip('/')
+    if not path.startswith(PROTECTED_PREFIX) or '..' in path.split('/'):
+        return None
+    return path
+
+
+def can_access(user, path):
+    # персонал видит любые документы, пользователь — только текущее фото своего профиля
+    if not user.is_authenticated:
+        return False
+    if user.is_staff:
+        return True
+    return Profile.objects.filter(user=user, document_photo=path).exists()
+
+
+class FileRange:
+    # Файл, из которого читается только диапазон [start, start + length).
+    # fileno() оставлен: gunicorn отдаёт такой файл через sendfile с текущей позиции.
+
+    def __init__(self, file, start, length):
+        self.file = file
+        self.remaining = length
+        file.seek(start)
+
+    def read(self, size=-1):
+        if size < 0 or size > self.remaining:
+            size = self.remaining
+        data = self.file.read(size)
+        self.remaining -= len(data)
+        return data
+
+    def fileno(self):
+        return self.file.fileno()
+
+    def tell(self):
+        return self.file.tell()
+
+    def close(self):
+        self.file.close()
+
+
+def parse_range(header, size):
+    # (start, end) включительно; None — отдать файл целиком; ValueError — диапазон вне файла.
+    # Несколько диапазонов сразу не поддерживаем: по RFC 9110 можно ответить всем файлом.
+    match = RANGE_RE.match(header.replace(' ', ''))
+    if not match or match.group(1) == match.group(2) == '':
+        return None
+    first, last = match.groups()
+    if first == '':
+        # bytes=-N — последние N байт
+        start, end = max(size - int(last), 0), size - 1
+    else:
+        start = int(first)
+        end = min(int(last), size - 1) if last else size - 1
+    if start >= size or start > end:
+        raise ValueError(header)
+    return start, end
+
+
+def file_etag(stat):
+    return quote_etag(f'{stat.st_mtime_ns:x}-{stat.st_size:x}')
+
+
+def if_range_matches(request, etag, last_modified):
+    # Range выполняется, только если у клиента та же версия файла
+    if_range = request.headers.get('If-Range')
+    if not if_range:
+        return True
+    if if_range.startswith(('"', 'W/')):
+        return if_range == etag
+    return if_range == http_date(last_modified)
+
+
+def accel_response(path, content_type):
+    server = getattr(settings, 'PROTECTED_MEDIA_SERVER', '')
+    response = HttpResponse(content_type=content_type)
+    if server == 'nginx':
+        internal_url = getattr(settings, 'PROTECTED_MEDIA_INTERNAL_URL', '/protected-media/')
+        response['X-Accel-Redirect'] = quote(internal_url.rstrip('/') + '/' + path)
+    else:
+        response['X-Sendfile'] = os.path.join(settings.MEDIA_ROOT, path)
+    return response
+
+
+def serve(request, path):
+    # Ответ с файлом path или None, если файла нет. Права уже проверены вызывающей стороной.
+    storage = Profile._meta.get_field('document_photo').storage
+    full_path = storage.path(path)
+    try:
+        stat = os.stat(full_path)
+    except (FileNotFoundError, NotADirectoryError):
+        return None
+    content_type = mimetypes.guess_type(path)[0] or 'application/octet-stream'
+    encrypted = isinstance(storage, EncryptedFileSystemStorage)
+
+    # Зашифрованный файл веб-сервер отдать не может — его расшифровывает Django
+    if getattr(settings, 'PROTECTED_MEDIA_SERVER', '') and not encrypted:
+        response = accel_response(path, content_type)
+    else:
+        response = file_response(request, path, storage, stat, content_type)
+        if response.status_code in (304, 412, 416):
+            return response
+
+    response.setdefault('Content-Disposition', 'inline')
+    # документы с персональными данными не должны оседать в общих кешах
+    response['Cache-Control'] = 'private, no-cache'
+    response['X-Content-Type-Options'] = 'nosniff'
+    return response
+
+
+def file_response(request, path, storage, stat, content_type):
+    etag = file_etag(stat)
+    last_modified = int(stat.st_mtime)
+    conditional = get_conditional_response(request, etag=etag, last_modified=last_modified)
+    if conditional is not None:
+        if conditional.status_code == 304:
+            conditional['ETag'] = etag
+        return conditional
+
+    file = storage.open(path)
+    size = file.size
+    byte_range = None
+    if 'Range' in request.headers and if_range_matches(request, etag, last_modified):
+        try:
+            byte_range = parse_range(request.headers['Range'], size)
+        except ValueError:
+            file.close()
+            response = HttpResponse(status=416)
+            response['Content-Range'] = f'bytes */{size}'
+            return response
+
+    if byte_range is None:
+        response = FileResponse(file, content_type=content_type)
+        response.block_size = BLOCK_SIZE
+    else:
+        start, end = byte_range
+        response = FileResponse(FileRange(file, start, end - start + 1),
+                                content_type=content_type, status=206)
+        response.block_size = BLOCK_SIZE
+        response['Content-Range'] = f'bytes {start}-{end}/{size}'
+        response['Content-Length'] = end - start + 1
+    response['Accept-Ranges'] = 'bytes'
+    response['ETag'] = etag
+    response['Last-Modified'] = http_date(last_modified)
+    return response
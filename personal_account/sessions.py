@@ -0,0 +1,27 @@
+# personal_account/sessions.py
+# Очистка истёкших сессий. Django сам строки django_session не удаляет,
+# а clearsessions одним DELETE по всей таблице надолго блокирует SQLite.
+# Здесь удаляем небольшими порциями по индексу expire_date. Запускается командой
+# purge_sessions из cron — одна очистка на сервер, а не по потоку в каждом воркере.
+import time
+
+from django.contrib.sessions.models import Session
+from django.utils import timezone
+
+
+def purge_expired_sessions(batch_size=500, max_batches=None, pause=0.0):
+    # Удаляет истёкшие сессии порциями по batch_size; между порциями — пауза,
+    # чтобы не мешать запросам. Возвращает число удалённых строк.
+    now = timezone.now()
+    deleted = 0
+    batches = 0
+    while max_batches is None or batches < max_batches:
+        keys = list(Session.objects.filter(expire_date__lt=now)
+                    .values_list('session_key', flat=True)[:batch_size])
+        if not keys:
+            break
+        deleted += Session.objects.filter(session_key__in=keys).delete()[0]
+        batches += 1
+        if pause:
+            time.sleep(pause)
+    return deleted
@@ -0,0 +1,98 @@
+# personal_account/startup.py
+# Время запуска процесса: django.setup() и загрузка URL — то, что делает каждая
+# команда manage.py и каждый новый воркер до первого запроса. Замер идёт
+# в отдельном интерпретаторе, иначе модули уже будут в sys.modules.
+# Запускается командой bench_startup.
+import os
+import statistics
+import subprocess
+import sys
+
+from django.apps import apps
+from django.conf import settings
+
+from .measurements import percentile
+
+CHILD = '''
+import sys
+import time
+
+started = time.perf_counter()
+import django
+
+django.setup()
+from django.urls import get_resolver
+
+get_resolver().url_patterns
+print(time.perf_counter() - started, len(sys.modules))
+'''
+
+
+def run_child(*options):
+    env = dict(os.environ, DJANGO_SETTINGS_MODULE=settings.SETTINGS_MODULE)
+    # на сервере модули загружаются из __pycache__; без него замер — это
+    # в основном компиляция исходников, а не импорт
+    env.pop('PYTHONDONTWRITEBYTECODE', None)
+    return subprocess.run([sys.executable, *options, '-c', CHILD], cwd=settings.BASE_DIR, env=env,
+                          capture_output=True, text=True, check=True)
+
+
+def measure(repeat):
+    # {'p50_ms', 'p95_ms', 'modules'} за repeat запусков; первый запуск
+    # (запись __pycache__, холодный дисковый кеш) не считается
+    run_child()
+    timings, modules = [], 0
+    for _ in range(repeat):
+        seconds, modules = run_child().stdout.split()
+        timings.append(float(seconds) * 1000)
+    return {
+        'p50_ms': round(statistics.median(timings), 1),
+        'p95_ms': round(percentile(timings, 95), 1),
+        'modules': int(modules),
+    }
+
+
+def app_of(module, app_names):
+    # самое длинное имя приложения, которому принадлежит модуль
+    owners = [name for name in app_names if module == name or module.startswith(name + '.')]
+    return max(owners, key=len, default=None)
+
+
+def parse_importtime(text, app_names):
+    # Разбирает вывод python -X importtime в [(модуль, приложение, своё мкс, всего мкс)].
+    # Модуль относится к ближайшему приложению среди тех, кто его импортировал:
+    # numpy, импортированный из personal_account.images, — на счёт personal_account.
+    # Строки идут в порядке завершения импорта (дети раньше родителей), поэтому
+    # читаем их с конца и держим стек предков по отступу.
+    rows = []
+    stack = []
+    for line in reversed(text.splitlines()):
+        if not line.startswith('import time:'):
+            continue
+        own, total, name = line[len('import time:'):].split('|')
+        try:
+            own, total = int(own), int(total)
+        except ValueError:
+            # заголовок «self [us] | cumulative | imported package»
+            continue
+        depth = len(name) - len(name.lstrip())
+        name = name.strip()
+        while stack and stack[-1][0] >= depth:
+            stack.pop()
+        owner = app_of(name, app_names) or (stack[-1][1] if stack else name.split('.')[0])
+        stack.append((depth, owner))
+        rows.append((name, owner, own, total))
+    return rows
+
+
+def profile_imports():
+    # {приложение: (своё время всех его импортов, мс, [(модуль, всего мс), ...] по убыванию)}
+    app_names = [config.name for config in apps.get_app_configs()]
+    rows = parse_importtime(run_child('-X', 'importtime').stderr, app_names)
+    groups = {}
+    for name, owner, own, total in rows:
+        group = groups.setdefault(owner, [0, []])
+        group[0] += own / 1000
+        group[1].append((name, total / 1000))
+    return {owner: (spent, sorted(modules, key=lambda item: -item[1]))
+            for owner, (spent, modules) in sorted(groups.items(), key=lambda item: -item[1][0])}
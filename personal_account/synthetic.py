@@ -0,0 +1,134 @@
+# personal_account/synthetic.py
+# Синтетические, но правдоподобные участники для нагрузочных тестов.
+# Все значения проходят валидаторы моделей: русские ФИО, телефон +7XXXXXXXXXX,
+# ИНН с верными контрольными цифрами, паспорт из 11 символов, дата выдачи позже
+# даты рождения. Строки генерируются без обращения к БД — это можно делать в
+# отдельных процессах, а вставка идёт пачками через bulk_create.
+import datetime
+import random
+
+from django.contrib.auth.models import User
+from django.db import transaction
+
+from .models import Profile, Profile_address
+
+MALE_FIRST_NAMES = ['Александр', 'Алексей', 'Андрей', 'Артём', 'Борис', 'Вадим', 'Василий',
+                    'Виктор', 'Владимир', 'Дмитрий', 'Евгений', 'Иван', 'Игорь', 'Кирилл',
+                    'Максим', 'Михаил', 'Николай', 'Олег', 'Павел', 'Сергей', 'Фёдор', 'Юрий']
+FEMALE_FIRST_NAMES = ['Александра', 'Алёна', 'Анна', 'Валентина', 'Вера', 'Галина', 'Дарья',
+                      'Екатерина', 'Елена', 'Ирина', 'Ксения', 'Людмила', 'Марина', 'Мария',
+                      'Наталья', 'Нина', 'Ольга', 'Светлана', 'Татьяна', 'Юлия']
+# фамилии на -ов/-ев/-ин: женская форма получается добавлением "а"
+LAST_NAMES = ['Иванов', 'Смирнов', 'Кузнецов', 'Попов', 'Васильев', 'Петров', 'Соколов',
+              'Михайлов', 'Новиков', 'Фёдоров', 'Морозов', 'Волков', 'Алексеев', 'Лебедев',
+              'Семёнов', 'Егоров', 'Павлов', 'Козлов', 'Степанов', 'Николаев', 'Орлов',
+              'Андреев', 'Макаров', 'Никитин', 'Захаров', 'Зайцев', 'Соловьёв', 'Борисов']
+# отчества без окончания: + "ич" / + "на"
+PATRONYMIC_STEMS = ['Александров', 'Алексеев', 'Андреев', 'Борисов', 'Викторов', 'Владимиров',
+                    'Дмитриев', 'Евгеньев', 'Иванов', 'Игорев', 'Михайлов', 'Николаев',
+                    'Олегов', 'Павлов', 'Петров', 'Сергеев', 'Юрьев']
+REGIONS = [
+    ('Москва', 'Москва', '101'), ('Санкт-Петербург', 'Санкт-Петербург', '190'),
+    ('Московская область', 'Подольск', '142'), ('Свердловская область', 'Екатеринбург', '620'),
+    ('Новосибирская область', 'Новосибирск', '630'), ('Республика Татарстан', 'Казань', '420'),
+    ('Нижегородская область', 'Нижний Новгород', '603'), ('Краснодарский край', 'Краснодар', '350'),
+    ('Самарская область', 'Самара', '443'), ('Ростовская область', 'Ростов-на-Дону', '344'),
+]
+STREETS = ['Ленина', 'Мира', 'Советская', 'Садовая', 'Молодёжная', 'Центральная', 'Школьная',
+           'Лесная', 'Набережная', 'Гагарина', 'Пушкина', 'Строителей']
+
+INN_WEIGHTS_11 = [7, 2, 4, 10, 3, 5, 9, 4, 6, 8]
+INN_WEIGHTS_12 = [3, 7, 2, 4, 10, 3, 5, 9, 4, 6, 8]
+
+
+def inn_check_digit(digits, weights):
+    return sum(d * w for d, w in zip(digits, weights)) % 11 % 10
+
+
+def random_inn(rng):
+    # ИНН физического лица: 10 цифр + две контрольные
+    digits = [rng.randint(1, 9), rng.randint(0, 9)] + [rng.randint(0, 9) for _ in range(8)]
+    digits.append(inn_check_digit(digits, INN_WEIGHTS_11))
+    digits.append(inn_check_digit(digits, INN_WEIGHTS_12))
+    return ''.join(map(str, digits))
+
+
+def random_phone(rng):
+    return f'+79{rng.randint(0, 999999999):09d}'
+
+
+def random_person(rng):
+    last_name = rng.choice(LAST_NAMES)
+    stem = rng.choice(PATRONYMIC_STEMS)
+    if rng.random() < 0.5:
+        return rng.choice(MALE_FIRST_NAMES), last_name, stem + 'ич'
+    return rng.choice(FEMALE_FIRST_NAMES), last_name + 'а', stem + 'на'
+
+
+def random_address(rng, prefix):
+    region, city, postal_prefix = rng.choice(REGIONS)
+    street = rng.choice(STREETS)
+    house = str(rng.randint(1, 150))
+    apartament = str(rng.randint(1, 400))
+    return {
+        f'{prefix}_country': 'Россия',
+        f'{prefix}_region': region,
+        f'{prefix}_city': city,
+        f'{prefix}_address': f'г. {city}, ул. {street}, д. {house}, кв. {apartament}',
+        f'{prefix}_street': street,
+        f'{prefix}_house': house,
+        f'{prefix}_apartament': apartament,
+        f'{prefix}_postal_code': f'{postal_prefix}{rng.randint(0, 999):03d}',
+    }
+
+
+def generate_rows(start, stop, email_template='user{}@example.com', seed=0):
+    # Строки для участников с номерами start..stop-1 (только данные, без БД).
+    # Один и тот же seed и номер всегда дают одного и того же участника.
+    rng = random.Random(f'{seed}:{start}')
+    today = datetime.date.today()
+    rows = []
+    for number in range(start, stop):
+        first_name, last_name, surname = random_person(rng)
+        partner_first, partner_last, _ = random_person(rng)
+        birth_date = today - datetime.timedelta(days=rng.randint(20 * 365, 70 * 365))
+        # паспорт выдаётся в 14 лет и позже
+        date_of_issue = birth_date + datetime.timedelta(
+            days=rng.randint(14 * 365 + 4, (today - birth_date).days - 1))
+        price = rng.randrange(2_000_000, 15_000_000, 1000)
+        email = email_template.format(number)
+        rows.append({
+            'user': {'username': email, 'email': email,
+                     'first_name': first_name, 'last_name': last_name},
+            'profile': {
+                'surname': surname,
+                'phone': random_phone(rng),
+                'id_document': f'{rng.randint(1000, 9999)} {rng.randint(0, 999999):06d}',
+                'inn': random_inn(rng),
+                'type_of_purchase': rng.choice(['Первичный', 'Вторичный']),
+                'price': str(price),
+                'price_in_queue': str(price * rng.randint(10, 30) // 100),
+                'birth_date': birth_date,
+                'date_of_issue': date_of_issue,
+                'id_coor': f'BW-{number:08d}',
+                'parther_name': f'{partner_last} {partner_first}',
+                'parther_phone': random_phone(rng),
+            },
+            'address': {**random_address(rng, 'reg'), **random_address(rng, 'act')},
+        })
+    return rows
+
+
+def insert_rows(rows, password):
+    # Вставка пачкой в одной транзакции. bulk_create не вызывает save(),
+    # поэтому нет ни full_clean(), ни сигналов post_save, ни строк истории.
+    with transaction.atomic():
+        users = User.objects.bulk_create(
+            [User(password=password, **row['user']) for row in rows], batch_size=2000)
+        Profile.objects.bulk_create(
+            [Profile(user_id=user.pk, **row['profile']) for user, row in zip(users, rows)],
+            batch_size=2000)
+        Profile_address.objects.bulk_create(
+            [Profile_address(user_id=user.pk, **row['address']) for user, row in zip(users, rows)],
+            batch_size=2000)
+    return users
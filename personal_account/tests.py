@@ -1,3 +1,967 @@
-from django.test import TestCase
+import datetime
+import io
+import json
+import os
+import random
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from unittest import mock
+from types import SimpleNamespace
+from decimal import Decimal
 
-# Create your tests here.
+from cryptography.fernet import Fernet
+from PIL import Image
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.contrib.sessions.models import Session
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from django.core.exceptions import ImproperlyConfigured, ValidationError
+from django.core.files.storage import FileSystemStorage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.test import RequestFactory, SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from site_bw.testing import PLAIN_STATIC
+
+from . import (crypto, debts, document_layout, housing_queue, image_sandbox, images, notifications, protected_media,
+               sessions, synthetic, throttling)
+from .forms import ProfileUpdateForm
+from .auth_backends import CachedModelBackend, cache_key
+from .document_hashes import HammingIndex, hamming
+from .fields import EncryptedFileSystemStorage
+from .indexation import index_price_in_queue
+from .payment_schedule import build_schedules, rebuild_schedules, schedule_inputs
+from .measurements import find_regressions, percentile
+from .startup import parse_importtime
+from .housing_queue import OrderStatisticIndex
+from .models import (DebtSummary, DocumentHash, JobWatermark, Payment, PaymentSchedule, Profile, QueueCounter,
+                     QueueEntry, document_dir)
+
+KEY_OLD = Fernet.generate_key().decode()
+KEY_NEW = Fernet.generate_key().decode()
+SETTINGS_CHILD = '''
+import json
+import sys
+
+from django.conf import settings
+
+print(json.dumps({name: getattr(settings, name) for name in sys.argv[1:]}))
+'''
+
+
+def load_settings(*names, **env):
+    # Настройки, собранные с заданными переменными окружения, в отдельном
+    # интерпретаторе: модуль настроек читает окружение один раз при импорте.
+    # Возвращает {имя: значение} или текст ошибки.
+    env = {**os.environ, 'DJANGO_SETTINGS_MODULE': 'site_bw.settings', 'DJANGO_ENV': 'development', **env}
+    result = subprocess.run([sys.executable, '-c', SETTINGS_CHILD, *names], cwd=settings.BASE_DIR,
+                            env=env, capture_output=True, text=True)
+    return json.loads(result.stdout) if result.returncode == 0 else result.stderr
+
+
+@override_settings(FIELD_ENCRYPTION_KEYS=[KEY_OLD], BLIND_INDEX_KEY='test-blind-index')
+class CryptoTests(SimpleTestCase):
+
+    def test_round_trip(self):
+        token = crypto.encrypt('4510 123456')
+        self.assertTrue(token.startswith(crypto.TOKEN_PREFIX))
+        self.assertNotIn('123456', token)
+        self.assertEqual(crypto.decrypt(token), '4510 123456')
+        self.assertEqual(crypto.decrypt_bytes(crypto.encrypt_bytes(b'\xff\xd8photo')), b'\xff\xd8photo')
+
+    def test_empty_values_are_not_encrypted(self):
+        self.assertEqual(crypto.encrypt(''), '')
+        self.assertIsNone(crypto.encrypt(None))
+        self.assertEqual(crypto.decrypt(''), '')
+
+    def test_plaintext_written_before_encryption_is_returned_as_is(self):
+        self.assertEqual(crypto.decrypt('4510 123456'), '4510 123456')
+        self.assertEqual(crypto.decrypt_bytes(b'\xff\xd8\xff\xe0 jpeg'), b'\xff\xd8\xff\xe0 jpeg')
+
+    def test_rotation_keeps_old_tokens_readable(self):
+        token = crypto.encrypt('+79990000000')
+        with override_settings(FIELD_ENCRYPTION_KEYS=[KEY_NEW, KEY_OLD]):
+            self.assertEqual(crypto.decrypt(token), '+79990000000')
+            rotated = crypto.encrypt(crypto.decrypt(token))
+        with override_settings(FIELD_ENCRYPTION_KEYS=[KEY_NEW]):
+            self.assertEqual(crypto.decrypt(rotated), '+79990000000')
+
+    def test_token_without_matching_key_raises(self):
+        token = crypto.encrypt('7707083893')
+        file_token = crypto.encrypt_bytes(b'photo')
+        with override_settings(FIELD_ENCRYPTION_KEYS=[KEY_NEW]):
+            with self.assertRaises(crypto.DecryptionError):
+                crypto.decrypt(token)
+            with self.assertRaises(crypto.DecryptionError):
+                crypto.decrypt_bytes(file_token)
+
+    def test_decrypted_size_matches_plaintext(self):
+        for size in (0, 1, 15, 16, 17, 1000):
+            with self.subTest(size):
+                self.assertEqual(crypto.decrypted_size(crypto.encrypt_bytes(b'x' * size)), size)
+        self.assertEqual(crypto.decrypted_size(b'\xff\xd8 plain jpeg'), 13)
+        token = crypto.encrypt_bytes(b'photo')
+        with override_settings(FIELD_ENCRYPTION_KEYS=[KEY_NEW, KEY_OLD]):
+            self.assertEqual(crypto.decrypted_size(token), 5)
+        with override_settings(FIELD_ENCRYPTION_KEYS=[KEY_NEW]):
+            with self.assertRaises(crypto.DecryptionError):
+                crypto.decrypted_size(token)
+
+    def test_storage_reencrypts_file_in_place(self):
+        root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, root)
+        storage = EncryptedFileSystemStorage(location=root)
+        name = storage.save('documents/1/photo.jpg', ContentFile(b'\xff\xd8photo'))
+        self.assertEqual(storage.size(name), 7)
+        with override_settings(FIELD_ENCRYPTION_KEYS=[KEY_NEW, KEY_OLD]):
+            storage.reencrypt(name)
+        self.assertEqual(os.listdir(os.path.dirname(storage.path(name))), ['photo.jpg'])
+        with override_settings(FIELD_ENCRYPTION_KEYS=[KEY_NEW]):
+            with storage.open(name) as f:
+                self.assertEqual(f.read(), b'\xff\xd8photo')
+            self.assertEqual(storage.size(name), 7)
+
+    def test_blind_index_ignores_whitespace_and_depends_on_key(self):
+        index = crypto.blind_index('4510 123456')
+        self.assertEqual(index, crypto.blind_index('4510123456'))
+        self.assertEqual(crypto.blind_index(''), '')
+        with override_settings(BLIND_INDEX_KEY='other'):
+            self.assertNotEqual(crypto.blind_index('4510123456'), index)
+
+
+class OrderStatisticIndexTests(SimpleTestCase):
+
+    def test_matches_sorted_list_under_random_changes(self):
+        rng = random.Random(26)
+        index = OrderStatisticIndex()
+        keys = set(rng.sample(range(1, 200), 60))
+        index.build(keys)
+        for _ in range(500):
+            key = rng.randrange(1, 300)
+            if rng.random() < 0.5:
+                index.set(key, True)
+                keys.add(key)
+            else:
+                index.set(key, False)
+                keys.discard(key)
+            ordered = sorted(keys)
+            self.assertEqual(len(index), len(ordered))
+            probe = rng.randrange(1, 300)
+            self.assertEqual(index.rank(probe), ordered.index(probe) + 1 if probe in keys else None)
+            if ordered:
+                position = rng.randrange(1, len(ordered) + 1)
+                self.assertEqual(index.select(position), ordered[position - 1])
+        self.assertEqual(index.slice(3, 7), sorted(keys)[2:7])
+
+    def test_empty_and_out_of_range(self):
+        index = OrderStatisticIndex()
+        self.assertEqual(len(index), 0)
+        self.assertIsNone(index.select(1))
+        self.assertIsNone(index.rank(5))
+        self.assertEqual(index.slice(1, 10), [])
+        index.build([2, 4])
+        self.assertIsNone(index.select(3))
+        self.assertEqual(index.slice(2, 100), [4])
+
+
+class HousingQueueTests(TestCase):
+
+    def setUp(self):
+        housing_queue.queue_index.reset()
+        self.users = [User.objects.create(username=f'queue{i}', email=f'queue{i}@example.com')
+                      for i in range(3)]
+
+    def test_join_leave_and_rejoin(self):
+        for user in self.users:
+            housing_queue.join_queue(user)
+        self.assertEqual([housing_queue.get_position(user) for user in self.users], [1, 2, 3])
+        housing_queue.leave_queue(self.users[0])
+        self.assertIsNone(housing_queue.get_position(self.users[0]))
+        self.assertEqual(housing_queue.get_position(self.users[2]), 2)
+        housing_queue.join_queue(self.users[0])
+        self.assertEqual(housing_queue.get_position(self.users[0]), 3)
+        self.assertEqual([user for _, user in housing_queue.get_range(1, 3)],
+                         [self.users[1], self.users[2], self.users[0]])
+
+    def test_keys_and_revisions_come_from_counters(self):
+        entries = [housing_queue.join_queue(user) for user in self.users]
+        self.assertEqual(len({entry.order_key for entry in entries}), 3)
+        self.assertEqual(len({entry.revision for entry in entries}), 3)
+        self.assertEqual(QueueCounter.objects.get(name='order_key').value, max(e.order_key for e in entries))
+        # счётчик пересоздаётся от максимума по таблице, если строки нет
+        QueueCounter.objects.all().delete()
+        self.assertEqual(housing_queue.next_value('order_key'), max(e.order_key for e in entries) + 1)
+
+    def test_order_key_must_be_already_issued(self):
+        housing_queue.join_queue(self.users[0])
+        with self.assertRaises(ValueError):
+            housing_queue.join_queue(self.users[1], order_key=10**12)
+        self.assertFalse(QueueEntry.objects.filter(user=self.users[1]).exists())
+
+    def test_other_process_sees_changes(self):
+        housing_queue.join_queue(self.users[0])
+        other = housing_queue.QueueIndex()
+        self.assertEqual(other.position(self.users[0].pk), 1)
+        housing_queue.join_queue(self.users[1])
+        housing_queue.leave_queue(self.users[0])
+        self.assertIsNone(other.position(self.users[0].pk))
+        self.assertEqual(other.position(self.users[1].pk), 1)
+
+
+class AddMonthsTests(SimpleTestCase):
+
+    def test_day_is_clamped_to_month_length(self):
+        self.assertEqual(debts.add_months(datetime.date(2024, 1, 31), 1), datetime.date(2024, 2, 29))
+        self.assertEqual(debts.add_months(datetime.date(2025, 1, 31), 1), datetime.date(2025, 2, 28))
+        self.assertEqual(debts.add_months(datetime.date(2025, 1, 31), 2), datetime.date(2025, 3, 31))
+        self.assertEqual(debts.add_months(datetime.date(2025, 11, 30), 3), datetime.date(2026, 2, 28))
+        self.assertEqual(debts.add_months(datetime.date(2025, 3, 31), -1), datetime.date(2025, 2, 28))
+
+    def test_months_due(self):
+        start = datetime.date(2025, 1, 31)
+        self.assertEqual(debts.months_due(None, start), 0)
+        self.assertEqual(debts.months_due(start, datetime.date(2025, 1, 30)), 0)
+        self.assertEqual(debts.months_due(start, start), 1)
+        self.assertEqual(debts.months_due(start, datetime.date(2025, 2, 27)), 1)
+        # платёж за февраль наступает 28-го, а не переносится на март
+        self.assertEqual(debts.months_due(start, datetime.date(2025, 2, 28)), 2)
+        self.assertEqual(debts.months_due(start, datetime.date(2025, 3, 30)), 2)
+        self.assertEqual(debts.months_due(start, datetime.date(2025, 3, 31)), 3)
+
+
+@override_settings(FIELD_ENCRYPTION_KEYS=[KEY_OLD], BLIND_INDEX_KEY='test-blind-index')
+class DebtJobTests(TestCase):
+
+    def setUp(self):
+        users = synthetic.insert_rows(synthetic.generate_rows(0, 2), password='!')
+        self.profile, self.other = [user.profile for user in users]
+        today = timezone.localdate()
+        # три платежа по 1000 уже наступили, четвёртый — через месяц
+        PaymentSchedule.objects.create(
+            profile=self.profile, version='test', monthly_payment=1000,
+            rows=[[month, 1000, 0, 1000, 0] for month in range(1, 7)],
+            start_date=debts.add_months(today, -2))
+        Payment.objects.create(profile=self.profile, amount=Decimal('500'))
+        Payment.objects.create(profile=self.other, amount=Decimal('100'))
+
+    def summary(self, profile):
+        return DebtSummary.objects.get(profile=profile)
+
+    def test_full_run(self):
+        self.assertEqual(debts.run_debt_job(), 2)
+        summary = self.summary(self.profile)
+        self.assertEqual((summary.expected, summary.paid, summary.debt), (3000, 500, 2500))
+        self.assertTrue(summary.has_debt)
+        self.assertEqual(summary.next_due_date, debts.add_months(timezone.localdate(), 1))
+        self.assertFalse(self.summary(self.other).has_debt)
+
+    def test_incremental_run_picks_only_changed_profiles(self):
+        # данные изменены давно, задолго до отметки и её запаса
+        long_ago = timezone.now() - datetime.timedelta(days=1)
+        Payment.objects.update(updated_at=long_ago)
+        PaymentSchedule.objects.update(updated_at=long_ago)
+        debts.run_debt_job()
+        self.assertEqual(debts.run_debt_job(), 0)
+        Payment.objects.create(profile=self.profile, amount=Decimal('2500'))
+        self.assertEqual(debts.run_debt_job(), 1)
+        self.assertEqual(self.summary(self.profile).debt, 0)
+
+    def test_commit_after_watermark_is_not_missed(self):
+        debts.run_debt_job()
+        Payment.objects.create(profile=self.profile, amount=Decimal('2500'))
+        # платёж сохранён до старта задачи, но закоммичен уже после него
+        JobWatermark.objects.filter(name=debts.WATERMARK_NAME).update(
+            value=timezone.now() + datetime.timedelta(minutes=1))
+        debts.run_debt_job()
+        self.assertEqual(self.summary(self.profile).debt, 0)
+
+    def test_deleting_payment_or_schedule_marks_profile_stale(self):
+        debts.run_debt_job()
+        next_due_date = self.summary(self.profile).next_due_date
+        Payment.objects.filter(profile=self.profile).delete()
+        Payment.objects.filter(profile=self.other).delete()
+        self.assertTrue(self.summary(self.other).stale)
+        # дату следующего платежа удаление не трогает
+        self.assertEqual(self.summary(self.profile).next_due_date, next_due_date)
+        PaymentSchedule.objects.filter(profile=self.profile).delete()
+        self.assertEqual(debts.run_debt_job(), 2)
+        self.assertEqual(self.summary(self.other).paid, 0)
+        summary = self.summary(self.profile)
+        self.assertEqual((summary.expected, summary.debt, summary.stale), (0, 0, False))
+
+
+class NotificationStreamTests(TestCase):
+
+    def test_wsgi_request_is_rejected(self):
+        response = self.client.get(reverse('personal_account:notifications_stream'))
+        self.assertEqual(response.status_code, 501)
+
+    async def test_asgi_request_requires_login(self):
+        response = await self.async_client.get(reverse('personal_account:notifications_stream'))
+        self.assertEqual(response.status_code, 401)
+
+    def test_broker_must_implement_both_methods(self):
+        class PublishOnly(notifications.BaseBroker):
+            def publish(self, user_id, event):
+                pass
+
+        with self.assertRaises(TypeError):
+            PublishOnly()
+        self.assertIsInstance(notifications.InProcessBroker(), notifications.BaseBroker)
+
+
+@override_settings(FIELD_ENCRYPTION_KEYS=[KEY_OLD], BLIND_INDEX_KEY='test-blind-index')
+class IndexationTests(TestCase):
+
+    def setUp(self):
+        rows = synthetic.generate_rows(0, 4)
+        for row, price in zip(rows, ['1000', '2', '600000000000', '']):
+            row['profile']['price_in_queue'] = price
+        self.profiles = [user.profile for user in synthetic.insert_rows(rows, password='!')]
+
+    def prices(self):
+        return [Profile.objects.get(pk=profile.pk).price_in_queue for profile in self.profiles]
+
+    def run_indexation(self, coefficient, **kwargs):
+        chunks = list(index_price_in_queue(coefficient, chunk_size=2, **kwargs))
+        changed = [(old, new) for chunk_changed, _ in chunks for _, _, old, new in chunk_changed]
+        rejected = [(old, new) for _, chunk_rejected in chunks for _, _, old, new, _ in chunk_rejected]
+        return len(chunks), changed, rejected
+
+    def test_values_rounded_to_zero_are_rejected(self):
+        chunks, changed, rejected = self.run_indexation('0.2')
+        self.assertEqual(chunks, 2)
+        self.assertEqual(changed, [('1000', '200'), ('600000000000', '120000000000')])
+        self.assertEqual(rejected, [('2', '0')])
+        self.assertEqual(self.prices(), ['200', '2', '120000000000', ''])
+
+    def test_values_longer_than_field_are_rejected(self):
+        _, changed, rejected = self.run_indexation('2')
+        self.assertEqual(changed, [('1000', '2000'), ('2', '4')])
+        self.assertEqual(rejected, [('600000000000', '1200000000000')])
+        self.assertEqual(self.prices(), ['2000', '4', '600000000000', ''])
+
+    def test_dry_run_writes_nothing(self):
+        _, changed, _ = self.run_indexation('2', dry_run=True)
+        self.assertEqual(len(changed), 2)
+        self.assertEqual(self.prices(), ['1000', '2', '600000000000', ''])
+
+
+@override_settings(FIELD_ENCRYPTION_KEYS=[KEY_OLD], BLIND_INDEX_KEY='test-blind-index')
+class ProtectedMediaRangeTests(SimpleTestCase):
+    name = 'documents/1/photo.jpg'
+    content = bytes(range(256)) * 4
+
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.root)
+        self.storage = FileSystemStorage(location=self.root)
+        self.storage.save(self.name, ContentFile(self.content))
+
+    def get(self, byte_range=None, if_range=None, storage=None):
+        storage = storage or self.storage
+        headers = {'Range': byte_range, 'If-Range': if_range}
+        request = RequestFactory().get('/', headers={k: v for k, v in headers.items() if v})
+        stat = os.stat(storage.path(self.name))
+        response = protected_media.file_response(request, self.name, storage, stat, 'image/jpeg')
+        body = b''.join(response.streaming_content) if response.streaming else response.content
+        response.close()
+        return response, body
+
+    def test_without_range_returns_whole_file(self):
+        response, body = self.get()
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(body, self.content)
+        self.assertEqual(response['Accept-Ranges'], 'bytes')
+
+    def test_ranges(self):
+        cases = {
+            'bytes=10-19': (10, 19),
+            'bytes=1000-': (1000, 1023),
+            'bytes=1000-5000': (1000, 1023),
+            'bytes=-24': (1000, 1023),
+            'bytes=-5000': (0, 1023),
+        }
+        for header, (start, end) in cases.items():
+            with self.subTest(header):
+                response, body = self.get(header)
+                self.assertEqual(response.status_code, 206)
+                self.assertEqual(body, self.content[start:end + 1])
+                self.assertEqual(response['Content-Range'], f'bytes {start}-{end}/1024')
+                self.assertEqual(response['Content-Length'], str(end - start + 1))
+
+    def test_unsatisfiable_range(self):
+        for header in ('bytes=1024-', 'bytes=20-10'):
+            with self.subTest(header):
+                response, _ = self.get(header)
+                self.assertEqual(response.status_code, 416)
+                self.assertEqual(response['Content-Range'], 'bytes */1024')
+
+    def test_unsupported_range_returns_whole_file(self):
+        for header in ('bytes=0-1,5-6', 'items=0-1', 'bytes=-'):
+            with self.subTest(header):
+                response, body = self.get(header)
+                self.assertEqual(response.status_code, 200)
+                self.assertEqual(body, self.content)
+
+    def test_if_range(self):
+        etag = self.get()[0]['ETag']
+        response, body = self.get('bytes=0-9', if_range=etag)
+        self.assertEqual((response.status_code, body), (206, self.content[:10]))
+        response, body = self.get('bytes=0-9', if_range='"stale"')
+        self.assertEqual((response.status_code, body), (200, self.content))
+
+    def test_range_of_encrypted_file_is_taken_from_plaintext(self):
+        storage = EncryptedFileSystemStorage(location=tempfile.mkdtemp(dir=self.root))
+        storage.save(self.name, ContentFile(self.content))
+        response, body = self.get('bytes=100-199', storage=storage)
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(body, self.content[100:200])
+        self.assertEqual(response['Content-Range'], 'bytes 100-199/1024')
+
+
+@override_settings(THROTTLE_ENABLED=True, THROTTLE_RATES={'login_ip': (3, 6), 'login_account': (2, 1)},
+                   STORAGES=PLAIN_STATIC)
+class ThrottlingTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.addCleanup(cache.clear)
+
+    def test_bucket_empties_and_refills(self):
+        # 3 токена, 6 в минуту — один каждые 10 секунд
+        self.assertEqual([throttling.take('login_ip', '10.0.0.1', now=100) for _ in range(3)], [0, 0, 0])
+        self.assertAlmostEqual(throttling.take('login_ip', '10.0.0.1', now=100), 10)
+        self.assertAlmostEqual(throttling.take('login_ip', '10.0.0.1', now=104), 6)
+        self.assertEqual(throttling.take('login_ip', '10.0.0.1', now=110), 0)
+        # пополнение не выше ёмкости
+        self.assertEqual([throttling.take('login_ip', '10.0.0.1', now=1000) for _ in range(3)], [0, 0, 0])
+        self.assertGreater(throttling.take('login_ip', '10.0.0.1', now=1000), 0)
+
+    def test_buckets_are_separate_and_case_insensitive(self):
+        for _ in range(2):
+            throttling.take('login_account', 'User@Example.com', now=0)
+        self.assertGreater(throttling.take('login_account', ' user@example.com', now=0), 0)
+        self.assertEqual(throttling.take('login_account', 'other@example.com', now=0), 0)
+        self.assertEqual(throttling.take('login_ip', 'user@example.com', now=0), 0)
+        throttling.refill('login_account', 'user@example.com')
+        self.assertEqual(throttling.take('login_account', 'user@example.com', now=0), 0)
+
+    def test_login_is_rejected_before_form_validation(self):
+        url = reverse('personal_account:login')
+        data = {'username': 'user@example.com', 'password': 'wrong'}
+        self.assertEqual([self.client.post(url, data).status_code for _ in range(2)], [200, 200])
+        with self.assertLogs('personal_account.throttling', 'WARNING'):
+            # ведро учётной записи пусто: 1 токен в минуту
+            response = self.client.post(url, data)
+            self.assertEqual(response.status_code, 429)
+            self.assertEqual(response['Retry-After'], '60')
+            # ведро адреса пусто: 6 токенов в минуту
+            response = self.client.post(url, dict(data, username='other@example.com'))
+            self.assertEqual(response.status_code, 429)
+        self.assertEqual(response['Retry-After'], '10')
+        # статистика ведётся по вёдрам из настроек
+        self.assertEqual(throttling.stats(), {'login_ip': {'admitted': 3, 'rejected': 1},
+                                              'login_account': {'admitted': 2, 'rejected': 1}})
+        throttling.reset_stats()
+        self.assertEqual(throttling.stats()['login_ip'], {'admitted': 0, 'rejected': 0})
+
+    def test_unknown_scope(self):
+        with self.assertRaises(ImproperlyConfigured):
+            throttling.take('signup_ip', '10.0.0.1')
+
+    @override_settings(THROTTLE_ENABLED=False)
+    def test_disabled(self):
+        url = reverse('personal_account:login')
+        data = {'username': 'user@example.com', 'password': 'wrong'}
+        self.assertEqual({self.client.post(url, data).status_code for _ in range(5)}, {200})
+
+
+IMPORTTIME = '''\
+import time: self [us] | cumulative | imported package
+import time:       100 |        100 |   _io
+import time:       200 |        300 | io
+import time:        50 |         50 |       numpy.core._multiarray
+import time:       400 |        450 |     numpy.core
+import time:       600 |       1050 |   numpy
+import time:        70 |         70 |   personal_account.crypto
+import time:        30 |       1150 | personal_account.images
+import time:        20 |         20 | pages.checks
+Traceback noise that is not an import line
+'''
+
+
+class StartupTests(SimpleTestCase):
+
+    def test_parse_importtime_assigns_modules_to_importing_app(self):
+        rows = parse_importtime(IMPORTTIME, ['personal_account', 'pages'])
+        owners = {name: owner for name, owner, _, _ in rows}
+        self.assertEqual(owners, {
+            '_io': 'io', 'io': 'io',
+            'numpy.core._multiarray': 'personal_account', 'numpy.core': 'personal_account',
+            'numpy': 'personal_account', 'personal_account.crypto': 'personal_account',
+            'personal_account.images': 'personal_account', 'pages.checks': 'pages',
+        })
+        self.assertIn(('numpy', 'personal_account', 600, 1050), rows)
+
+    def test_find_regressions(self):
+        baseline = {'запуск': {'p50_ms': 100, 'modules': 600}}
+
+        def check(p50_ms, modules):
+            return find_regressions({'запуск': {'p50_ms': p50_ms, 'modules': modules}}, baseline, 0.1,
+                                    timing='p50_ms', counters=('modules',))
+
+        self.assertEqual(check(105, 600), [])
+        self.assertEqual(check(120, 601), ['запуск: p50 100 -> 120 мс', 'запуск: модулей 600 -> 601'])
+        routes = {'login': {'p95_ms': 10, 'queries': 4}, 'new route': {'p95_ms': 99, 'queries': 9}}
+        self.assertEqual(find_regressions(routes, {'login': {'p95_ms': 10, 'queries': 3}}, 0.2),
+                         ['login: запросов 3 -> 4'])
+
+    def test_percentile(self):
+        values = list(range(100, 0, -1))
+        self.assertEqual((percentile(values, 50), percentile(values, 95), percentile(values, 100)), (50, 95, 100))
+        self.assertEqual(percentile([7], 99), 7)
+
+
+@override_settings(FIELD_ENCRYPTION_KEYS=[KEY_OLD], BLIND_INDEX_KEY='test-blind-index',
+                   ENCRYPT_DOCUMENT_FILES=False, DOCUMENT_FANOUT_LEVELS=2)
+class DocumentLayoutTests(TestCase):
+
+    def setUp(self):
+        root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, root)
+        override = override_settings(MEDIA_ROOT=root)
+        override.enable()
+        self.addCleanup(override.disable)
+        self.storage = document_layout.storage()
+        user = synthetic.insert_rows(synthetic.generate_rows(0, 1), password='!')[0]
+        self.profile = user.profile
+        # фото в старой раскладке documents/<user_id>/
+        self.old = self.storage.save(f'documents/{user.pk}/photo.jpg', ContentFile(b'\xff\xd8photo'))
+        self.new = f'{document_dir(user.pk)}/photo.jpg'
+        self.profile.document_photo = self.old
+        self.profile.save()
+        DocumentHash.objects.create(profile=self.profile, file_name=self.old, phash=1)
+
+    def test_document_dir_fanout(self):
+        digest = '77de68daecd823babbb58edb1c8e14d7106e83bb'  # sha1('3')
+        self.assertEqual(document_dir(3, levels=0), 'documents/3')
+        self.assertEqual(document_dir(3, levels=2), f'documents/{digest[:2]}/{digest[2:4]}/3')
+        self.assertEqual(document_dir(3), document_dir(3, levels=2))
+
+    def test_move_updates_database_and_removes_old_file(self):
+        moves = document_layout.planned_moves(0, 10**9)
+        self.assertEqual(moves, {self.old: (self.profile.user_id, self.new)})
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertEqual(document_layout.move_files(moves), (1, 0))
+        self.assertEqual(Profile.objects.get(pk=self.profile.pk).document_photo.name, self.new)
+        self.assertEqual(set(Profile.history.filter(user_id=self.profile.user_id)
+                             .values_list('document_photo', flat=True)), {self.new})
+        self.assertEqual(DocumentHash.objects.get(profile=self.profile).file_name, self.new)
+        self.assertFalse(self.storage.exists(self.old))
+        self.assertFalse(os.path.exists(os.path.dirname(self.storage.path(self.old))))
+        with self.storage.open(self.new) as f:
+            self.assertEqual(f.read(), b'\xff\xd8photo')
+
+    def test_rerun_changes_nothing(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            document_layout.move_files(document_layout.planned_moves(0, 10**9))
+        self.assertEqual(document_layout.planned_moves(0, 10**9), {})
+        out = io.StringIO()
+        call_command('move_documents', stdout=out)
+        self.assertIn('Перенесено файлов: 0', out.getvalue())
+        self.assertTrue(self.storage.exists(self.new))
+
+    def test_old_file_is_kept_while_referenced(self):
+        with self.captureOnCommitCallbacks() as callbacks:
+            document_layout.move_files(document_layout.planned_moves(0, 10**9))
+        # до удаления старого имени профиль из устаревшего экземпляра записал его обратно
+        self.profile.save()
+        for callback in callbacks:
+            callback()
+        self.assertTrue(self.storage.exists(self.old))
+        self.assertTrue(self.storage.exists(self.new))
+
+
+@override_settings(FIELD_ENCRYPTION_KEYS=[KEY_OLD], BLIND_INDEX_KEY='test-blind-index',
+                   AUTHENTICATION_BACKENDS=['personal_account.auth_backends.CachedModelBackend'])
+class SessionPurgeTests(TestCase):
+
+    def setUp(self):
+        now = timezone.now()
+        Session.objects.bulk_create(
+            [Session(session_key=f'expired{i}', session_data='', expire_date=now - datetime.timedelta(days=1))
+             for i in range(7)]
+            + [Session(session_key=f'live{i}', session_data='', expire_date=now + datetime.timedelta(days=1))
+               for i in range(2)])
+
+    def test_purges_in_batches(self):
+        # порция — выборка ключей и удаление по ним
+        with self.assertNumQueries(4):
+            self.assertEqual(sessions.purge_expired_sessions(batch_size=3, max_batches=2), 6)
+        self.assertEqual(Session.objects.filter(session_key__startswith='expired').count(), 1)
+        self.assertEqual(sessions.purge_expired_sessions(batch_size=3), 1)
+        self.assertEqual(sessions.purge_expired_sessions(batch_size=3), 0)
+        self.assertEqual(set(Session.objects.values_list('session_key', flat=True)), {'live0', 'live1'})
+
+    def test_command(self):
+        out = io.StringIO()
+        call_command('purge_sessions', batch_size=2, max_batches=3, pause=0, stdout=out)
+        self.assertIn('Удалено истёкших сессий: 6', out.getvalue())
+        call_command('purge_sessions', pause=0, stdout=out)
+        self.assertEqual(Session.objects.count(), 2)
+
+    def test_session_mode_setting(self):
+        engines = {mode: f'django.contrib.sessions.backends.{mode}' for mode in ('db', 'cached_db', 'signed_cookies')}
+        self.assertEqual(load_settings('SESSION_ENGINE', REDIS_URL=''), {'SESSION_ENGINE': engines['db']})
+        self.assertEqual(load_settings('SESSION_ENGINE', REDIS_URL='redis://cache:6379/0'),
+                         {'SESSION_ENGINE': engines['cached_db']})
+        self.assertEqual(load_settings('SESSION_ENGINE', SESSION_MODE='signed_cookies', REDIS_URL=''),
+                         {'SESSION_ENGINE': engines['signed_cookies']})
+        self.assertEqual(load_settings('SESSION_ENGINE', SESSION_MODE='db', REDIS_URL='redis://cache:6379/0'),
+                         {'SESSION_ENGINE': engines['db']})
+        # кеш в памяти процесса для cached_db не годится
+        self.assertIn('ImproperlyConfigured', load_settings('SESSION_ENGINE', SESSION_MODE='cached_db', REDIS_URL=''))
+
+
+class AuthUserCacheTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.addCleanup(cache.clear)
+        self.user = synthetic.insert_rows(synthetic.generate_rows(0, 1), password='!')[0]
+        self.backend = CachedModelBackend()
+
+    def test_second_load_comes_from_cache(self):
+        user = self.backend.get_user(self.user.pk)
+        phone = user.profile.phone
+        with self.assertNumQueries(0):
+            cached = self.backend.get_user(self.user.pk)
+            self.assertEqual(cached.profile.phone, phone)
+        # в кеше персональные данные лежат шифротекстом
+        self.assertTrue(cache.get(cache_key(self.user.pk)).profile.phone.startswith(crypto.TOKEN_PREFIX))
+        self.assertEqual(user.profile.phone, phone)
+
+    def test_save_and_password_change_invalidate(self):
+        self.backend.get_user(self.user.pk)
+        self.user.first_name = 'Новое'
+        self.user.save()
+        self.assertIsNone(cache.get(cache_key(self.user.pk)))
+        self.assertEqual(self.backend.get_user(self.user.pk).first_name, 'Новое')
+        self.user.set_password('other-password')
+        self.user.save()
+        self.assertEqual(self.backend.get_user(self.user.pk).password, self.user.password)
+        self.user.profile.save()
+        self.assertIsNone(cache.get(cache_key(self.user.pk)))
+
+    def test_deactivated_user_is_not_returned(self):
+        self.backend.get_user(self.user.pk)
+        self.user.is_active = False
+        self.user.save()
+        self.assertIsNone(self.backend.get_user(self.user.pk))
+
+    async def test_async_path(self):
+        user = await self.backend.aget_user(self.user.pk)
+        self.assertEqual(user.pk, self.user.pk)
+        cached = await cache.aget(cache_key(self.user.pk))
+        self.assertTrue(cached.profile.phone.startswith(crypto.TOKEN_PREFIX))
+        self.assertEqual((await self.backend.aget_user(self.user.pk)).profile.phone, user.profile.phone)
+        self.assertIsNone(await self.backend.aget_user(0))
+
+    def test_requires_shared_cache(self):
+        self.assertIn('ImproperlyConfigured', load_settings('AUTH_USER_CACHE', AUTH_USER_CACHE='1', REDIS_URL=''))
+        loaded = load_settings('AUTHENTICATION_BACKENDS', AUTH_USER_CACHE='1', REDIS_URL='redis://cache:6379/0')
+        self.assertEqual(loaded['AUTHENTICATION_BACKENDS'], ['personal_account.auth_backends.CachedModelBackend'])
+
+
+class PaymentScheduleTests(SimpleTestCase):
+
+    def test_annuity_matches_hand_computed_schedule(self):
+        # 1000 под 1% в месяц на 3 месяца: платёж 1000 * 0.01 * 1.01^3 / (1.01^3 - 1) = 340.0221...
+        monthly_payment, rows = build_schedules([(1000, 0.01, 3)])[0]
+        self.assertEqual(monthly_payment, Decimal('340.02'))
+        self.assertEqual(rows, [
+            [1, 340.02, 10.0, 330.02, 669.98],
+            [2, 340.02, 6.7, 333.32, 336.66],
+            # последний платёж закрывает остаток после округлений до копеек
+            [3, 340.03, 3.37, 336.66, 0.0],
+        ])
+
+    def test_zero_rate_and_single_month(self):
+        (zero_payment, zero_rows), (single_payment, single_rows) = build_schedules([(1000, 0, 3), (1000, 0.01, 1)])
+        self.assertEqual(zero_payment, Decimal('333.33'))
+        self.assertEqual([row[1] for row in zero_rows], [333.33, 333.33, 333.34])
+        self.assertEqual(single_rows, [[1, 1010.0, 10.0, 1000.0, 0.0]])
+
+    def test_batch_equals_single_and_principal_is_repaid(self):
+        rng = random.Random(27)
+        inputs = [(rng.randrange(100_000, 10_000_000), rng.choice([0, 0.005, 0.0066667]), rng.choice([1, 12, 84, 120]))
+                  for _ in range(30)]
+        batch = build_schedules(inputs)
+        for item, (monthly_payment, rows) in zip(inputs, batch):
+            self.assertEqual(build_schedules([item])[0], (monthly_payment, rows))
+            self.assertEqual(len(rows), item[2])
+            self.assertEqual(round(sum(Decimal(str(row[3])) for row in rows), 2), item[0])
+            self.assertEqual(rows[-1][4], 0)
+
+    def test_schedule_inputs(self):
+        terms = {'Первичный': {'annual_rate': 0.12, 'months': 12}}
+        self.assertEqual(schedule_inputs('1000', '300', 'Первичный', terms), (700, 0.01, 12))
+        self.assertEqual(schedule_inputs('1000', '', 'Первичный', terms), (1000, 0.01, 12))
+        self.assertIsNone(schedule_inputs('', '300', 'Первичный', terms))
+        self.assertIsNone(schedule_inputs('1000', '300', 'Вторичный', terms))
+
+
+@override_settings(FIELD_ENCRYPTION_KEYS=[KEY_OLD], BLIND_INDEX_KEY='test-blind-index')
+class RebuildSchedulesTests(TestCase):
+    terms = {'Первичный': {'annual_rate': 0.06, 'months': 12}, 'Вторичный': {'annual_rate': 0, 'months': 6}}
+
+    def setUp(self):
+        users = synthetic.insert_rows(synthetic.generate_rows(0, 5), password='!')
+        self.profiles = [user.profile for user in users]
+
+    def test_rebuild_only_changed_and_remove_obsolete(self):
+        self.assertEqual(rebuild_schedules(chunk_size=2, terms=self.terms), (5, 0))
+        self.assertEqual(rebuild_schedules(chunk_size=2, terms=self.terms), (0, 0))
+        schedule = PaymentSchedule.objects.get(profile=self.profiles[0])
+        self.assertEqual(len(schedule.rows), self.terms[self.profiles[0].type_of_purchase]['months'])
+
+        Profile.objects.filter(pk=self.profiles[1].pk).update(price_in_queue='1000')
+        self.assertEqual(rebuild_schedules(chunk_size=2, terms=self.terms), (1, 0))
+        self.assertEqual(rebuild_schedules(chunk_size=2, force=True, terms=self.terms), (5, 0))
+
+        debts.run_debt_job()
+        Profile.objects.filter(pk=self.profiles[2].pk).update(price='')
+        self.assertEqual(rebuild_schedules(chunk_size=2, terms=self.terms), (0, 1))
+        self.assertFalse(PaymentSchedule.objects.filter(profile=self.profiles[2]).exists())
+        self.assertTrue(DebtSummary.objects.get(profile=self.profiles[2]).stale)
+
+
+def image_bytes(size=(300, 200), image_format='JPEG', orientation=None, gps=False, **options):
+    exif = Image.Exif()
+    if orientation:
+        exif[0x0112] = orientation
+    if gps:
+        exif.get_ifd(0x8825).update({1: 'N', 2: (55.0, 45.0, 0.0)})
+    output = io.BytesIO()
+    # левая половина красная, правая синяя — по ней видно, повёрнуто ли изображение
+    image = Image.new('RGB', size, 'red')
+    image.paste('blue', (size[0] // 2, 0, size[0], size[1]))
+    if exif:
+        options['exif'] = exif
+    image.save(output, image_format, **options)
+    return output.getvalue()
+
+
+@override_settings(DOCUMENT_PHOTO_MAX_SIDE=200, DOCUMENT_PHOTO_QUALITY=85)
+class ImageNormalizationTests(SimpleTestCase):
+
+    def setUp(self):
+        root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, root)
+        self.storage = FileSystemStorage(location=root)
+
+    def open(self, data):
+        image = Image.open(io.BytesIO(data))
+        image.load()
+        return image
+
+    def test_exif_and_gps_are_removed_and_orientation_applied(self):
+        # 6 — повернуть на 90° по часовой: левая (красная) половина оказывается сверху
+        data = images.normalize_image(image_bytes(orientation=6, gps=True), 1000, 85)
+        image = self.open(data)
+        self.assertEqual(image.format, 'JPEG')
+        self.assertEqual(image.size, (200, 300))
+        self.assertEqual(dict(image.getexif()), {})
+        red, green, blue = image.getpixel((100, 20))
+        self.assertGreater(red, 200)
+        self.assertLess(blue, 50)
+
+    def test_clean_image_is_left_alone(self):
+        self.assertIsNone(images.normalize_image(image_bytes(), 1000, 85))
+        self.assertIsNone(images.normalize_image(b'not an image', 1000, 85))
+
+    def test_upload_is_resized_and_converted_to_jpeg(self):
+        field_file = SimpleNamespace(file=ContentFile(image_bytes((800, 400), 'PNG')), name='documents/1/scan.png')
+        self.assertGreater(images.normalize_upload(field_file), 0)
+        self.assertEqual(field_file.name, 'scan.jpg')
+        image = self.open(field_file.file.read())
+        self.assertEqual((image.format, image.size), ('JPEG', (200, 100)))
+
+    def test_stored_file_with_metadata_is_rewritten_even_if_not_smaller(self):
+        # шум, сжатый с качеством 5: пережатый с качеством 85 будет больше
+        rng = random.Random(37)
+        noise = Image.new('L', (150, 100))
+        noise.putdata([rng.randrange(256) for _ in range(150 * 100)])
+        exif = Image.Exif()
+        exif.get_ifd(0x8825).update({1: 'N', 2: (55.0, 45.0, 0.0)})
+        output = io.BytesIO()
+        noise.convert('RGB').save(output, 'JPEG', quality=5, exif=exif)
+        original = output.getvalue()
+        name = self.storage.save('documents/1/photo.jpg', ContentFile(original))
+        before, after = images.normalize_stored(self.storage, name)
+        self.assertEqual(before, len(original))
+        with self.storage.open(name) as f:
+            image = self.open(f.read())
+        self.assertEqual(dict(image.getexif()), {})
+        self.assertGreater(after, before)
+        self.assertEqual(after, self.storage.size(name))
+
+    def test_stored_file_keeps_its_format_and_skips_other_extensions(self):
+        png = self.storage.save('documents/1/photo.png', ContentFile(image_bytes((800, 400), 'PNG')))
+        images.normalize_stored(self.storage, png)
+        with self.storage.open(png) as f:
+            self.assertEqual((self.open(f.read()).format), 'PNG')
+        original = image_bytes((800, 400), 'GIF')
+        gif = self.storage.save('documents/1/photo.gif', ContentFile(original))
+        self.assertEqual(images.normalize_stored(self.storage, gif), (len(original), len(original)))
+        with self.storage.open(gif) as f:
+            self.assertEqual(f.read(), original)
+
+
+@override_settings(IMAGE_SANDBOX_WORKERS=1, IMAGE_SANDBOX_MEMORY_MB=256, IMAGE_SANDBOX_TIMEOUT=5,
+                   DOCUMENT_PHOTO_MAX_PIXELS=1_000_000)
+class ImageSandboxTests(SimpleTestCase):
+    # Пул создаётся с настройками на момент первого вызова — в каждом тесте новый
+
+    def setUp(self):
+        image_sandbox._shutdown()
+        self.addCleanup(image_sandbox._shutdown)
+
+    def upload(self, data, name='scan.jpg'):
+        return SimpleUploadedFile(name, data, content_type='image/jpeg')
+
+    def clean(self, data, name='scan.jpg'):
+        form = ProfileUpdateForm()
+        form.cleaned_data = {'document_photo': self.upload(data, name)}
+        return form.clean_document_photo()
+
+    def assertRejected(self, data, message, name='scan.jpg'):
+        with self.assertRaisesMessage(ValidationError, message):
+            self.clean(data, name)
+
+    def test_valid_image(self):
+        self.assertEqual(image_sandbox.verify_upload(self.upload(image_bytes())), ('JPEG', 300, 200))
+        self.assertEqual(self.clean(image_bytes()).name, 'scan.jpg')
+
+    def test_decompression_bomb(self):
+        # 4 000 x 4 000 одноцветных пикселей — несколько килобайт PNG
+        bomb = io.BytesIO()
+        Image.new('1', (4000, 4000)).save(bomb, 'PNG')
+        self.assertLess(len(bomb.getvalue()), 10_000)
+        with self.assertRaisesMessage(ValueError, 'Слишком большое разрешение'):
+            image_sandbox.verify_upload(self.upload(bomb.getvalue(), 'bomb.png'))
+        self.assertRejected(bomb.getvalue(), 'Слишком большое разрешение', 'bomb.png')
+
+    def test_not_an_image_named_jpeg(self):
+        self.assertRejected(b'<?php system($_GET["c"]); ?>', 'не является изображением')
+        # заголовок JPEG, дальше мусор
+        self.assertRejected(image_bytes()[:200] + os.urandom(500), 'не является изображением')
+        self.assertRejected(image_bytes(image_format='GIF'), 'JPEG, PNG или WebP')
+
+    def test_job_timeout_resets_pool(self):
+        with self.assertRaisesMessage(image_sandbox.SandboxError, 'слишком долго'):
+            image_sandbox.run(time.sleep, 30, timeout=1)
+        # следующий вызов получает новый пул
+        self.assertEqual(image_sandbox.verify_upload(self.upload(image_bytes())), ('JPEG', 300, 200))
+
+    def test_memory_limit(self):
+        # больше RLIMIT_AS процесса пула
+        with self.assertRaises(image_sandbox.SandboxError):
+            image_sandbox.run(bytes, 2**30)
+
+    def test_killed_worker(self):
+        with self.assertRaisesMessage(image_sandbox.SandboxError, 'Не удалось обработать'):
+            image_sandbox.run(os._exit, 1)
+        self.assertEqual(image_sandbox.verify_upload(self.upload(image_bytes())), ('JPEG', 300, 200))
+
+    def test_form_turns_sandbox_failures_into_validation_errors(self):
+        failures = {
+            'слишком долго': lambda f: image_sandbox.run(time.sleep, 30, timeout=1),
+            'слишком велико': lambda f: image_sandbox.run(bytes, 2**30),
+            'Не удалось обработать': lambda f: image_sandbox.run(os._exit, 1),
+        }
+        for message, verify in failures.items():
+            with self.subTest(message), mock.patch.object(image_sandbox, 'verify_upload', verify):
+                self.assertRejected(image_bytes(), message)
+
+
+def document_image(seed, size=(600, 400)):
+    # случайные прямоугольники: у разных seed — разные «документы»
+    rng = random.Random(seed)
+    image = Image.new('L', size, 255)
+    for _ in range(25):
+        x, y = rng.randrange(size[0]), rng.randrange(size[1])
+        image.paste(rng.randrange(256), (x, y, x + rng.randrange(20, 200), y + rng.randrange(20, 150)))
+    return image.convert('RGB')
+
+
+class HammingIndexTests(SimpleTestCase):
+
+    def test_matches_brute_force(self):
+        rng = random.Random(39)
+        hashes = [rng.getrandbits(64) - 2**63 for _ in range(1500)]
+        # близкие копии, чтобы у поиска были непустые ответы
+        for value in hashes[:300]:
+            flipped = value & 0xFFFFFFFFFFFFFFFF
+            for bit in rng.sample(range(64), rng.randrange(1, 13)):
+                flipped ^= 1 << bit
+            hashes.append(flipped - 2**64 if flipped >= 2**63 else flipped)
+        ids = list(range(1, len(hashes) + 1))
+        index = HammingIndex(ids, hashes)
+        self.assertEqual(len(index), len(hashes))
+        for query in rng.sample(hashes, 200) + [rng.getrandbits(64) - 2**63 for _ in range(20)]:
+            for radius in (0, 3, 8, 12):
+                expected = {pk: hamming(query, value) for pk, value in zip(ids, hashes)
+                            if hamming(query, value) <= radius}
+                found, distances = index.search(query, radius)
+                self.assertEqual(dict(zip(found.tolist(), distances.tolist())), expected)
+
+    def test_empty_index(self):
+        found, distances = HammingIndex().search(12345, 10)
+        self.assertEqual((len(found), len(distances)), (0, 0))
+
+
+@override_settings(FIELD_ENCRYPTION_KEYS=[KEY_OLD], BLIND_INDEX_KEY='test-blind-index',
+                   ENCRYPT_DOCUMENT_FILES=False, STORAGES=PLAIN_STATIC)
+class DocumentDuplicatesTests(TestCase):
+
+    def setUp(self):
+        root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, root)
+        override = override_settings(MEDIA_ROOT=root)
+        override.enable()
+        self.addCleanup(override.disable)
+        housing_queue.queue_index.reset()
+        users = synthetic.insert_rows(synthetic.generate_rows(0, 3), password='!')
+        self.profiles = [user.profile for user in users]
+        original = document_image(1)
+        # тот же документ, пересохранённый другим участником: меньше и с потерями
+        photos = [(original, {}), (original.resize((480, 320)), {'quality': 60}), (document_image(2), {})]
+        storage = document_layout.storage()
+        for profile, (image, options) in zip(self.profiles, photos):
+            output = io.BytesIO()
+            image.save(output, 'JPEG', **options)
+            name = storage.save(f'{document_dir(profile.user_id)}/photo.jpg', ContentFile(output.getvalue()))
+            Profile.objects.filter(pk=profile.pk).update(document_photo=name)
+
+    def test_duplicates_across_accounts_in_admin_report(self):
+        call_command('hash_documents', workers=1, stdout=io.StringIO())
+        matches = dict(DocumentHash.objects.values_list('profile_id', 'matches'))
+        first, second, other = [profile.pk for profile in self.profiles]
+        self.assertEqual(matches, {first: 1, second: 1, other: 0})
+
+        admin = User.objects.create_superuser('admin', 'admin@example.com', 'x')
+        self.client.force_login(admin)
+        response = self.client.get(reverse('admin:personal_account_documenthash_changelist'),
+                                   {'has_matches': 'yes'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual({row.profile_id for row in response.context['cl'].result_list}, {first, second})
+        self.assertContains(response, reverse('admin:personal_account_profile_change', args=[second]))
+        self.assertNotContains(response, reverse('admin:personal_account_profile_change', args=[other]))
@@ -0,0 +1,129 @@
+# personal_account/throttling.py
+# Ограничение частоты входа, сброса пароля и регистрации. Каждая попытка входа
+# стоит полного хеширования пароля (PBKDF2), поэтому перебор паролей с множества
+# адресов легко занимает все ядра. Попытки считаются в «вёдрах токенов» в кеше
+# (CACHES['default'], с REDIS_URL — общий для всех процессов): отдельно по IP
+# и по учётной записи. Лишний запрос отклоняется с кодом 429 ещё до проверки формы,
+# то есть до хеширования и до отправки письма.
+import hashlib
+import logging
+import math
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.exceptions import ImproperlyConfigured
+
+logger = logging.getLogger(__name__)
+
+OUTCOMES = ('admitted', 'rejected')
+
+
+def rate(scope):
+    # (ёмкость ведра, пополнение в токенах за минуту) из settings.THROTTLE_RATES
+    try:
+        return settings.THROTTLE_RATES[scope]
+    except KeyError:
+        raise ImproperlyConfigured(f'Для {scope!r} не задана частота в THROTTLE_RATES')
+
+
+def stats_keys():
+    return [f'throttle-stats:{scope}:{outcome}' for scope in settings.THROTTLE_RATES for outcome in OUTCOMES]
+
+
+def client_ip(request):
+    # за прокси адрес клиента берётся из заголовка, который выставляет сам прокси
+    header = getattr(settings, 'THROTTLE_CLIENT_IP_HEADER', 'REMOTE_ADDR')
+    return request.META.get(header, '').split(',')[0].strip() or 'unknown'
+
+
+def bucket_key(scope, ident):
+    # email и адреса хешируются: в ключ кеша не попадают пробелы и персональные данные
+    digest = hashlib.sha1(ident.strip().lower().encode()).hexdigest()
+    return f'throttle:{scope}:{digest}'
+
+
+def take(scope, ident, now=None):
+    # Забирает токен из ведра; возвращает 0 или сколько секунд ждать следующего.
+    # Чтение и запись не атомарны: при одновременных запросах может пройти
+    # на пару попыток больше — для защиты от перебора это неважно.
+    capacity, per_minute = rate(scope)
+    now = time.time() if now is None else now
+    key = bucket_key(scope, ident)
+    tokens, stamp = cache.get(key) or (capacity, now)
+    tokens = min(capacity, tokens + (now - stamp) * per_minute / 60)
+    if tokens < 1:
+        return (1 - tokens) * 60 / per_minute
+    # через столько секунд ведро снова полное — отсутствие ключа означает то же самое
+    cache.set(key, (tokens - 1, now), math.ceil(capacity * 60 / per_minute))
+    return 0
+
+
+def refill(scope, ident):
+    cache.delete(bucket_key(scope, ident))
+
+
+def count(scope, outcome):
+    key = f'throttle-stats:{scope}:{outcome}'
+    cache.add(key, 0, None)
+    try:
+        cache.incr(key)
+    except ValueError:
+        # ключ успели вытеснить между add и incr
+        cache.set(key, 1, None)
+
+
+def stats():
+    # {scope: {'admitted': n, 'rejected': n}} с момента последнего сброса
+    values = cache.get_many(stats_keys())
+    return {scope: {outcome: values.get(f'throttle-stats:{scope}:{outcome}', 0) for outcome in OUTCOMES}
+            for scope in settings.THROTTLE_RATES}
+
+
+def reset_stats():
+    cache.delete_many(stats_keys())
+
+
+def check(request, scopes):
+    # scopes — [(scope, идентификатор), ...]; пустые идентификаторы пропускаются.
+    # Возвращает 0, если попытку можно выполнять, иначе секунды до следующей.
+    if not getattr(settings, 'THROTTLE_ENABLED', True):
+        return 0
+    for scope, ident in scopes:
+        if not ident:
+            continue
+        wait = take(scope, ident)
+        count(scope, 'rejected' if wait else 'admitted')
+        if wait:
+            logger.warning('Превышена частота %s для %s', scope, client_ip(request))
+            return wait
+    return 0
+
+
+class ThrottleMixin:
+    # Для FormView: POST сначала проходит вёдра throttle_scopes — словарь
+    # {scope: поле формы или None для IP}. При отказе форма выводится заново
+    # без проверки введённых данных, с ошибкой и кодом 429.
+    throttle_scopes = {}
+
+    def throttle_idents(self, request):
+        return [(scope, client_ip(request) if field is None else request.POST.get(field, ''))
+                for scope, field in self.throttle_scopes.items()]
+
+    def post(self, request, *args, **kwargs):
+        wait = check(request, self.throttle_idents(request))
+        if not wait:
+            return super().post(request, *args, **kwargs)
+        # CreateView берёт self.object в get_form_kwargs и get_context_data
+        self.object = None
+        kwargs = self.get_form_kwargs()
+        kwargs.pop('data', None)
+        kwargs.pop('files', None)
+        form = self.get_form_class()(**kwargs)
+        # форма не связана с данными и не проверяется; add_error нужен cleaned_data
+        form.cleaned_data = {}
+        minutes = max(1, math.ceil(wait / 60))
+        form.add_error(None, f'Слишком много попыток. Повторите через {minutes} мин.')
+        response = self.render_to_response(self.get_context_data(form=form), status=429)
+        response['Retry-After'] = math.ceil(wait)
+        return response
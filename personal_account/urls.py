@@ -10,7 +10,7 @@ urlpatterns = [
     path("logout/", auth_views.LogoutView.as_view(), name="logout"),
     path("signup/", views.CustomRegistrationView.as_view(), name="signup"),
     path('plug/', views.CustomPlugView.as_view(), name="plug"),
-    path('password_reset/', auth_views.PasswordResetView.as_view(
+    path('password_reset/', views.CustomPasswordResetView.as_view(
         template_name="personal_account/password_reset.html",
         email_template_name="personal_account/password_reset_email.html",
         success_url='/personal_account/password_reset/done/'
@@ -18,6 +18,7 @@ urlpatterns = [
     path('password_reset/done/', auth_views.PasswordResetDoneView.as_view(template_name="personal_account/password_reset_done.html"), name="password_reset_done"),
     path('reset/<uidb64>/<token>/',views.CustomPasswordResetConfirmView.as_view(),name="password_reset_confirm"),
     path('reset/done/', auth_views.PasswordResetCompleteView.as_view(template_name="personal_account/password_reset_complete.html"), name="password_reset_complete"),
+    path('notifications/stream/', views.NotificationStreamView.as_view(), name='notifications_stream'),
     path('<str:username>/profile_edit', views.ProfileUpdateView.as_view(), name='profile_edit'),
     path('<str:username>/', views.UserProfileView.as_view(), name='user_profile'),
 ]
@@ -1,29 +1,47 @@
 # personal_account/views.py
 from django.contrib.auth.views import LoginView
-from django.contrib.auth.views import PasswordResetConfirmView
-from django.views.generic import TemplateView, CreateView, UpdateView
+from django.contrib.auth.views import PasswordResetConfirmView, PasswordResetView
+from django.views.generic import TemplateView, CreateView, UpdateView, View
 from django.urls import reverse_lazy, reverse
 from django.contrib import messages
 from django.contrib.auth.models import User
 from django.shortcuts import get_object_or_404, redirect, render
-from django.http import Http404
+from django.http import Http404, HttpResponse, StreamingHttpResponse
 from django.contrib.auth.mixins import LoginRequiredMixin
+from django.core.handlers.asgi import ASGIRequest
 from .forms import LoginForm, RegistrationForm, ProfileUpdateForm, ProfileAddressForm
 from .models import Profile, Profile_address
+from .notifications import get_broker, format_sse
+from . import protected_media
+from .throttling import ThrottleMixin, refill
+from pages.views import AsyncTemplateView
 
+# раз в столько секунд в SSE-поток уходит комментарий, чтобы прокси не закрыл соединение
+KEEPALIVE_SECONDS = 15
 
-class AccountPageView(TemplateView):
+
+class AccountPageView(AsyncTemplateView):
     template_name = "personal_account/personal_account.html"
 
 
-class CustomLoginView(LoginView):
+class CustomLoginView(ThrottleMixin, LoginView):
     authentication_form = LoginForm
     template_name = 'personal_account/login.html'
     extra_context = {'title': 'Авторизация на сайте'}
+    throttle_scopes = {'login_ip': None, 'login_account': 'username'}
 
     def get_success_url(self):
         return reverse_lazy('home')
 
+    def form_valid(self, form):
+        # верный пароль возвращает учётной записи все попытки
+        refill('login_account', self.request.POST.get('username', ''))
+        return super().form_valid(form)
+
+class CustomPasswordResetView(ThrottleMixin, PasswordResetView):
+    # каждая попытка — письмо; ограничиваем и по IP, и по адресу получателя
+    throttle_scopes = {'password_reset_ip': None, 'password_reset_account': 'email'}
+
 class CustomPasswordResetConfirmView(PasswordResetConfirmView):
     template_name = "personal_account/password_reset_confirm.html"
     success_url = reverse_lazy('personal_account:password_reset_complete')
@@ -31,10 +49,11 @@ class CustomPasswordResetConfirmView(PasswordResetConfirmView):
 class CustomPlugView(TemplateView):
     template_name = "personal_account/plug.html"
 
-class CustomRegistrationView(CreateView):  
+class CustomRegistrationView(ThrottleMixin, CreateView):  
     form_class = RegistrationForm  
     template_name = 'personal_account/signup.html'  
     extra_context = {'title': 'Регистрация на сайте'}  
+    throttle_scopes = {'signup_ip': None}
 
     def get_success_url(self):  
         return reverse_lazy('personal_account:login')  
@@ -44,18 +63,26 @@ class CustomRegistrationView(CreateView):
         return super().form_valid(form)
 
 
-class UserProfileView(TemplateView):  
-    template_name = 'personal_account/profile_page.html'  
+class UserProfileView(AsyncTemplateView):
+    template_name = 'personal_account/profile_page.html'
 
-    def get_context_data(self, **kwargs):  
-        context = super().get_context_data(**kwargs)  
-        try:  
-            user = get_object_or_404(User, username=self.kwargs.get('username'))  
-        except User.DoesNotExist:  
-            raise Http404("Пользователь не найден")  
-        context['user_profile'] = user  
-        context['title'] = f'Профиль пользователя {user}'  
-        return context  
+    async def get(self, request, *args, **kwargs):
+        try:
+            user = await User.objects.aget(username=self.kwargs.get('username'))
+        except User.DoesNotExist:
+            raise Http404("Пользователь не найден")
+        # шаблон читает user.profile и user.profile_address — подгружаем их одним запросом,
+        # если бэкенд аутентификации (CachedModelBackend) их ещё не загрузил
+        viewer = await request.auser()
+        if viewer.is_authenticated and not {'profile', 'profile_address'} <= viewer._state.fields_cache.keys():
+            viewer = await (User.objects
+                            .select_related('profile', 'profile_address')
+                            .aget(pk=viewer.pk))
+        request.user = viewer
+        context = self.get_context_data(**kwargs)
+        context['user_profile'] = user
+        context['title'] = f'Профиль пользователя {user}'
+        return self.render_to_response(context)
 
 class ProfileUpdateView(LoginRequiredMixin, UpdateView):
     model = Profile
@@ -137,6 +164,46 @@ class ProfileUpdateView(LoginRequiredMixin, UpdateView):
     def get_success_url(self):
         return reverse('personal_account:user_profile', kwargs={'username': self.request.user.username})
 
+class NotificationStreamView(View):
+    # Асинхронная view: поток уведомлений пользователя в формате server-sent events.
+    # Только под ASGI (site_bw/asgi.py): там ожидающее соединение не держит поток
+    # воркера. Под WSGI бесконечный поток занял бы воркер навсегда, поэтому 501.
+
+    async def get(self, request, *args, **kwargs):
+        if not isinstance(request, ASGIRequest):
+            return HttpResponse('Поток уведомлений доступен только при запуске через ASGI',
+                                status=501, content_type='text/plain; charset=utf-8')
+        user = await request.auser()
+        if not user.is_authenticated:
+            return HttpResponse(status=401)
+        response = StreamingHttpResponse(self.stream(user.pk), content_type='text/event-stream')
+        response['Cache-Control'] = 'no-cache'
+        response['X-Accel-Buffering'] = 'no'  # nginx не должен буферизовать поток
+        return response
+
+    async def stream(self, user_id):
+        yield 'retry: 5000\n\n'  # через сколько мс браузер переподключится после обрыва
+        async for event in get_broker().subscribe(user_id, timeout=KEEPALIVE_SECONDS):
+            if event is None:
+                yield ': keepalive\n\n'
+            else:
+                yield format_sse(event)
+
+
+class ProtectedMediaView(View):
+    # Фото документов: только владельцу и персоналу. Остальным — 404,
+    # чтобы нельзя было проверить, существует ли файл.
+
+    def get(self, request, path):
+        path = protected_media.normalize_path(path)
+        if path is None or not protected_media.can_access(request.user, path):
+            raise Http404
+        response = protected_media.serve(request, path)
+        if response is None:
+            raise Http404
+        return response
+
+
 # class ProfileUpdateView(LoginRequiredMixin, UpdateView):
 #     model = Profile
 #     form_class = ProfileUpdateForm
@@ -14,3 +14,11 @@ from django.core.asgi import get_asgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'site_bw.settings')
 
 application = get_asgi_application()
+
+# шаблоны, URL и переводы — в каждом процессе до первого запроса (pages.warmup)
+from django.conf import settings  # noqa: E402
+
+if settings.WARMUP_ON_STARTUP:
+    from pages.warmup import warm_up  # noqa: E402
+
+    warm_up()
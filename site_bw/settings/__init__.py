@@ -0,0 +1,17 @@
+# Настройки собираются слоями: base.py — общее для всех, поверх него профиль
+# из DJANGO_ENV ('development' по умолчанию или 'production'), а отдельные
+# значения внутри слоёв переопределяются переменными окружения (и .env).
+import os
+
+from .base import *  # noqa: F401,F403
+
+DJANGO_ENV = os.getenv('DJANGO_ENV', 'development')
+
+if DJANGO_ENV == 'production':
+    from .production import *  # noqa: F401,F403
+elif DJANGO_ENV == 'development':
+    from .development import *  # noqa: F401,F403
+else:
+    from django.core.exceptions import ImproperlyConfigured
+
+    raise ImproperlyConfigured(f'Неизвестный DJANGO_ENV: {DJANGO_ENV!r}')
@@ -0,0 +1,298 @@
+# Общие настройки для всех профилей. Профиль (DJANGO_ENV) выбирается в
+# site_bw/settings/__init__.py и переопределяет то, что отличается.
+from pathlib import Path
+import os
+from dotenv import load_dotenv
+from django.core.exceptions import ImproperlyConfigured
+
+# Build paths inside the project like this: BASE_DIR / 'subdir'.
+BASE_DIR = Path(__file__).resolve().parent.parent.parent
+
+
+# Quick-start development settings - unsuitable for production
+# See https://docs.djangoproject.com/en/3.2/howto/deployment/checklist/
+
+# SECURITY WARNING: keep the secret key used in production secret!
+load_dotenv()
+
+SECRET_KEY = os.getenv('SECRET_KEY', 'fallback-secret-key-for-development')
+
+API_KEY = os.getenv('API_KEY', '')
+
+# SECURITY WARNING: don't run with debug turned on in production!
+# DEBUG и ALLOWED_HOSTS задаются профилем (development.py, production.py)
+DEBUG = False
+
+ALLOWED_HOSTS = []
+
+
+# Application definition
+
+INSTALLED_APPS = [
+    'django.contrib.admin',
+    'django.contrib.auth',
+    'django.contrib.contenttypes',
+    'django.contrib.sessions',
+    'django.contrib.messages',
+    'django.contrib.staticfiles',
+    'django_bootstrap5',
+    'pages',
+    'personal_account',
+    # 'simple_history',
+]
+
+MIDDLEWARE = [
+    'django.middleware.security.SecurityMiddleware',
+    'django.contrib.sessions.middleware.SessionMiddleware',
+    'django.middleware.common.CommonMiddleware',
+    'django.middleware.csrf.CsrfViewMiddleware',
+    'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'django.contrib.messages.middleware.MessageMiddleware',
+    'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    # 'simple_history.middleware.HistoryRequestMiddleware',
+]
+
+ROOT_URLCONF = 'site_bw.urls'
+
+TEMPLATES = [
+    {
+        'BACKEND': 'django.template.backends.django.DjangoTemplates',
+        'DIRS': [
+            BASE_DIR / 'templates',  # глобальная папка templates (если есть)
+        ],
+        'OPTIONS': {
+            # Скомпилированные шаблоны хранятся в памяти процесса. При разработке
+            # автоперезагрузка runserver сбрасывает кеш, когда шаблон меняется.
+            'loaders': [
+                ('django.template.loaders.cached.Loader', [
+                    'django.template.loaders.filesystem.Loader',
+                    'django.template.loaders.app_directories.Loader',
+                ]),
+            ],
+            'context_processors': [
+                'django.template.context_processors.debug',
+                'django.template.context_processors.request',
+                'django.contrib.auth.context_processors.auth',
+                'django.contrib.messages.context_processors.messages',
+            ],
+        },
+    },
+]
+
+GOUT_REDIRECT_URL = '/'
+LOGOUT_REDIRECT_URL = 'home'
+
+WSGI_APPLICATION = 'site_bw.wsgi.application'
+# При старте процесса (wsgi.py, asgi.py) заранее скомпилировать все шаблоны,
+# разобрать URL и загрузить переводы — см. pages.warmup
+WARMUP_ON_STARTUP = os.getenv('WARMUP_ON_STARTUP', '1') == '1'
+
+
+# Database
+# https://docs.djangoproject.com/en/3.2/ref/settings/#databases
+
+DATABASES = {
+    'default': {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': BASE_DIR / 'db.sqlite3',
+    }
+}
+
+
+# Кеш. Без REDIS_URL — память процесса: у каждого воркера свой кеш, изменения
+# в одном процессе другие не видят.
+REDIS_URL = os.getenv('REDIS_URL', '')
+if REDIS_URL:
+    CACHES = {'default': {'BACKEND': 'django.core.cache.backends.redis.RedisCache', 'LOCATION': REDIS_URL}}
+else:
+    CACHES = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}}
+
+# Хранение сессий (SESSION_MODE):
+# 'db' — таблица django_session, чтение на каждый запрос;
+# 'cached_db' — чтение из кеша, запись в кеш и в БД. Только с общим кешем (REDIS_URL):
+# с кешем в памяти процесса выход из аккаунта в одном воркере не виден другим,
+# и они продолжают пускать по старой сессии до её истечения;
+# 'signed_cookies' — подписанная cookie без обращений к серверу: данные видны
+# клиенту (но не подделываются), а отозвать сессию до истечения срока нельзя.
+SESSION_ENGINES = {
+    'db': 'django.contrib.sessions.backends.db',
+    'cached_db': 'django.contrib.sessions.backends.cached_db',
+    'signed_cookies': 'django.contrib.sessions.backends.signed_cookies',
+}
+SESSION_MODE = os.getenv('SESSION_MODE', 'cached_db' if REDIS_URL else 'db')
+if SESSION_MODE == 'cached_db' and not REDIS_URL:
+    raise ImproperlyConfigured("SESSION_MODE='cached_db' требует общего кеша: задайте REDIS_URL")
+SESSION_ENGINE = SESSION_ENGINES[SESSION_MODE]
+# Истёкшие сессии в режимах 'db' и 'cached_db' удаляет команда purge_sessions
+# (cron, например раз в час) порциями по столько строк
+SESSION_PURGE_BATCH_SIZE = 500
+
+# Кеш пользователя с профилем на время сессии (personal_account.auth_backends):
+# запросы залогиненного пользователя не читают auth_user и профиль из БД.
+# Только с общим кешем (REDIS_URL): кеш в памяти процесса не узнает о смене пароля
+# или блокировке в другом процессе. После переключения существующие
+# сессии становятся недействительными — пользователям нужно войти заново.
+AUTH_USER_CACHE = os.getenv('AUTH_USER_CACHE', '') == '1'
+if AUTH_USER_CACHE and not REDIS_URL:
+    raise ImproperlyConfigured('AUTH_USER_CACHE=1 требует общего кеша: задайте REDIS_URL')
+if AUTH_USER_CACHE:
+    AUTHENTICATION_BACKENDS = ['personal_account.auth_backends.CachedModelBackend']
+
+# Ограничение частоты входа, сброса пароля и регистрации (personal_account.throttling):
+# для каждого ведра — ёмкость и пополнение в попытках за минуту; других значений
+# по умолчанию нет, у каждого ведра из ThrottleMixin.throttle_scopes должна быть строка. Счётчики лежат
+# в кеше; без REDIS_URL у каждого процесса свои вёдра. Для нагрузочных прогонов
+# ограничение выключают (THROTTLE_ENABLED=0): load_journeys делает это сам для
+# запускаемого им runserver, а на сервере, указанном через --url, это нужно сделать вручную.
+THROTTLE_ENABLED = os.getenv('THROTTLE_ENABLED', '1') == '1'
+THROTTLE_RATES = {
+    'login_ip': (30, 10),
+    'login_account': (5, 1),
+    'password_reset_ip': (10, 2),
+    'password_reset_account': (3, 0.2),
+    'signup_ip': (10, 2),
+}
+# Заголовок с адресом клиента: за nginx — 'HTTP_X_REAL_IP' (его должен выставлять сам nginx)
+THROTTLE_CLIENT_IP_HEADER = os.getenv('THROTTLE_CLIENT_IP_HEADER', 'REMOTE_ADDR')
+
+
+# Password validation
+# https://docs.djangoproject.com/en/3.2/ref/settings/#auth-password-validators
+
+AUTH_PASSWORD_VALIDATORS = [
+    {
+        'NAME': 'django.contrib.auth.password_validation.UserAttributeSimilarityValidator',
+    },
+    {
+        'NAME': 'django.contrib.auth.password_validation.MinimumLengthValidator',
+    },
+    {
+        'NAME': 'django.contrib.auth.password_validation.CommonPasswordValidator',
+    },
+    {
+        'NAME': 'django.contrib.auth.password_validation.NumericPasswordValidator',
+    },
+]
+
+# Хеширование паролей (personal_account.hashers). Новые пароли хешируются
+# алгоритмом PASSWORD_HASH_ALGORITHM ('pbkdf2' или 'argon2' — нужен пакет argon2-cffi),
+# остальные хешеры списка только проверяют старые хеши. Хеши с другим алгоритмом
+# или параметрами пересчитываются при следующем успешном входе.
+# Параметры подбирает manage.py calibrate_hashers.
+PASSWORD_HASH_ALGORITHM = os.getenv('PASSWORD_HASH_ALGORITHM', 'pbkdf2')
+PASSWORD_PBKDF2_ITERATIONS = int(os.getenv('PASSWORD_PBKDF2_ITERATIONS', 1_000_000))
+# time_cost — проходов, memory_cost — КиБ на одно хеширование, parallelism — потоков
+PASSWORD_ARGON2 = {
+    'time_cost': int(os.getenv('PASSWORD_ARGON2_TIME_COST', 2)),
+    'memory_cost': int(os.getenv('PASSWORD_ARGON2_MEMORY_COST', 19456)),
+    'parallelism': int(os.getenv('PASSWORD_ARGON2_PARALLELISM', 1)),
+}
+PASSWORD_HASHERS = {
+    'pbkdf2': ['personal_account.hashers.TunedPBKDF2PasswordHasher',
+               'personal_account.hashers.TunedArgon2PasswordHasher'],
+    'argon2': ['personal_account.hashers.TunedArgon2PasswordHasher',
+               'personal_account.hashers.TunedPBKDF2PasswordHasher'],
+}[PASSWORD_HASH_ALGORITHM] + [
+    'django.contrib.auth.hashers.PBKDF2SHA1PasswordHasher',
+    'django.contrib.auth.hashers.ScryptPasswordHasher',
+]
+
+
+# Internationalization
+# https://docs.djangoproject.com/en/3.2/topics/i18n/
+
+LANGUAGE_CODE = "ru-RU"
+TIME_ZONE = "Europe/Moscow"
+
+EMAIL_BACKEND = 'django.core.mail.backends.smtp.EmailBackend'
+EMAIL_HOST = 'smtp.gmail.com'
+EMAIL_PORT = 587
+EMAIL_USE_TLS = True
+EMAIL_HOST_USER = os.getenv('EMAIL_HOST_USER', '')
+EMAIL_HOST_PASSWORD = os.getenv('EMAIL_HOST_PASSWORD', '')
+DEFAULT_FROM_EMAIL = EMAIL_HOST_USER
+
+USE_I18N = True
+
+USE_L10N = True
+
+USE_TZ = True
+
+
+# Static files (CSS, JavaScript, Images)
+# https://docs.djangoproject.com/en/3.2/howto/static-files/
+
+STATIC_URL = '/static/'
+STATICFILES_DIRS = [BASE_DIR / "static"]
+# collectstatic собирает сюда сжатые CSS/JS и пережатые изображения с хешем содержимого
+# в имени (pages.staticfiles), а рядом — варианты .gz/.br и .webp/.avif.
+# Такие файлы кешируются браузером навсегда, nginx для них:
+#   location /static/ { alias /path/to/staticfiles/; gzip_static on; brotli_static on;
+#                       add_header Cache-Control "public, max-age=31536000, immutable"; }
+# (.webp/.avif nginx выбирает по Accept через map и try_files $uri$variant $uri)
+STATIC_ROOT = BASE_DIR / 'staticfiles'
+STORAGES = {
+    'default': {'BACKEND': 'django.core.files.storage.FileSystemStorage'},
+    'staticfiles': {'BACKEND': 'pages.staticfiles.MinifiedManifestStaticFilesStorage'},
+}
+# Отдавать STATIC_ROOT самим Django (с теми же заголовками), если перед ним нет веб-сервера
+STATIC_SERVE = os.getenv('STATIC_SERVE', '') == '1'
+
+# Страницы ошибок 403/404/500, отрисованные заранее (manage.py render_error_pages
+# после collectstatic, см. pages.error_pages). nginx может отдавать 500.html
+# и сам, когда Django недоступен:
+#   error_page 502 503 504 /500.html;
+#   location = /500.html { root /path/to/error_pages; internal; }
+ERROR_PAGES_ROOT = BASE_DIR / 'error_pages'
+CSRF_FAILURE_VIEW = 'pages.views.csrf_failure'
+
+MEDIA_URL = '/media/'
+MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
+
+# Кто передаёт клиенту фото документов после проверки прав:
+# '' — сам Django (FileResponse), 'nginx' — X-Accel-Redirect, 'sendfile' — X-Sendfile (Apache, lighttpd).
+# Для nginx нужен внутренний location, смотрящий в MEDIA_ROOT:
+#   location /protected-media/ { internal; alias /path/to/media/; }
+# а location /media/documents/ должен проксироваться в Django, а не отдаваться напрямую.
+PROTECTED_MEDIA_SERVER = os.getenv('PROTECTED_MEDIA_SERVER', '')
+PROTECTED_MEDIA_INTERNAL_URL = '/protected-media/'
+
+# Уровней хеш-каталогов для фото документов: documents/ab/cd/<user_id>/ при 2.
+# После смены значения существующие файлы переносит manage.py move_documents.
+DOCUMENT_FANOUT_LEVELS = 2
+
+# Фото документов при загрузке: наибольшая сторона в пикселях и качество JPEG
+DOCUMENT_PHOTO_MAX_SIDE = 2000
+DOCUMENT_PHOTO_QUALITY = 85
+# Проверка и обработка загруженных изображений идёт в отдельном пуле процессов:
+# предел пикселей, число процессов, секунд на задание и памяти на процесс (МБ)
+DOCUMENT_PHOTO_MAX_PIXELS = 40_000_000
+IMAGE_SANDBOX_WORKERS = 2
+IMAGE_SANDBOX_TIMEOUT = 10
+IMAGE_SANDBOX_MEMORY_MB = 512
+# Фото документов считаются одним документом, если их перцептивные хеши
+# отличаются не больше чем в стольких битах из 64
+DOCUMENT_DUPLICATE_DISTANCE = 10
+
+# Default primary key field type
+# https://docs.djangoproject.com/en/3.2/ref/settings/#default-auto-field
+
+DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
+
+
+# Условия рассрочки для графика платежей: годовая ставка и срок в месяцах
+PAYMENT_SCHEDULE_TERMS = {
+    'Первичный': {'annual_rate': 0.06, 'months': 120},
+    'Вторичный': {'annual_rate': 0.08, 'months': 84},
+}
+
+
+# Шифрование персональных данных (паспорт, ИНН, телефон).
+# FIELD_ENCRYPTION_KEYS — ключи Fernet через запятую: первым шифруется,
+# остальные нужны только для чтения при смене ключа (manage.py rekey_profiles).
+# Без ключей они выводятся из SECRET_KEY — годится только для разработки.
+FIELD_ENCRYPTION_KEYS = [key for key in os.getenv('FIELD_ENCRYPTION_KEYS', '').split(',') if key]
+BLIND_INDEX_KEY = os.getenv('BLIND_INDEX_KEY', '')
+# Шифровать ли файлы фото документов на диске. Зашифрованные файлы веб-сервер
+# не сможет отдать сам, их расшифровывает Django.
+ENCRYPT_DOCUMENT_FILES = os.getenv('ENCRYPT_DOCUMENT_FILES', '') == '1'
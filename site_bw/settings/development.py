@@ -0,0 +1,8 @@
+# Профиль для разработки: отладка включена, принимаются запросы с любого хоста.
+# С DEBUG Django хранит каждый SQL-запрос в connection.queries — для
+# нагрузочных прогонов и на сервере нужен профиль production.
+from .base import *  # noqa: F401,F403
+
+DEBUG = True
+
+ALLOWED_HOSTS = ['*']
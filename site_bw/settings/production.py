@@ -0,0 +1,70 @@
+# Профиль для сервера (DJANGO_ENV=production). Всё, что здесь задано, нужно
+# для того, чтобы память и время ответа воркера не росли со временем:
+# без DEBUG не копятся connection.queries, соединение с БД переиспользуется,
+# шаблоны компилируются один раз и без отладочной информации, большие загрузки
+# пишутся во временный файл, а не держатся в памяти.
+# Проверка настроек: manage.py check --deploy
+import os
+
+from django.core.exceptions import ImproperlyConfigured
+
+from .base import *  # noqa: F401,F403
+from .base import BLIND_INDEX_KEY, DATABASES, FIELD_ENCRYPTION_KEYS, REDIS_URL, TEMPLATES
+
+DEBUG = False
+
+# Без явных ключей SECRET_KEY остаётся значением для разработки, а ключи шифрования
+# паспортов, ИНН и телефонов выводятся из него: его смена сделала бы данные нечитаемыми.
+_missing = [name for name, value in (('SECRET_KEY', os.getenv('SECRET_KEY')),
+                                     ('FIELD_ENCRYPTION_KEYS', FIELD_ENCRYPTION_KEYS),
+                                     ('BLIND_INDEX_KEY', BLIND_INDEX_KEY)) if not value]
+if _missing:
+    raise ImproperlyConfigured('В профиле production обязательны: ' + ', '.join(_missing))
+
+ALLOWED_HOSTS = [host for host in os.getenv('ALLOWED_HOSTS', '').split(',') if host]
+
+# Соединение с БД живёт DB_CONN_MAX_AGE секунд и переиспользуется следующими
+# запросами воркера; перед повторным использованием проверяется, что оно живо.
+DATABASES = {
+    **DATABASES,
+    'default': {
+        **DATABASES['default'],
+        'CONN_MAX_AGE': int(os.getenv('DB_CONN_MAX_AGE', 60)),
+        'CONN_HEALTH_CHECKS': True,
+    },
+}
+
+# Кеш (сессии cached_db, ограничение частоты, кеш пользователя) должен быть общим
+# для всех воркеров — на сервере задаётся REDIS_URL. Без него остаётся кеш
+# в памяти процесса из base.py, и check --deploy об этом предупреждает.
+if REDIS_URL:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': REDIS_URL,
+            'KEY_PREFIX': os.getenv('CACHE_KEY_PREFIX', 'site_bw'),
+        },
+    }
+
+# Шаблоны: те же кешированные загрузчики, но без отладочной информации
+# и без контекст-процессора debug (он нужен только с DEBUG)
+TEMPLATES = [
+    {
+        **TEMPLATES[0],
+        'OPTIONS': {
+            **TEMPLATES[0]['OPTIONS'],
+            'debug': False,
+            'context_processors': [
+                processor for processor in TEMPLATES[0]['OPTIONS']['context_processors']
+                if processor != 'django.template.context_processors.debug'
+            ],
+        },
+    },
+]
+
+# Загрузки: файл больше FILE_UPLOAD_MAX_MEMORY_SIZE пишется во временный файл
+# (фото документов обычно крупнее 1 МБ), тело запроса без файлов — не больше
+# DATA_UPLOAD_MAX_MEMORY_SIZE, иначе 400 до чтения в память
+FILE_UPLOAD_MAX_MEMORY_SIZE = int(os.getenv('FILE_UPLOAD_MAX_MEMORY_SIZE', 1024 * 1024))
+DATA_UPLOAD_MAX_MEMORY_SIZE = int(os.getenv('DATA_UPLOAD_MAX_MEMORY_SIZE', 2 * 1024 * 1024))
+FILE_UPLOAD_TEMP_DIR = os.getenv('FILE_UPLOAD_TEMP_DIR') or None
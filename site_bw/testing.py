@@ -0,0 +1,7 @@
+# site_bw/testing.py
+# Общее для тестов всех приложений.
+from django.conf import settings
+
+# страницы рендерятся без collectstatic: статика без манифеста
+PLAIN_STATIC = dict(settings.STORAGES, staticfiles={
+    'BACKEND': 'django.contrib.staticfiles.storage.StaticFilesStorage'})
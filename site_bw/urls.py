@@ -1,7 +1,8 @@
 from django.contrib import admin
-from django.urls import path, include
+from django.urls import path, re_path, include
 from django.conf import settings
 from django.conf.urls.static import static
+from personal_account.views import ProtectedMediaView
 
 handler403 = "pages.views.handler403"
 handler404 = "pages.views.handler404"
@@ -9,6 +10,9 @@ handler500 = "pages.views.handler500"
 
 urlpatterns = [
     path('admin/', admin.site.urls),
+    # фото документов отдаются по тем же адресам MEDIA_URL, но с проверкой прав
+    re_path(r'^%s(?P<path>documents/.+)$' % settings.MEDIA_URL.lstrip('/'),
+            ProtectedMediaView.as_view(), name='protected_media'),
     path("", include("pages.urls")),
     path("personal_account/", include("personal_account.urls")),
     # path("auth/", include("django.contrib.auth.urls")),
@@ -23,6 +27,12 @@ urlpatterns = [
     # ),
 ]
 
+if settings.STATIC_SERVE:
+    # pages.staticfiles тянет за собой Pillow — импортируем, только если статику отдаёт Django
+    from pages.staticfiles import serve as serve_static
+
+    urlpatterns += [re_path(r'^%s(?P<path>.*)$' % settings.STATIC_URL.lstrip('/'), serve_static)]
+
 # Добавляем для работы медиа
 if settings.DEBUG:
     urlpatterns += static(settings.MEDIA_URL,
@@ -0,0 +1,76 @@
+// Личный кабинет: меню, исчезающие сообщения и уведомления в реальном времени
+
+// Меню: подсвечиваем пункт текущей страницы, по клику переходим по data-url
+document.addEventListener('DOMContentLoaded', function() {
+    const menuItems = document.querySelectorAll('.menu-item');
+    const currentUrl = window.location.href;
+
+    menuItems.forEach(item => {
+        const itemUrl = item.getAttribute('data-url');
+        if (itemUrl && itemUrl !== '#' && currentUrl.includes(itemUrl)) {
+            menuItems.forEach(i => i.classList.remove('active'));
+            item.classList.add('active');
+        }
+    });
+
+    menuItems.forEach(item => {
+        item.addEventListener('click', function(e) {
+            e.preventDefault();
+
+            // Убираем активный класс у всех элементов
+            menuItems.forEach(i => i.classList.remove('active'));
+
+            // Добавляем активный класс к текущему элементу
+            this.classList.add('active');
+
+            // Получаем URL из data-атрибута и переходим по нему
+            const url = this.getAttribute('data-url');
+            if (url && url !== '#') {
+                window.location.href = url;
+            }
+        });
+    });
+});
+
+// Сообщения django.contrib.messages скрываются через 2,5 секунды
+document.addEventListener('DOMContentLoaded', function() {
+    const alerts = document.querySelectorAll('.alert');
+
+    alerts.forEach(alert => {
+        setTimeout(() => {
+            alert.classList.add('fade-out');
+
+            alert.addEventListener('animationend', function() {
+                alert.remove();
+
+                if (document.querySelectorAll('.alert').length === 0) {
+                    document.querySelector('.messages-container')?.remove();
+                }
+            });
+        }, 2500);
+    });
+});
+
+// уведомления в реальном времени (server-sent events) — на странице
+// своего профиля адрес потока передаётся в data-notifications-url
+document.addEventListener('DOMContentLoaded', function() {
+    const stream = document.querySelector('[data-notifications-url]');
+    if (!stream || !window.EventSource) {
+        return;
+    }
+    const source = new EventSource(stream.getAttribute('data-notifications-url'));
+    source.addEventListener('notification', function(e) {
+        const data = JSON.parse(e.data);
+        let container = document.querySelector('.messages-container');
+        if (!container) {
+            container = document.createElement('div');
+            container.className = 'messages-container';
+            document.body.appendChild(container);
+        }
+        const alert = document.createElement('div');
+        alert.className = 'alert info';
+        alert.textContent = data.message;
+        container.appendChild(alert);
+        setTimeout(() => alert.remove(), 5000);
+    });
+});